@@ -0,0 +1,86 @@
+"""The Episode app driven by the HTTP benchmarks.
+
+    python benchmarks/app.py --port 0 --workers 4
+
+Prints `READY <port>` once it accepts connections.
+"""
+import argparse
+import os
+import signal
+import sys
+import threading
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "../"))
+from episode.episode import Episode
+from episode.http.httpresponse import HttpResponse
+from episode.http.jsonresponse import JsonResponse
+from episode.model import Model
+from episode.route import Router
+from episode.template_engine import render_template
+
+TEMPLATE = os.path.join(os.path.dirname(__file__), "templates", "student.html")
+
+STUDENT = {"first_name": "Ama", "last_name": "Mensah", "user_name": "ama", "age": 21}
+
+
+class Student(Model):
+    first_name: str
+    last_name: str
+    user_name: str
+    age: int
+
+
+def create_app(port=0, **options):
+    app = Episode(port=port, **options)
+    app.router = Router()
+
+    @app.get("/hello")
+    def hello(request):
+        return HttpResponse().write(b"Hello, World!")
+
+    @app.get("/users/{user_id}/posts/{post_id}")
+    def post(request, user_id: int, post_id: int):
+        return HttpResponse().write(f"user {user_id} post {post_id}")
+
+    @app.post("/students")
+    def add_student(request, student: Student):
+        return JsonResponse().write(student)
+
+    @app.get("/students/{name}")
+    def student_page(request, name: str):
+        context = {
+            "title": "Student",
+            "name": name,
+            "courses": ["maths", "physics", "chemistry", "biology"],
+        }
+        return render_template(TEMPLATE, context=context)
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=0)
+    parser.add_argument("--max-pending", type=int, default=1024)
+    args = parser.parse_args()
+
+    app = create_app(
+        args.port,
+        host=args.host,
+        workers=args.workers,
+        max_pending=args.max_pending,
+    )
+    signal.signal(signal.SIGTERM, lambda signum, frame: app.stop())
+
+    def ready():
+        app.started.wait()
+        print(f"READY {app.server_address[1]}", flush=True)
+
+    threading.Thread(target=ready, daemon=True).start()
+    app.start()
+
+
+if __name__ == "__main__":
+    main()
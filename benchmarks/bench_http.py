@@ -0,0 +1,72 @@
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "../"))
+from episode.http.httprequest import HttpRequest
+from episode.http.httpresponse import HttpResponse
+from episode.http.httpstatus import HTTPStatus
+from microbench import benchmark
+
+# Headers of a typical browser navigation
+BROWSER_REQUEST = (
+    b"GET /students/ama?page=2&sort=age HTTP/1.1\r\n"
+    b"Host: localhost:8880\r\n"
+    b"Connection: keep-alive\r\n"
+    b"Cache-Control: max-age=0\r\n"
+    b'sec-ch-ua: "Chromium";v="124", "Google Chrome";v="124", "Not-A.Brand";v="99"\r\n'
+    b"sec-ch-ua-mobile: ?0\r\n"
+    b'sec-ch-ua-platform: "Linux"\r\n'
+    b"Upgrade-Insecure-Requests: 1\r\n"
+    b"User-Agent: Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 "
+    b"(KHTML, like Gecko) Chrome/124.0.0.0 Safari/537.36\r\n"
+    b"Accept: text/html,application/xhtml+xml,application/xml;q=0.9,"
+    b"image/avif,image/webp,*/*;q=0.8\r\n"
+    b"Sec-Fetch-Site: none\r\n"
+    b"Sec-Fetch-Mode: navigate\r\n"
+    b"Sec-Fetch-User: ?1\r\n"
+    b"Sec-Fetch-Dest: document\r\n"
+    b"Accept-Encoding: gzip, deflate, br, zstd\r\n"
+    b"Accept-Language: en-US,en;q=0.9\r\n"
+    b"Cookie: session=4f2a9c1e7b3d8f60; theme=dark\r\n"
+    b"\r\n"
+)
+
+JSON_POST = (
+    b"POST /students HTTP/1.1\r\n"
+    b"Host: localhost:8880\r\n"
+    b"User-Agent: python-requests/2.31.0\r\n"
+    b"Accept: */*\r\n"
+    b"Content-Type: application/json\r\n"
+    b"Content-Length: 75\r\n"
+    b"\r\n"
+    b'{"first_name": "Ama", "last_name": "Mensah", "user_name": "ama", "age": 21}'
+)
+
+
+@benchmark("http.HttpRequest[browser headers]")
+def parse_browser_request():
+    return lambda: HttpRequest(BROWSER_REQUEST)
+
+
+@benchmark("http.HttpRequest[json post]")
+def parse_json_post():
+    return lambda: HttpRequest(JSON_POST)
+
+
+@benchmark("http.HttpRequest.query_parameters")
+def parse_query():
+    return lambda: HttpRequest(BROWSER_REQUEST).query_parameters
+
+
+@benchmark("http.HttpResponse.write[small]")
+def write_small():
+    return lambda: HttpResponse().write(b"Hello, World!")
+
+
+@benchmark("http.HttpResponse.write[64 KiB, headers]")
+def write_large():
+    body = b"x" * 65536
+    headers = {"Cache-Control": "no-cache", "X-Request-Id": "4f2a9c1e"}
+    return lambda: HttpResponse().write(
+        body, extra_headers=headers, status_code=HTTPStatus.OK, content_type="html"
+    )
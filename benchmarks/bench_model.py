@@ -0,0 +1,52 @@
+import os
+import sys
+from itertools import count
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "../"))
+from episode.model import Model, Session, DBMS, DBConnection
+from microbench import benchmark
+
+ROWS = 100_000
+
+
+class Student(Model):
+    first_name: str
+    last_name: str
+    user_name: str
+    age: int
+
+
+def memory_session():
+    # Each Session gets its own private in-memory database
+    connection = DBConnection.dialect(DBMS.SQLITE)(database_path=":memory:")
+    session = Session(connection)
+    session.drop_create(Student)
+    return session
+
+
+@benchmark(f"model.hydrate[{ROWS} rows]", number=1)
+def hydrate():
+    session = memory_session()
+    session.conn.executemany(
+        "INSERT INTO student (first_name, last_name, user_name, age) "
+        "VALUES (?, ?, ?, ?)",
+        ((f"first{i}", f"last{i}", f"user{i}", i % 90) for i in range(ROWS)),
+    )
+    session.conn.commit()
+    return lambda: list(session.exec(session.select(Student)))
+
+
+@benchmark("model.Session.save[sqlite memory]")
+def save():
+    session = memory_session()
+    numbers = count()
+
+    def save_one():
+        number = next(numbers)
+        session.save(
+            Student(
+                first_name="Ama", last_name="Mensah", user_name=f"u{number}", age=21
+            )
+        )
+
+    return save_one
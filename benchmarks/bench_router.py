@@ -0,0 +1,50 @@
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "../"))
+from episode.route import Router
+from microbench import benchmark
+
+
+def handler(request):
+    return b""
+
+
+def build_router(count):
+    router = Router()
+    for index in range(count):
+        router.add_route(f"/static/page{index}", handler)
+        router.add_route(f"/api/resource{index}/{{id}}", handler)
+    return router
+
+
+def flat_lookup(count):
+    router = build_router(count // 2)
+    path = f"/static/page{count // 2 - 1}"
+    return lambda: router.get_route_info(path)
+
+
+def param_lookup(count):
+    router = build_router(count // 2)
+    path = f"/api/resource{count // 2 - 1}/42"
+    return lambda: router.get_route_info(path)
+
+
+for count in (10, 100, 1000):
+    benchmark(f"router.get_route_info[static, {count} routes]")(
+        lambda count=count: flat_lookup(count)
+    )
+    benchmark(f"router.get_route_info[param, {count} routes]")(
+        lambda count=count: param_lookup(count)
+    )
+
+
+@benchmark("router.get_route_info[deep params]")
+def deep_params():
+    router = build_router(50)
+    router.add_route(
+        "/orgs/{org}/teams/{team}/projects/{project}/issues/{issue}/comments/{comment}",
+        handler,
+    )
+    path = "/orgs/acme/teams/core/projects/episode/issues/12/comments/7"
+    return lambda: router.get_route_info(path)
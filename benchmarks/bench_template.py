@@ -0,0 +1,46 @@
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "../"))
+from episode.template_engine import FILTERS
+from episode.template_engine.template import Oeye
+from microbench import benchmark
+
+ROW = """
+    <tr class="{{row.kind}}">
+      <td>{{row.name|capitalize}}</td>
+      {% if row.active %}<td>active</td>{% endif %}
+      <td>{% for tag in row.tags %}<span>{{tag|upper}}</span>{% endfor %}</td>
+    </tr>
+"""
+
+# 200 distinct row blocks, as a large page template would have
+LARGE_TEMPLATE = (
+    "<html><body><h1>{{title}}</h1><table>"
+    + "".join(
+        f"{{% for row in rows{index} %}}{ROW}{{% endfor %}}" for index in range(200)
+    )
+    + "</table></body></html>"
+)
+
+CONTEXT = {"title": "Students"}
+CONTEXT.update(
+    {
+        f"rows{index}": [
+            {"kind": "odd", "name": "ama", "active": True, "tags": ["a", "b"]},
+            {"kind": "even", "name": "kwame", "active": False, "tags": ["c"]},
+        ]
+        for index in range(200)
+    }
+)
+
+
+@benchmark("template.Oeye[compile, large]")
+def compile_large():
+    return lambda: Oeye(LARGE_TEMPLATE, FILTERS)
+
+
+@benchmark("template.Oeye.render[large]")
+def render_large():
+    oeye = Oeye(LARGE_TEMPLATE, FILTERS)
+    return lambda: oeye.render(CONTEXT)
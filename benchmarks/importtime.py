@@ -0,0 +1,102 @@
+"""Startup time of the framework's modules.
+
+    python benchmarks/importtime.py
+    python benchmarks/importtime.py --output startup.json --top 15
+    python benchmarks/importtime.py --baseline startup.json
+
+Each module is imported in a fresh interpreter with `python -X importtime`,
+`--repeat` times, and the best cumulative import time is reported along
+with the slowest imports it pulls in. Results use the format of
+`microbench.py` and are compared to `--baseline` the same way.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+from microbench import compare, format_seconds
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+MODULES = ("episode", "episode.model", "episode.episode")
+
+
+def import_times(module):
+    """Seconds of self and cumulative import time of `module` and of each
+    module it imported, leaving out the interpreter's own startup.
+    """
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times = {}
+    for line in process.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:") :].split("|")
+        times[name.strip()] = (int(self_us) / 1e6, int(cumulative_us) / 1e6)
+        # A module is listed after its imports, which are indented
+        if not name.startswith("  "):
+            if name.strip() == module:
+                break
+            times = {}
+    return times
+
+
+def measure(module, repeat):
+    best = None
+    for _ in range(repeat):
+        times = import_times(module)
+        if best is None or times[module][1] < best[module][1]:
+            best = times
+    return best
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--modules", default=",".join(MODULES), help="comma separated")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10, help="slowest imports shown")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="JSON results to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.15)
+    args = parser.parse_args(argv)
+
+    results = []
+    for module in args.modules.split(","):
+        times = measure(module, args.repeat)
+        seconds = times[module][1]
+        results.append({"name": f"import {module}", "seconds": seconds})
+        print(f"import {module:40} {format_seconds(seconds)}")
+
+        slowest = sorted(times.items(), key=lambda item: item[1][0], reverse=True)
+        for name, (self_seconds, _) in slowest[: args.top]:
+            print(f"    {name:40} {format_seconds(self_seconds)} self")
+
+    report = {
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        lines, regressed = compare(results, baseline, args.tolerance)
+        print("\n".join(lines))
+        return 1 if regressed else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,150 @@
+"""A closed-loop HTTP load generator.
+
+A single thread keeps `concurrency` requests in flight over localhost
+with non-blocking sockets, one connection per request as the server
+closes connections after responding, and records the latency of each.
+"""
+import errno
+import selectors
+import socket
+import time
+
+
+class Scenario:
+    def __init__(self, name, method, path, body=b"", content_type=None):
+        self.name = name
+        self.method = method
+        self.path = path
+        self.body = body
+        self.content_type = content_type
+
+    def request(self, host):
+        lines = [f"{self.method} {self.path} HTTP/1.1", f"Host: {host}"]
+        if self.content_type:
+            lines.append(f"Content-Type: {self.content_type}")
+        if self.body:
+            lines.append(f"Content-Length: {len(self.body)}")
+        return ("\r\n".join(lines) + "\r\n\r\n").encode() + self.body
+
+
+class Result:
+    def __init__(self, scenario, mode, concurrency, latencies, errors, elapsed):
+        self.scenario = scenario
+        self.mode = mode
+        self.concurrency = concurrency
+        self.latencies = sorted(latencies)
+        self.errors = errors
+        self.elapsed = elapsed
+
+    @property
+    def key(self):
+        return f"{self.scenario}/{self.mode}/c{self.concurrency}"
+
+    @property
+    def rps(self):
+        return len(self.latencies) / self.elapsed if self.elapsed else 0.0
+
+    def to_dict(self):
+        return {
+            "scenario": self.scenario,
+            "mode": self.mode,
+            "concurrency": self.concurrency,
+            "requests": len(self.latencies),
+            "errors": self.errors,
+            "rps": round(self.rps, 1),
+            "p50_ms": round(percentile(self.latencies, 50) * 1000, 3),
+            "p99_ms": round(percentile(self.latencies, 99) * 1000, 3),
+            "p999_ms": round(percentile(self.latencies, 99.9) * 1000, 3),
+        }
+
+
+def percentile(values, percent):
+    """Nearest-rank percentile of the sorted `values`."""
+    if not values:
+        return 0.0
+    rank = max(1, -(-len(values) * percent // 100))
+    return values[int(rank) - 1]
+
+
+class Request:
+    __slots__ = ("sock", "data", "sent", "started", "status")
+
+    def __init__(self, address, data):
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.sock.setblocking(False)
+        self.data = data
+        self.sent = 0
+        self.status = b""
+        self.started = time.perf_counter()
+        err = self.sock.connect_ex(address)
+        if err not in (0, errno.EINPROGRESS, errno.EWOULDBLOCK):
+            self.sock.close()
+            raise OSError(err, "connect failed")
+
+
+def run_load(address, scenario, concurrency, duration, warmup=0.0, mode="", timeout=10):
+    """Keep `concurrency` requests of `scenario` in flight for `duration`
+    seconds, after `warmup` seconds whose requests are not recorded.
+    """
+    data = scenario.request(f"{address[0]}:{address[1]}")
+    selector = selectors.DefaultSelector()
+    latencies = []
+    errors = 0
+
+    def launch():
+        nonlocal errors
+        try:
+            request = Request(address, data)
+        except OSError:
+            errors += 1
+            return
+        selector.register(request.sock, selectors.EVENT_WRITE, request)
+
+    def finish(request, ok):
+        nonlocal errors
+        selector.unregister(request.sock)
+        request.sock.close()
+        now = time.perf_counter()
+        if request.started >= measure_from and now <= measure_until:
+            if ok:
+                latencies.append(now - request.started)
+            else:
+                errors += 1
+        if now < measure_until:
+            launch()
+
+    measure_from = time.perf_counter() + warmup
+    measure_until = measure_from + duration
+    for _ in range(concurrency):
+        launch()
+
+    while selector.get_map():
+        now = time.perf_counter()
+        if now > measure_until + timeout:
+            break
+        for key, events in selector.select(timeout=0.1):
+            request = key.data
+            try:
+                if events & selectors.EVENT_WRITE:
+                    request.sent += request.sock.send(request.data[request.sent :])
+                    if request.sent == len(request.data):
+                        selector.modify(request.sock, selectors.EVENT_READ, request)
+                    continue
+
+                chunk = request.sock.recv(65536)
+            except (BlockingIOError, InterruptedError):
+                continue
+            except OSError:
+                finish(request, False)
+                continue
+
+            if len(request.status) < 12:
+                request.status += chunk[: 12 - len(request.status)]
+            if not chunk:
+                finish(request, request.status[9:10] in (b"2", b"3"))
+
+    for key in list(selector.get_map().values()):
+        key.fileobj.close()
+    selector.close()
+
+    return Result(scenario.name, mode, concurrency, latencies, errors, duration)
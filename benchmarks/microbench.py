@@ -0,0 +1,123 @@
+"""Micro-benchmarks of the framework's hot paths.
+
+    python benchmarks/microbench.py --output micro.json
+    python benchmarks/microbench.py --baseline benchmarks/micro_baseline.json
+    python benchmarks/microbench.py --filter router
+
+Benchmarks are defined in the `bench_*.py` modules next to this file
+with the `benchmark` decorator. The time per call is the best of
+`--repeat` runs, each long enough to be measured reliably. With
+`--baseline` the exit status is 1 when any benchmark got slower by more
+than `--tolerance`.
+"""
+import argparse
+import glob
+import importlib
+import json
+import os
+import platform
+import sys
+import time
+import timeit
+
+BENCHMARKS = {}
+
+
+def benchmark(name, number=None):
+    """Register a benchmark.
+
+    The decorated function does the setup and returns the callable to
+    time. `number` fixes the calls per run, for slow benchmarks.
+    """
+
+    def inner(setup):
+        BENCHMARKS[name] = (setup, number)
+        return setup
+
+    return inner
+
+
+def load_benchmarks():
+    directory = os.path.dirname(os.path.abspath(__file__))
+    if directory not in sys.path:
+        sys.path.append(directory)
+    for path in sorted(glob.glob(os.path.join(directory, "bench_*.py"))):
+        importlib.import_module(os.path.basename(path)[:-3])
+    # The modules register with `microbench`, not `__main__`
+    return importlib.import_module("microbench").BENCHMARKS
+
+
+def measure(func, number=None, repeat=5, min_time=0.2):
+    """Best seconds per call of `func` over `repeat` runs."""
+    timer = timeit.Timer(func)
+    if number is None:
+        number = 1
+        while timer.timeit(number) < min_time:
+            number *= 2
+    return min(timer.repeat(repeat, number)) / number
+
+
+def compare(results, baseline, tolerance):
+    previous = {result["name"]: result for result in baseline["results"]}
+    lines = []
+    regressed = False
+    for result in results:
+        before = previous.get(result["name"])
+        if before is None:
+            lines.append(f"{result['name']:48} not in baseline")
+            continue
+
+        change = (result["seconds"] - before["seconds"]) / before["seconds"]
+        worse = change > tolerance
+        regressed = regressed or worse
+        lines.append(
+            f"{result['name']:48} {change:+7.1%}" + ("  REGRESSED" if worse else "")
+        )
+    return lines, regressed
+
+
+def format_seconds(seconds):
+    for unit, scale in (("s", 1), ("ms", 1e-3), ("us", 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:8.2f} {unit}"
+    return f"{seconds / 1e-9:8.2f} ns"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--filter", default="", help="run names containing this")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="JSON results to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.15)
+    args = parser.parse_args(argv)
+
+    results = []
+    for name, (setup, number) in load_benchmarks().items():
+        if args.filter not in name:
+            continue
+        seconds = measure(setup(), number, args.repeat)
+        results.append({"name": name, "seconds": seconds})
+        print(f"{name:48} {format_seconds(seconds)}/call", flush=True)
+
+    report = {
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        lines, regressed = compare(results, baseline, args.tolerance)
+        print("\n".join(lines))
+        return 1 if regressed else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,169 @@
+"""HTTP benchmarks of the Episode server core.
+
+    python benchmarks/run.py --output results.json
+    python benchmarks/run.py --baseline results.json --tolerance 0.1
+
+Each scenario is run against `benchmarks/app.py`, started in its own
+process for each server mode, at each concurrency level. Requests per
+second and p50/p99/p999 latencies are printed and written as JSON to
+`--output`. With `--baseline` the results are compared to an earlier
+output file, and the exit status is 1 when any of them regressed by more
+than `--tolerance`.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+from loadgen import Scenario, run_load
+
+APP = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py")
+
+SCENARIOS = {
+    "hello": Scenario("hello", "GET", "/hello"),
+    "params": Scenario("params", "GET", "/users/42/posts/7"),
+    "json_post": Scenario(
+        "json_post",
+        "POST",
+        "/students",
+        body=json.dumps(
+            {"first_name": "Ama", "last_name": "Mensah", "user_name": "ama", "age": 21}
+        ).encode(),
+        content_type="application/json",
+    ),
+    "template": Scenario("template", "GET", "/students/ama"),
+}
+
+# Mode name to `benchmarks/app.py` arguments
+MODES = {
+    "select": [],
+    "workers4": ["--workers", "4"],
+}
+
+
+class Server:
+    """`benchmarks/app.py` running in a child process."""
+
+    def __init__(self, args):
+        self.process = subprocess.Popen(
+            [sys.executable, APP, "--port", "0", *args],
+            stdout=subprocess.PIPE,
+            text=True,
+        )
+        for line in self.process.stdout:
+            if line.startswith("READY "):
+                self.address = ("127.0.0.1", int(line.split()[1]))
+                break
+        else:
+            raise Exception(f"Benchmark server exited with {self.process.wait()}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        self.process.terminate()
+        try:
+            self.process.wait(10)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            self.process.wait()
+
+
+def compare(results, baseline, tolerance):
+    """Lines comparing `results` to `baseline` and whether any regressed.
+
+    A lower req/s or a higher p99 by more than `tolerance` (a fraction)
+    is a regression.
+    """
+    previous = {
+        f"{r['scenario']}/{r['mode']}/c{r['concurrency']}": r
+        for r in baseline["results"]
+    }
+    lines = []
+    regressed = False
+    for result in results:
+        key = f"{result['scenario']}/{result['mode']}/c{result['concurrency']}"
+        before = previous.get(key)
+        if before is None:
+            lines.append(f"{key:32} not in baseline")
+            continue
+
+        rps_change = change(before["rps"], result["rps"])
+        p99_change = change(before["p99_ms"], result["p99_ms"])
+        worse = rps_change < -tolerance or p99_change > tolerance
+        regressed = regressed or worse
+        lines.append(
+            f"{key:32} req/s {rps_change:+7.1%}  p99 {p99_change:+7.1%}"
+            + ("  REGRESSED" if worse else "")
+        )
+    return lines, regressed
+
+
+def change(before, after):
+    return (after - before) / before if before else 0.0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--scenarios", default=",".join(SCENARIOS), help="comma separated"
+    )
+    parser.add_argument("--modes", default=",".join(MODES), help="comma separated")
+    parser.add_argument("--concurrency", default="1,16,64", help="comma separated")
+    parser.add_argument("--duration", type=float, default=5.0, help="seconds")
+    parser.add_argument("--warmup", type=float, default=1.0, help="seconds")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="JSON results to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.1)
+    args = parser.parse_args(argv)
+
+    concurrency_levels = [int(level) for level in args.concurrency.split(",")]
+    results = []
+    for mode in args.modes.split(","):
+        with Server(MODES[mode]) as server:
+            for name in args.scenarios.split(","):
+                for concurrency in concurrency_levels:
+                    result = run_load(
+                        server.address,
+                        SCENARIOS[name],
+                        concurrency,
+                        args.duration,
+                        args.warmup,
+                        mode,
+                    ).to_dict()
+                    results.append(result)
+                    print(
+                        f"{name:10} {mode:9} c={concurrency:<4} "
+                        f"{result['rps']:9.1f} req/s  "
+                        f"p50 {result['p50_ms']:8.3f} ms  "
+                        f"p99 {result['p99_ms']:8.3f} ms  "
+                        f"p999 {result['p999_ms']:8.3f} ms  "
+                        f"errors {result['errors']}",
+                        flush=True,
+                    )
+
+    report = {
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "duration": args.duration,
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        lines, regressed = compare(results, baseline, args.tolerance)
+        print("\n".join(lines))
+        return 1 if regressed else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,46 @@
+"""Episode web framework.
+
+The commonly used names can be imported from the package, each one only
+loading its module on first access:
+
+    from episode import Episode, HttpResponse, Model, Session
+"""
+import importlib
+
+# Public name to the module defining it
+_EXPORTS = {
+    "Episode": "episode.episode",
+    "HttpRequest": "episode.http.httprequest",
+    "HttpResponse": "episode.http.httpresponse",
+    "JsonResponse": "episode.http.jsonresponse",
+    "FileResponse": "episode.http.fileresponse",
+    "HTTPStatus": "episode.http.httpstatus",
+    "Model": "episode.model",
+    "Session": "episode.model",
+    "Index": "episode.model",
+    "DBMS": "episode.model",
+    "DBConnection": "episode.model",
+    "AsyncSession": "episode.asyncsession",
+    "AsyncConnectionPool": "episode.asyncsession",
+    "QueryCache": "episode.querycache",
+    "SlowQueryLog": "episode.slowquery",
+    "AccessLog": "episode.accesslog",
+    "HOOKS": "episode.hooks",
+    "render_template": "episode.template_engine",
+}
+
+__all__ = sorted(_EXPORTS)
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module 'episode' has no attribute '{name}'")
+    value = getattr(importlib.import_module(module), name)
+    # Cached, later lookups don't go through __getattr__
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted([*globals(), *_EXPORTS])
@@ -0,0 +1,206 @@
+import json
+import logging
+import queue
+import random
+import sys
+import time
+from contextvars import ContextVar
+
+from episode.logger import (
+    BatchedFileHandler,
+    BatchedStreamHandler,
+    DroppingQueueHandler,
+    LogListener,
+    LOG_QUEUE_SIZE,
+)
+
+# The RequestTimer of the request being handled, None when not sampled
+CURRENT_TIMER = ContextVar("episode_request_timer", default=None)
+
+PHASES = (
+    "read",
+    "queue",
+    "parse",
+    "route",
+    "bind",
+    "handler",
+    "db",
+    "template",
+    "compress",
+    "write",
+)
+
+
+class Phase:
+    __slots__ = ("timer", "name")
+
+    def __init__(self, timer, name):
+        self.timer = timer
+        self.name = name
+
+    def __enter__(self):
+        self.timer.enter(self.name)
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        self.timer.exit()
+
+
+class NoPhase:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        pass
+
+
+NO_PHASE = NoPhase()
+
+
+class RequestTimer:
+    """Per-phase durations of one request.
+
+    Phases nest, and each one only counts its own time: the `handler`
+    phase doesn't include the `db` and `template` phases run inside it.
+    """
+
+    def __init__(self):
+        self.started = time.time()
+        self.method = None
+        self.path = None
+        self.status = None
+        self.size = None
+        self.phases = {}
+        self.counts = {}
+        self._stack = []
+
+    def phase(self, name):
+        return Phase(self, name)
+
+    def enter(self, name):
+        now = time.perf_counter()
+        if self._stack:
+            self.add(self._stack[-1][0], now - self._stack[-1][1], count=False)
+        self._stack.append((name, now))
+
+    def exit(self):
+        now = time.perf_counter()
+        name, started = self._stack.pop()
+        self.add(name, now - started)
+        if self._stack:
+            # The enclosing phase resumes
+            self._stack[-1] = (self._stack[-1][0], now)
+
+    def add(self, name, seconds, count=True):
+        self.phases[name] = self.phases.get(name, 0.0) + seconds
+        if count:
+            self.counts[name] = self.counts.get(name, 0) + 1
+
+    def set_response(self, response):
+        self.status = response_status(response)
+        if isinstance(response, bytes):
+            self.size = len(response)
+        else:
+            self.size = len(response.head) + response.count
+
+    @property
+    def duration(self):
+        return sum(self.phases.values())
+
+
+def response_status(response):
+    if isinstance(response, bytes):
+        return int(response[9:12])
+    return response.status_code.value
+
+
+def current_timer():
+    return CURRENT_TIMER.get()
+
+
+def timed(name):
+    """Time the `with` block as phase `name` of the current request."""
+    timer = CURRENT_TIMER.get()
+    if timer is None:
+        return NO_PHASE
+    return timer.phase(name)
+
+
+class AccessEntry:
+    """Log message of one request, formatted on the log writer thread."""
+
+    __slots__ = ("timer", "fmt")
+
+    def __init__(self, timer, fmt):
+        self.timer = timer
+        self.fmt = fmt
+
+    def to_dict(self):
+        timer = self.timer
+        return {
+            "time": round(timer.started, 3),
+            "method": timer.method,
+            "path": timer.path,
+            "status": timer.status,
+            "bytes": timer.size,
+            "duration_ms": round(timer.duration * 1000, 3),
+            "db_queries": timer.counts.get("db", 0),
+            "phases": {
+                name: round(seconds * 1000, 3)
+                for name, seconds in timer.phases.items()
+            },
+        }
+
+    def __str__(self):
+        data = self.to_dict()
+        if self.fmt == "json":
+            return json.dumps(data, separators=(",", ":"))
+
+        for name in PHASES:
+            data[f"{name}_ms"] = data["phases"].get(name, 0.0)
+        return self.fmt % data
+
+
+class AccessLog:
+    """Access log of the requests served, one line per request.
+
+        episode = Episode(access_log=AccessLog("access.log", sample_rate=0.1))
+
+    Lines are JSON objects with the status, size and the time spent in
+    each phase (see PHASES), or `fmt` %-formatted with the same keys,
+    phases as `<phase>_ms`. Only `sample_rate` of the requests are timed
+    and logged. Lines are written to `path`, or `stream` (stdout by
+    default), from a background thread and dropped if it falls behind.
+    """
+
+    def __init__(self, path=None, stream=None, fmt="json", sample_rate=1.0):
+        self.fmt = fmt
+        self.sample_rate = sample_rate
+        if path is not None:
+            self.handler = BatchedFileHandler(path, encoding="utf-8")
+        else:
+            self.handler = BatchedStreamHandler(stream or sys.stdout)
+
+        self.listener = LogListener(queue.Queue(LOG_QUEUE_SIZE))
+        self.listener.add_handler(self.handler)
+        self.queue_handler = DroppingQueueHandler(self.listener.queue)
+        self.listener.start()
+
+    def start(self):
+        """Return a RequestTimer when this request is sampled, else None."""
+        if self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+            return None
+        return RequestTimer()
+
+    def log(self, timer):
+        entry = AccessEntry(timer, self.fmt)
+        record = logging.LogRecord(
+            "EPISODE.access", logging.INFO, "", 0, entry, None, None
+        )
+        self.queue_handler.handle(record)
+
+    def close(self):
+        self.listener.stop()
+        self.handler.close()
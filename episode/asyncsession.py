@@ -0,0 +1,333 @@
+"""Awaitable database access for async handlers.
+
+    pool = AsyncConnectionPool(dbms, size=8)
+
+    @app.get("/students/{name}")
+    async def student(request, name: str):
+        async with AsyncSession(pool) as session:
+            query = session.select(Student).where(Student.first_name == name)
+            students, total = await asyncio.gather(
+                session.exec(query).all(),
+                session.select(Student).count(),
+            )
+
+`AsyncSession` has the API of `Session`, with every call that reaches
+the database awaitable. The blocking drivers run on the threads of an
+`AsyncConnectionPool`, each holding its own `Session` and connection,
+so up to `size` queries are in flight while the event loop carries on.
+sqlite3, mysql.connector and pymongo release the GIL while they wait
+on the database.
+
+Relations selected with `.eager()` are loaded on the pool thread. The
+other relations are returned as detached `RelationProxy` objects: their
+`id` can be read, but loading them raises rather than querying from the
+caller's thread through a connection owned by the pool.
+"""
+import asyncio
+import concurrent.futures
+import queue
+import threading
+import weakref
+
+from episode.logger import EPISODE_LOGGER
+from episode.model import (
+    DBType,
+    Model,
+    NOSqlQueryBuilder,
+    RelationProxy,
+    Session,
+    SqlQueryBuilder,
+)
+
+
+def detach_relations(instances):
+    """Detach the relations of `instances`, and of the Models loaded with
+    them, that were not loaded. Runs no query.
+    """
+    pending = list(instances)
+    seen = set()
+    while pending:
+        instance = pending.pop()
+        if instance is None or id(instance) in seen:
+            continue
+        seen.add(id(instance))
+        for name in type(instance)._relations:
+            value = instance._values.get(name)
+            if isinstance(value, RelationProxy):
+                if value.is_loaded:
+                    pending.append(value.load())
+                else:
+                    value.detach()
+            elif isinstance(value, Model):
+                pending.append(value)
+    return instances
+
+
+class AsyncConnectionPool:
+    """`size` threads, each running database calls on its own Session.
+
+    `session_options` are passed to every Session, e.g. a shared
+    `cache`. Threads are started on first use.
+    """
+
+    def __init__(self, dbms, size=4, **session_options):
+        self.dbms = dbms
+        # An in-memory SQLite database is private to its connection
+        if getattr(dbms, "database_path", None) == ":memory:":
+            size = 1
+        self.size = size
+        self.session_options = session_options
+        self._jobs = queue.SimpleQueue()
+        self._threads = []
+        self._lock = threading.Lock()
+        # Calls put on the queue and not yet taken by a thread
+        self._pending = 0
+        self._busy = 0
+        self._closed = False
+
+    async def run(self, func, *args):
+        """Await `func(session, *args)` run on a pool thread."""
+        future = concurrent.futures.Future()
+        with self._lock:
+            if self._closed:
+                raise Exception("AsyncConnectionPool is closed.")
+            self._pending += 1
+            idle = len(self._threads) - self._busy - self._pending
+            if idle < 0 and len(self._threads) < self.size:
+                thread = threading.Thread(
+                    target=self.work,
+                    name=f"episode-db-{len(self._threads)}",
+                    daemon=True,
+                )
+                self._threads.append(thread)
+                thread.start()
+            self._jobs.put((future, func, args))
+        return await asyncio.wrap_future(future)
+
+    def work(self):
+        session = None
+        try:
+            while True:
+                job = self._jobs.get()
+                if job is None:
+                    return
+                future, func, args = job
+                with self._lock:
+                    self._pending -= 1
+                    self._busy += 1
+                try:
+                    if not future.set_running_or_notify_cancel():
+                        continue
+                    if session is None:
+                        session = Session(self.dbms, **self.session_options)
+                    future.set_result(func(session, *args))
+                except BaseException as e:
+                    future.set_exception(e)
+                finally:
+                    # Rows of one call are not reused by the next, which may
+                    # come from another request
+                    if session is not None:
+                        session.identity_map.clear()
+                    with self._lock:
+                        self._busy -= 1
+        finally:
+            if session is not None:
+                try:
+                    session.close()
+                except Exception:
+                    EPISODE_LOGGER.exception("Closing a pooled session failed")
+
+    def pool_stats(self):
+        return {
+            "threads_open": len(self._threads),
+            "threads_busy": self._busy,
+            "threads_max": self.size,
+            "calls_queued": self._pending,
+        }
+
+    def close(self, timeout=None):
+        """Finish the queued calls, then close every session."""
+        with self._lock:
+            self._closed = True
+            threads = list(self._threads)
+        for _ in threads:
+            self._jobs.put(None)
+        for thread in threads:
+            thread.join(timeout)
+
+
+def fetch_batches(session, query_builder, size):
+    """Models of `query_builder`, in lists of up to `size`, as rows are read."""
+    model = query_builder.model
+    if session.dbms.db_type is DBType.NOSQL or (
+        session.cache is not None and query_builder.use_cache
+    ):
+        # Read whole, from the cache or a materialized MongoDB cursor
+        instances = list(session.exec(query_builder))
+        for start in range(0, len(instances), size):
+            yield detach_relations(instances[start : start + size])
+        return
+
+    sql_stmt, values = query_builder.get_query_stmt()
+    for rows in session.fetch_batches(sql_stmt, values, size):
+        yield detach_relations(
+            [model(**session.process_row_data(row, query_builder)) for row in rows]
+        )
+
+
+def stream_batches(session, query_builder, size, loop, batches, stopped):
+    """Pool side of `RowStream`: put batches of Models on the loop's
+    `batches` queue, until the rows end or `stopped` is set.
+    """
+
+    def put(batch):
+        future = asyncio.run_coroutine_threadsafe(batches.put(batch), loop)
+        while True:
+            try:
+                future.result(0.05)
+                return True
+            except concurrent.futures.TimeoutError:
+                if stopped.is_set():
+                    future.cancel()
+                    return False
+
+    try:
+        for batch in fetch_batches(session, query_builder, size):
+            if stopped.is_set() or not put(batch):
+                return
+    finally:
+        if not stopped.is_set():
+            put(None)
+
+
+class RowStream:
+    """Async iterator over the Models of a query, read in batches.
+
+    One pool thread runs the query and stays busy until the rows end or
+    the iterator is closed or garbage collected, e.g. after a `break`.
+    """
+
+    def __init__(self, pool, query_builder, batch_size):
+        # Two batches ahead at most, the pool thread waits for the loop
+        self.batches = asyncio.Queue(maxsize=2)
+        self.stopped = threading.Event()
+        self.batch = iter(())
+        # Doesn't refer to self, so a dropped iterator can be collected
+        self.job = asyncio.ensure_future(
+            pool.run(
+                stream_batches,
+                query_builder,
+                batch_size,
+                asyncio.get_running_loop(),
+                self.batches,
+                self.stopped,
+            )
+        )
+        weakref.finalize(self, self.stopped.set)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        while True:
+            instance = next(self.batch, None)
+            if instance is not None:
+                return instance
+            batch = await self.batches.get()
+            if batch is None:
+                # Raises the error that ended the rows, if any
+                await self.job
+                raise StopAsyncIteration
+            self.batch = iter(batch)
+
+    async def aclose(self):
+        self.stopped.set()
+
+
+class AsyncResult:
+    """Rows of `AsyncSession.exec`: await it, or iterate it with
+    `async for` to stream the rows in batches of `batch_size`.
+    """
+
+    def __init__(self, pool, query_builder, batch_size=100):
+        self.pool = pool
+        self.query_builder = query_builder
+        self.batch_size = batch_size
+
+    def all(self):
+        return self.pool.run(
+            lambda session: detach_relations(list(session.exec(self.query_builder)))
+        )
+
+    def first(self):
+        return self.pool.run(
+            lambda session: detach_relations(
+                [next(session.exec(self.query_builder), None)]
+            )[0]
+        )
+
+    def __await__(self):
+        return self.all().__await__()
+
+    def __aiter__(self):
+        return RowStream(self.pool, self.query_builder, self.batch_size)
+
+
+class AsyncSession:
+    def __init__(self, pool):
+        self.pool = pool
+        self.dbms = pool.dbms
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, exc_traceback):
+        # The connections belong to the pool
+        ...
+
+    def select(self, model):
+        if self.dbms.db_type is DBType.NOSQL:
+            return NOSqlQueryBuilder(model, session=self)
+        return SqlQueryBuilder(model, self.dbms, session=self)
+
+    def exec(self, query_builder, batch_size=100):
+        return AsyncResult(self.pool, query_builder, batch_size)
+
+    def call(self, name, *args):
+        """Await the Session method `name` on a pool thread."""
+        return self.pool.run(lambda session: getattr(session, name)(*args))
+
+    def get(self, model, id):
+        return self.pool.run(
+            lambda session: detach_relations([session.get(model, id)])[0]
+        )
+
+    def save(self, model):
+        return self.call("save", model)
+
+    def delete(self, model):
+        return self.call("delete", model)
+
+    def create(self, model):
+        return self.call("create", model)
+
+    def drop(self, model):
+        return self.call("drop", model)
+
+    def drop_create(self, model):
+        return self.call("drop_create", model)
+
+    def ensure_indexes(self, model):
+        return self.call("ensure_indexes", model)
+
+    def count(self, query_builder):
+        return self.call("count", query_builder)
+
+    def aggregate(self, query_builder, aggregates):
+        return self.call("aggregate", query_builder, aggregates)
+
+    def bulk_delete(self, query_builder):
+        return self.call("bulk_delete", query_builder)
+
+    def bulk_update(self, query_builder, values):
+        return self.call("bulk_update", query_builder, values)
@@ -0,0 +1,198 @@
+import json
+from urllib.parse import parse_qsl
+
+from episode.http.httpstatus import HTTPStatus
+
+FORM_CONTENT_TYPE = "application/x-www-form-urlencoded"
+JSON_CONTENT_TYPE = "application/json"
+
+TRUE_VALUES = {"true", "1", "on", "yes"}
+FALSE_VALUES = {"false", "0", "off", "no"}
+
+
+class ValidationError(Exception):
+    """A request body that can't be decoded into a Model.
+
+    `status_code` is 400 for a missing or malformed body, 415 for an
+    unsupported Content-Type and 422 when fields fail validation, in
+    which case `errors` lists them as `{"field": ..., "message": ...}`.
+    """
+
+    def __init__(self, message, status_code=HTTPStatus.BAD_REQUEST, errors=None):
+        super().__init__(message)
+        self.message = message
+        self.status_code = status_code
+        self.errors = errors or []
+
+    def to_dict(self):
+        data = {"detail": self.message}
+        if self.errors:
+            data["errors"] = self.errors
+        return data
+
+
+def coerce_int(value, form):
+    if type(value) is int:
+        return value
+    if form and isinstance(value, str):
+        return int(value)
+    raise ValueError
+
+
+def coerce_float(value, form):
+    if type(value) in (int, float):
+        return float(value)
+    if form and isinstance(value, str):
+        return float(value)
+    raise ValueError
+
+
+def coerce_str(value, form):
+    if isinstance(value, str):
+        return value
+    raise ValueError
+
+
+def coerce_bool(value, form):
+    if type(value) is bool:
+        return value
+    if form and isinstance(value, str):
+        lowered = value.lower()
+        if lowered in TRUE_VALUES:
+            return True
+        if lowered in FALSE_VALUES:
+            return False
+    raise ValueError
+
+
+def validated(field):
+    # Types without a coercion function are checked as Field.__set__ does
+    def coerce_value(value, form):
+        try:
+            field.validate(value)
+        except Exception:
+            raise ValueError
+        return value
+
+    return coerce_value
+
+
+COERCERS = {int: coerce_int, float: coerce_float, str: coerce_str, bool: coerce_bool}
+
+TYPE_NAMES = {int: "integer", float: "number", str: "string", bool: "boolean"}
+
+
+class ModelDecoder:
+    """Decodes request bodies into instances of `model`.
+
+    The fields' coercion functions are looked up once, when the decoder
+    is built; `decode` then parses the body and checks every field in a
+    single pass, collecting all the errors before raising. Get decoders
+    through `ModelDecoder.for_model`, which keeps one per Model.
+    """
+
+    _decoders = {}
+
+    def __init__(self, model):
+        self.model = model
+        self.fields = {}
+        self.required = []
+        for name, field in model._cols.items():
+            if name == "id":
+                continue
+            related = model._relations.get(name)
+            if related is not None:
+                coercer = self.nested(related)
+            else:
+                coercer = COERCERS.get(field.py_type) or validated(field)
+            self.fields[name] = (coercer, field.py_type, field.is_nullable)
+            if not field.is_nullable:
+                self.required.append(name)
+
+    @classmethod
+    def for_model(cls, model):
+        decoder = cls._decoders.get(model)
+        if decoder is None:
+            decoder = cls._decoders[model] = cls(model)
+        return decoder
+
+    @staticmethod
+    def nested(related):
+        def coerce_model(value, form):
+            if form or not isinstance(value, dict):
+                raise ValueError
+            return ModelDecoder.for_model(related).build(value, form)
+
+        return coerce_model
+
+    def decode(self, body, content_type=None):
+        content_type = (content_type or JSON_CONTENT_TYPE).split(";")[0].strip().lower()
+        if not body:
+            raise ValidationError("Request body is required")
+
+        if content_type == FORM_CONTENT_TYPE:
+            try:
+                data = dict(parse_qsl(body.decode(), keep_blank_values=True))
+            except UnicodeDecodeError:
+                raise ValidationError("Request body is not valid form data")
+            return self.build(data, form=True)
+
+        if content_type == JSON_CONTENT_TYPE or content_type.endswith("+json"):
+            try:
+                data = json.loads(body)
+            except ValueError:
+                raise ValidationError("Request body is not valid JSON")
+            if not isinstance(data, dict):
+                raise ValidationError("Request body must be a JSON object")
+            return self.build(data, form=False)
+
+        raise ValidationError(
+            f"Unsupported Content-Type `{content_type}`",
+            status_code=HTTPStatus.UNSUPPORTED_MEDIA_TYPE,
+        )
+
+    def build(self, data, form=False):
+        values = {"id": None}
+        errors = []
+        for name, value in data.items():
+            spec = self.fields.get(name)
+            if spec is None:
+                errors.append({"field": name, "message": "Unknown field"})
+                continue
+
+            coercer, py_type, is_nullable = spec
+            if value is None:
+                if not is_nullable:
+                    errors.append({"field": name, "message": "Field may not be null"})
+                    continue
+                values[name] = None
+                continue
+
+            try:
+                values[name] = coercer(value, form)
+            except ValidationError as e:
+                # Nested model, report its fields under this one
+                for error in e.errors:
+                    error["field"] = f"{name}.{error['field']}"
+                errors.extend(e.errors)
+            except (TypeError, ValueError):
+                type_name = TYPE_NAMES.get(
+                    py_type, getattr(py_type, "__name__", str(py_type))
+                )
+                errors.append({"field": name, "message": f"Expected {type_name}"})
+
+        for name in self.required:
+            if name not in data:
+                errors.append({"field": name, "message": "Field is required"})
+
+        if errors:
+            raise ValidationError(
+                f"Invalid `{self.model.__name__}`",
+                status_code=HTTPStatus.UNPROCESSABLE_ENTITY,
+                errors=errors,
+            )
+
+        # Values are already checked, skip the per field checks of __init__
+        instance = self.model.__new__(self.model)
+        instance._values = values
+        return instance
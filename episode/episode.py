@@ -1,22 +1,84 @@
 import inspect
-import json
+import threading
+import time
 
+from episode.accesslog import AccessLog, current_timer, response_status, timed
+from episode.decoder import ModelDecoder, ValidationError
+from episode.hooks import HOOKS
+from episode.logger import EPISODE_LOGGER
 from episode.tcpserver import TCPServer
 from episode.http.httprequest import HttpRequest
 from episode.http.httpresponse import HttpResponse
+from episode.http.jsonresponse import JsonResponse
 from episode.http.httpstatus import HTTPStatus
+from episode.http.compression import Compressor
+from episode.http.responsecache import ResponseCache
+from episode.http.staticfiles import StaticFiles
+from episode.metrics import ServerMetrics
 from episode.route import Router, Action
 from episode.model import Model
+from episode.template_engine import TEMPLATE_CACHE
+
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# An event loop per server thread, for `async def` handlers
+_EVENT_LOOPS = threading.local()
+
+
+def run_coroutine(coroutine):
+    """Run `coroutine` to completion on this thread's event loop."""
+    loop = getattr(_EVENT_LOOPS, "loop", None)
+    if loop is None:
+        # Only loaded once an async handler is called
+        import asyncio
+
+        loop = _EVENT_LOOPS.loop = asyncio.new_event_loop()
+    return loop.run_until_complete(coroutine)
 
 
 class Episode(TCPServer):
     router = Router()
 
-    def add_route(self, request_route, accepted_method):
+    def __init__(
+        self,
+        host="127.0.0.1",
+        port=8880,
+        compression=None,
+        response_cache=None,
+        access_log=None,
+        metrics=None,
+        **server_options,
+    ):
+        # `server_options` such as `workers` are passed to TCPServer
+        super().__init__(host, port, **server_options)
+        # `True` for the default settings, or a configured Compressor
+        self.compressor = Compressor() if compression is True else compression
+        # Holds the responses of routes registered with `cache=ttl`
+        self.response_cache = (
+            ResponseCache() if response_cache is None else response_cache
+        )
+        # `True` logs every request to stdout, or a configured AccessLog
+        self.access_log = AccessLog() if access_log is True else access_log
+        # Process wide by default, see `hook`
+        self.hooks = HOOKS
+        self.profiler = None
+        # Handler signatures, filled by `warmup` or on first request
+        self.signatures = {}
+        self.warmup_callbacks = []
+        self.template_directories = []
+        self.metrics = None
+        if metrics:
+            self.instrument("/metrics" if metrics is True else metrics)
+
+    def add_route(self, request_route, accepted_method, cache=None):
         def inner(func):
             # Always strip last forward slash if one exists
             self.router.add_route(
-                request_route.rstrip("/"), func, accepted_method=accepted_method
+                request_route.rstrip("/"),
+                func,
+                accepted_method=accepted_method,
+                cache=cache,
             )
 
             def wrapper(*args, **kwargs):
@@ -26,11 +88,16 @@ class Episode(TCPServer):
 
         return inner
 
-    def route(self, request_route):
-        return self.add_route(request_route, accepted_method="all")
+    def route(self, request_route, cache=None):
+        return self.add_route(request_route, accepted_method="all", cache=cache)
+
+    def get(self, request_route, cache=None):
+        """Register a GET handler.
 
-    def get(self, request_route):
-        return self.add_route(request_route, "GET")
+        With `cache=ttl` its 200 responses are served from the response
+        cache for `ttl` seconds, see `ResponseCache`.
+        """
+        return self.add_route(request_route, "GET", cache=cache)
 
     def post(self, request_route):
         return self.add_route(request_route, "POST")
@@ -38,6 +105,106 @@ class Episode(TCPServer):
     def delete(self, request_route):
         return self.add_route(request_route, "DELETE")
 
+    def static(self, request_route, directory, **options):
+        """Serve the files under `directory` at `request_route`.
+
+            episode.static("/assets", "./assets")
+
+        `options` are passed to `StaticFiles`.
+        """
+        static_files = StaticFiles(directory, **options)
+        self.router.add_route(
+            request_route.rstrip("/") + "/{filepath:path}",
+            static_files,
+            accepted_method="all",
+        )
+        return static_files
+
+    def on_warmup(self, func):
+        """Register `func(app)` to run before the server accepts
+        connections, e.g. to open connection pools.
+        """
+        self.warmup_callbacks.append(func)
+        return func
+
+    def precompile_templates(self, directory):
+        """Compile the templates under `directory` during `warmup`."""
+        self.template_directories.append(directory)
+
+    def warmup(self):
+        """Prepare the routes and templates before accepting connections,
+        so the first requests don't pay for it.
+        """
+        started = time.perf_counter()
+        for _, action in self.router.routes():
+            if action.handler is not None:
+                self.handler_signature(action.handler)
+
+        templates = 0
+        for directory in self.template_directories:
+            templates += TEMPLATE_CACHE.precompile(directory)
+
+        for func in self.warmup_callbacks:
+            func(self)
+
+        EPISODE_LOGGER.debug(
+            "Warmed up %d handlers and %d templates in %.1f ms",
+            len(self.signatures),
+            templates,
+            (time.perf_counter() - started) * 1000,
+        )
+
+    def handler_signature(self, handler):
+        signature = self.signatures.get(handler)
+        if signature is None:
+            signature = self.signatures[handler] = inspect.signature(handler)
+        return signature
+
+    def hook(self, event):
+        """Register a callback for a hook event, see `Hooks`.
+
+            @episode.hook("after_response")
+            def log_status(request, response):
+                ...
+        """
+        return self.hooks.on(event)
+
+    def profile(self, every=100, sampler="cprofile", request_route=None):
+        """Profile 1 in `every` requests of each route, see `RouteProfiler`.
+
+        With `request_route` the aggregated stats are served there.
+        """
+        # Imported here, cProfile and pstats only load when profiling
+        from episode.profiler import RouteProfiler
+
+        self.profiler = RouteProfiler(every, sampler)
+        self.profiler.attach(self.hooks)
+        if request_route is not None:
+            self.router.add_route(
+                request_route.rstrip("/"), self.profile_handler, accepted_method="GET"
+            )
+        return self.profiler
+
+    def profile_handler(self, request, route: str = None):
+        return HttpResponse().write(
+            self.profiler.dump(route), content_type="text/plain; charset=utf-8"
+        )
+
+    def instrument(self, request_route="/metrics"):
+        """Collect ServerMetrics and serve them at `request_route` in the
+        Prometheus text format.
+        """
+        self.metrics = ServerMetrics(self)
+        self.router.add_route(
+            request_route.rstrip("/"), self.metrics_handler, accepted_method="GET"
+        )
+        return self.metrics
+
+    def metrics_handler(self, request):
+        return HttpResponse().write(
+            self.metrics.render(), content_type=PROMETHEUS_CONTENT_TYPE
+        )
+
     def validate_request_method(self, request, route_methods):
         accepted_route_action = None
         # Search from the end, last route takes precedence
@@ -58,55 +225,126 @@ class Episode(TCPServer):
         return accepted_route_action
 
     def handle_request(self, data):
+        timer = current_timer()
+        started = time.perf_counter()
+
         # create an instance of `HttpRequest`
-        request = HttpRequest(data)
-
-        # Extract query parameters if some exist in request uri
-        if request.uri.find("?") != -1:
-            request_uri, query_parameters = request.uri.split("?")
-            query_parameters = query_parameters.split("&")
-            for query_parameter in query_parameters:
-                if query_parameter.find("=") != -1:
-                    param, value = query_parameter.split("=")
-                    request.query_parameters[param] = value
-        else:
-            request_uri = request.uri
+        with timed("parse"):
+            request = HttpRequest(data)
+        if timer is not None:
+            timer.method, timer.path = request.method, request.path
+
+        if self.metrics is None and not self.hooks.active:
+            return self.dispatch(request)
+        return self.observed_dispatch(request, started)
+
+    def observed_dispatch(self, request, started):
+        hooks = self.hooks
+        if hooks.before_request:
+            hooks.run("before_request", request)
+        try:
+            response = self.dispatch(request)
+        except Exception:
+            self.observe_request(request, None, started)
+            raise
+        self.observe_request(request, response, started)
+        return response
+
+    def observe_request(self, request, response, started):
+        if self.metrics is not None:
+            self.metrics.observe_request(
+                request.route or "unmatched",
+                request.method,
+                500 if response is None else response_status(response),
+                time.perf_counter() - started,
+            )
+        if self.hooks.after_response:
+            self.hooks.run("after_response", request, response)
+
+    def dispatch(self, request):
+        # Query parameters are parsed lazily by the request
+        request_uri = request.path
 
         # now, look at the router and call the
         # appropriate route handler
-        node, route_parameters = self.router.get_route_info(request_uri.rstrip("/"))
-        if node and node.actions:
-            action = self.validate_request_method(request, node.actions)
-            if isinstance(action, Action):
-                if action.terminal and action.handler:
-                    handler = action.handler
-                    request.route_parameters = route_parameters
+        cache_key = None
+        with timed("route"):
+            node, route_parameters = self.router.get_route_info(
+                request_uri.rstrip("/")
+            )
+            if node and node.actions:
+                request.route = node.pattern
+                action = self.validate_request_method(request, node.actions)
+                if isinstance(action, Action):
+                    if action.terminal and action.handler:
+                        handler = action.handler
+                        request.route_parameters = route_parameters
+
+                        if action.cache and request.method in ("GET", "HEAD"):
+                            cache_key = self.response_cache_key(request, request_uri)
+                            entry = self.response_cache.get(cache_key)
+                            if entry is not None:
+                                return self.response_cache.respond(request, entry)
+                    else:
+                        handler = self.HTTP_401_handler
                 else:
-                    handler = self.HTTP_401_handler
+                    return action
             else:
-                return action
-        else:
-            handler = self.HTTP_401_handler
+                handler = self.HTTP_401_handler
+
+        if self.hooks.after_route:
+            self.hooks.run(
+                "after_route",
+                request,
+                None if handler == self.HTTP_401_handler else handler,
+            )
+
+        with timed("bind"):
+            response = self.validate_handler_parameters(handler, request)
+
+        if self.compressor is not None and isinstance(response, bytes):
+            with timed("compress"):
+                response = self.compressor.compress(request, response)
 
-        response = self.validate_handler_parameters(handler, request)
+        if cache_key is not None:
+            entry = self.response_cache.set(cache_key, response, action.cache)
+            if entry is not None:
+                return self.response_cache.respond(request, entry)
 
         return response
 
+    def response_cache_key(self, request, request_uri):
+        # Each content coding is a different representation
+        coding = None
+        if self.compressor is not None:
+            coding = self.compressor.negotiate(request.header("Accept-Encoding"))
+        return self.response_cache.make_key(request, request_uri.rstrip("/"), coding)
+
     def validate_handler_parameters(self, handler, request):
         types = {int: "integer", str: "string", inspect._empty: "empty", None: "empty"}
 
         if handler == self.HTTP_401_handler:
-            return handler(request)
+            if self.hooks.before_handler:
+                self.hooks.run("before_handler", request, handler, {})
+            with timed("handler"):
+                return handler(request)
 
-        handler_signature = inspect.signature(handler)
+        handler_signature = self.handler_signature(handler)
         handler_params = {}
         route_parameters = request.route_parameters
-        route_parameters.update(request.query_parameters)
         for param_name, param_obj in handler_signature.parameters.items():
             if param_name == "request":
                 continue
+            # Route parameters take precedence over query parameters
             if param_name in route_parameters:
-                route_parameter_value = route_parameters[param_name]
+                parameter_source = route_parameters
+            elif param_name in request.query_parameters:
+                parameter_source = request.query_parameters
+            else:
+                parameter_source = None
+
+            if parameter_source is not None:
+                route_parameter_value = parameter_source[param_name]
                 if param_obj.annotation != inspect._empty:
                     # Match param data type
                     # Now only consider int and string
@@ -125,13 +363,18 @@ class Episode(TCPServer):
                 else:
                     handler_params[param_name] = route_parameter_value
             else:
-                if issubclass(param_obj.annotation, Model):
-                    # TODO: check request Content-Type before deserialization
-                    # TODO: check if request body is not empty
-                    model_instance = param_obj.annotation(
-                        **dict(json.loads(request.body.decode()))
-                    )
-                    handler_params[param_name] = model_instance
+                if isinstance(param_obj.annotation, type) and issubclass(
+                    param_obj.annotation, Model
+                ):
+                    decoder = ModelDecoder.for_model(param_obj.annotation)
+                    try:
+                        handler_params[param_name] = decoder.decode(
+                            request.body, request.header("Content-Type")
+                        )
+                    except ValidationError as e:
+                        return JsonResponse().write(
+                            e.to_dict(), status_code=e.status_code
+                        )
                 elif param_obj.default != inspect._empty:
                     handler_params[param_name] = param_obj.default
                 else:
@@ -145,7 +388,14 @@ class Episode(TCPServer):
                         error_msg.encode(), status_code=HTTPStatus.PRECONDITION_FAILED
                     )
 
-        return handler(request, **handler_params)
+        if self.hooks.before_handler:
+            self.hooks.run("before_handler", request, handler, handler_params)
+        with timed("handler"):
+            response = handler(request, **handler_params)
+            if inspect.iscoroutine(response):
+                # The handler awaits many queries at once, see `AsyncSession`
+                response = run_coroutine(response)
+            return response
 
     def HTTP_401_handler(self, request):
         return HttpResponse().write(
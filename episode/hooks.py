@@ -0,0 +1,73 @@
+import threading
+
+from episode.logger import EPISODE_LOGGER
+
+# Events and the arguments their callbacks are called with
+EVENTS = {
+    # request
+    "before_request": ("request",),
+    # request, handler; the handler is None when no route matched
+    "after_route": ("request", "handler"),
+    # request, handler, keyword arguments the handler is called with
+    "before_handler": ("request", "handler", "params"),
+    # request, response; the response is None when the request failed
+    "after_response": ("request", "response"),
+    # statement, params, seconds, rows
+    "on_db_query": ("statement", "params", "seconds", "rows"),
+}
+
+
+class Hooks:
+    """Callbacks run at fixed points of request handling and queries.
+
+        @HOOKS.on("after_response")
+        def log_status(request, response):
+            ...
+
+    Events without callbacks cost a truthiness check. Callbacks run on
+    the thread handling the request or query; their return values are
+    ignored and their exceptions logged, never raised.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        for event in EVENTS:
+            setattr(self, event, ())
+
+    def on(self, event, callback=None):
+        """Run `callback` on `event`, usable as a decorator."""
+        if event not in EVENTS:
+            raise Exception(f"Unknown hook event '{event}'")
+
+        if callback is None:
+            return lambda func: self.on(event, func)
+
+        with self._lock:
+            # Replaced rather than mutated, requests read it unlocked
+            setattr(self, event, (*getattr(self, event), callback))
+        return callback
+
+    def remove(self, event, callback):
+        with self._lock:
+            callbacks = getattr(self, event)
+            setattr(self, event, tuple(c for c in callbacks if c is not callback))
+
+    def clear(self):
+        with self._lock:
+            for event in EVENTS:
+                setattr(self, event, ())
+
+    @property
+    def active(self):
+        return any(getattr(self, event) for event in EVENTS if event != "on_db_query")
+
+    def run(self, event, *args):
+        for callback in getattr(self, event):
+            try:
+                callback(*args)
+            except Exception:
+                EPISODE_LOGGER.exception("Hook %s failed for event %s", callback, event)
+
+
+# Hooks of every Episode app and Session in the process
+HOOKS = Hooks()
@@ -0,0 +1,137 @@
+import hashlib
+import threading
+import zlib
+from collections import OrderedDict
+
+COMPRESSIBLE_TYPES = (
+    "text/",
+    "application/json",
+    "application/javascript",
+    "application/xml",
+    "image/svg+xml",
+)
+
+# zlib window bits selecting the container of each content coding
+ENCODINGS = {"gzip": 31, "deflate": 15}
+
+
+def accepted_codings(accept_encoding):
+    """Quality of each coding listed in an `Accept-Encoding` value."""
+    accepted = {}
+    for item in accept_encoding.split(","):
+        coding, _, params = item.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[coding.strip().lower()] = quality
+    return accepted
+
+
+def accepts(accept_encoding, coding):
+    """Whether `coding` is acceptable, `gzip;q=0` refuses it."""
+    if not accept_encoding:
+        return False
+    accepted = accepted_codings(accept_encoding)
+    return accepted.get(coding, accepted.get("*", 0)) > 0
+
+
+class Compressor:
+    """Negotiated gzip/deflate compression of serialized responses.
+
+    Bodies smaller than `min_size` bytes, of a type not in
+    `content_types`, or already encoded are sent as they are. Compressed
+    bodies are kept in an LRU cache of up to `cache_size` entries and
+    `cache_bytes` compressed bytes, keyed by the body digest, so pages
+    that render the same bytes on every request, such as static
+    templates, are only compressed once. Dynamic bodies pass through the
+    cache without growing it past those bounds.
+    """
+
+    def __init__(
+        self,
+        min_size=1024,
+        level=6,
+        content_types=COMPRESSIBLE_TYPES,
+        cache_size=128,
+        cache_bytes=4 * 1024 * 1024,
+    ):
+        self.min_size = min_size
+        self.level = level
+        self.content_types = content_types
+        self.cache_size = cache_size
+        self.cache_bytes = cache_bytes
+        self._cache = OrderedDict()
+        self._cached_bytes = 0
+        self._lock = threading.Lock()
+
+    def negotiate(self, accept_encoding):
+        """Return the coding to use for an `Accept-Encoding` value, or None."""
+        if not accept_encoding:
+            return None
+
+        accepted = accepted_codings(accept_encoding)
+        best, best_quality = None, 0
+        # The client's highest q wins, ties go to the order of ENCODINGS
+        for coding in ENCODINGS:
+            quality = accepted.get(coding, accepted.get("*", 0))
+            if quality > best_quality:
+                best, best_quality = coding, quality
+        return best
+
+    def compress(self, request, response):
+        head, separator, body = response.partition(b"\r\n\r\n")
+        if not separator or len(body) < self.min_size:
+            return response
+
+        headers = head.lower()
+        if b"\r\ncontent-encoding:" in headers:
+            return response
+        content_type = headers.partition(b"\r\ncontent-type:")[2].split(b"\r\n", 1)[0]
+        if not any(t.encode() in content_type for t in self.content_types):
+            return response
+
+        coding = self.negotiate(request.header("Accept-Encoding"))
+        if coding is None:
+            return response
+
+        body = self.encode(body, coding)
+        extra_headers = f"\r\nContent-Encoding: {coding}\r\nVary: Accept-Encoding"
+        if b"\r\ncontent-length:" in headers:
+            head = b"\r\n".join(
+                line
+                for line in head.split(b"\r\n")
+                if not line.lower().startswith(b"content-length:")
+            )
+            extra_headers += f"\r\nContent-Length: {len(body)}"
+
+        return b"".join([head, extra_headers.encode(), separator, body])
+
+    def encode(self, body, coding):
+        key = (coding, hashlib.blake2b(body, digest_size=16).digest())
+        with self._lock:
+            encoded = self._cache.get(key)
+            if encoded is not None:
+                self._cache.move_to_end(key)
+                return encoded
+
+        compressor = zlib.compressobj(self.level, zlib.DEFLATED, ENCODINGS[coding])
+        encoded = compressor.compress(body) + compressor.flush()
+
+        if len(encoded) > self.cache_bytes:
+            return encoded
+        with self._lock:
+            previous = self._cache.pop(key, None)
+            if previous is not None:
+                self._cached_bytes -= len(previous)
+            self._cache[key] = encoded
+            self._cached_bytes += len(encoded)
+            while (
+                len(self._cache) > self.cache_size
+                or self._cached_bytes > self.cache_bytes
+            ):
+                self._cached_bytes -= len(self._cache.popitem(last=False)[1])
+        return encoded
@@ -0,0 +1,118 @@
+import errno
+import os
+
+from episode.http.httpresponse import HttpResponse
+from episode.http.httpstatus import HTTPStatus
+
+
+# sendfile errors meaning the file or socket doesn't support it
+SENDFILE_UNSUPPORTED = (errno.EINVAL, errno.ENOSYS, errno.EOPNOTSUPP)
+
+
+class FileResponse:
+    """A response whose body is a byte range of an open file.
+
+    The status line and headers are serialized up front; the body is
+    written by the server straight from the file descriptor with
+    `os.sendfile`, falling back to a memory map where sendfile is not
+    available, so file contents never pass through Python strings.
+    """
+
+    def __init__(
+        self,
+        open_file=None,
+        offset=0,
+        count=0,
+        extra_headers=None,
+        status_code=HTTPStatus.OK,
+        content_type="application/octet-stream",
+    ):
+        self.file = open_file
+        self.offset = offset
+        self.count = count
+        self.status_code = status_code
+
+        response = HttpResponse()
+        self.head = b"".join(
+            [
+                response.response_line(status_code),
+                response.response_headers(content_type, extra_headers),
+                b"\r\n",
+            ]
+        )
+
+    def send(self, sock):
+        try:
+            sock.sendall(self.head)
+            if self.file is not None and self.count:
+                try:
+                    self.sendfile(sock)
+                except AttributeError:
+                    # No os.sendfile on this platform
+                    self.send_mapped(sock)
+                except OSError as e:
+                    if e.errno not in SENDFILE_UNSUPPORTED:
+                        raise
+                    self.send_mapped(sock)
+        finally:
+            self.close()
+
+    def send_some(self, sock):
+        """Write to a non-blocking socket what it takes, True once done.
+
+        Called again each time the socket is writable; the server closes
+        the response when it is done with the connection.
+        """
+        if self.head:
+            try:
+                sent = sock.send(self.head)
+            except BlockingIOError:
+                return False
+            self.head = self.head[sent:]
+            if self.head:
+                return False
+
+        if self.file is None or not self.count:
+            return True
+
+        try:
+            # Returns once everything is sent or the file ends
+            self.sendfile(sock)
+            return True
+        except BlockingIOError:
+            return False
+        except (AttributeError, OSError) as e:
+            if isinstance(e, OSError) and e.errno not in SENDFILE_UNSUPPORTED:
+                raise
+            view = memoryview(self.file.mapped())
+            try:
+                sent = sock.send(view[self.offset : self.offset + self.count])
+            except BlockingIOError:
+                return False
+            finally:
+                view.release()
+            self.offset += sent
+            self.count -= sent
+        return not self.count
+
+    def sendfile(self, sock):
+        # Progress is kept on the response so a fallback resumes from it
+        while self.count:
+            sent = os.sendfile(sock.fileno(), self.file.fd, self.offset, self.count)
+            if sent == 0:
+                break
+            self.offset += sent
+            self.count -= sent
+
+    def send_mapped(self, sock):
+        view = memoryview(self.file.mapped())
+        try:
+            sock.sendall(view[self.offset : self.offset + self.count])
+        finally:
+            view.release()
+
+    def close(self):
+        if self.file is not None:
+            self.file.release()
+            self.file = None
+
@@ -1,19 +1,68 @@
+from urllib.parse import parse_qsl
+
+
+class QueryDict(dict):
+    """Query string parameters, parsed with `urllib.parse` semantics.
+
+    Indexing gives the last value of a key, `getlist` all of them in the
+    order they were given.
+    """
+
+    def __init__(self, query_string=""):
+        super().__init__()
+        self._lists = {}
+        for key, value in parse_qsl(query_string, keep_blank_values=True):
+            self._lists.setdefault(key, []).append(value)
+            super().__setitem__(key, value)
+
+    def __setitem__(self, key, value):
+        self._lists[key] = [value]
+        super().__setitem__(key, value)
+
+    def __delitem__(self, key):
+        del self._lists[key]
+        super().__delitem__(key)
+
+    def getlist(self, key, default=None):
+        return list(self._lists.get(key, [] if default is None else default))
+
+
 class HttpRequest:
     def __init__(self, data):
         self.method = None
         self.uri = None
+        self.path = ""
+        self.query_string = ""
         self.headers = dict()
         self.body = None
         self.http_version = (
             "1.1"
         )
         self.route_parameters = dict()
-        self.query_parameters = dict()
+        # Template of the matched route, set by Episode
+        self.route = None
+        self._query_parameters = None
 
         self.parse(data)
 
+    @property
+    def query_parameters(self):
+        # Parsed on first use, most handlers never look at the query
+        if self._query_parameters is None:
+            self._query_parameters = QueryDict(self.query_string)
+        return self._query_parameters
+
+    @query_parameters.setter
+    def query_parameters(self, value):
+        self._query_parameters = value
+
     def parse(self, data):
-        lines = data.split(b"\r\n")
+        head, separator, body = data.partition(b"\r\n\r\n")
+        if separator:
+            # Everything after the blank line, a body can span many lines
+            self.body = body
+
+        lines = head.split(b"\r\n")
 
         request_line = lines[0]
 
@@ -23,13 +72,13 @@ class HttpRequest:
 
         if len(words) > 1:
             self.uri = words[1].decode()
+            self.path, _, self.query_string = self.uri.partition("?")
 
         if len(words) > 2:
             self.http_version = words[2]
 
-        # Parse request_headers and body
-        headers = lines[1:]
-        for index, data in enumerate(headers):
+        # Parse request_headers
+        for data in lines[1:]:
             if data:
                 header_key, *header_values = data.decode().split(" ")
                 header_key = header_key.rstrip(":")
@@ -37,11 +86,20 @@ class HttpRequest:
                 if len(header_values) > 1:
                     header_values = [" ".join(header_values)]
                 self.headers[header_key] = header_values
+
+    def header(self, name, default=None):
+        """Return the value of header `name`, matched case-insensitively."""
+        values = self.headers.get(name)
+        if values is None:
+            lowered = name.lower()
+            for header_key, header_values in self.headers.items():
+                if header_key.lower() == lowered:
+                    values = header_values
+                    break
             else:
-                # Gotten to the blank line that separates the request header and body
-                # Extract the request body
-                self.body = headers[index + 1]
-                break
+                return default
+
+        return " ".join(values)
 
     # TODO
     # Handle parsing error (client request error)
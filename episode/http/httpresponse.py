@@ -39,10 +39,13 @@ class HttpResponse:
         The `extra_headers` can be a dict for sending
         extra headers for the current response
         """
-        self.headers.update(
-            {"Content-Type": self.content_types.get(content_type, "text/plain")}
-        )
-        headers_copy = self.headers.copy()
+        # Short names map to a media type, a full media type is used as is
+        default_type = content_type if "/" in content_type else "text/plain"
+        # A new dict, responses are written concurrently by worker threads
+        headers_copy = {
+            **type(self).headers,
+            "Content-Type": self.content_types.get(content_type, default_type),
+        }
 
         if extra_headers:
             headers_copy.update(extra_headers)
@@ -0,0 +1,69 @@
+import datetime
+import json
+from collections.abc import Iterator
+
+from episode.http.httpresponse import HttpResponse
+from episode.http.httpstatus import HTTPStatus
+from episode.model import Model, RelationProxy
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def serialize(obj):
+    """`default` hook of the encoders for values JSON has no type for."""
+    if isinstance(obj, RelationProxy):
+        obj = obj.load()
+    if isinstance(obj, Model):
+        return obj.to_dict()
+    if isinstance(obj, (datetime.date, datetime.time)):
+        return obj.isoformat()
+    if isinstance(obj, (set, frozenset, tuple)):
+        return list(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+class StdlibJsonEncoder:
+    def __init__(self):
+        self._encoder = json.JSONEncoder(
+            default=serialize, ensure_ascii=False, separators=(",", ":")
+        )
+
+    def __call__(self, data):
+        return self._encoder.encode(data).encode()
+
+
+class OrjsonEncoder:
+    def __call__(self, data):
+        return orjson.dumps(data, default=serialize)
+
+
+class JsonResponse(HttpResponse):
+    """A response with `data` encoded as JSON.
+
+        return JsonResponse().write(session.exec(stmt))
+
+    Models, and lists of them, are encoded straight from their field
+    values through `Model.to_dict`. The encoder is any callable returning
+    bytes; orjson is used when installed, the stdlib `json` otherwise.
+    Set `JsonResponse.encoder` to change it for every response.
+    """
+
+    encoder = OrjsonEncoder() if orjson is not None else StdlibJsonEncoder()
+
+    def __init__(self, encoder=None):
+        if encoder is not None:
+            self.encoder = encoder
+
+    def write(self, data, extra_headers=None, status_code=HTTPStatus.OK):
+        if isinstance(data, Iterator):
+            # Query results are generators
+            data = list(data)
+        return super().write(
+            self.encoder(data),
+            extra_headers=extra_headers,
+            status_code=status_code,
+            content_type="json",
+        )
@@ -0,0 +1,106 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from episode.http.httpresponse import HttpResponse
+from episode.http.httpstatus import HTTPStatus
+
+
+class CachedResponse:
+    __slots__ = ("path", "expires", "etag", "head", "response")
+
+    def __init__(self, path, expires, etag, head, response):
+        self.path = path
+        self.expires = expires
+        self.etag = etag
+        self.head = head
+        self.response = response
+
+
+class ResponseCache:
+    """Serialized responses of routes registered with `cache=ttl`.
+
+    Entries are keyed by path, query string and the values of the
+    `vary` request headers, and hold the final response bytes with a
+    strong ETag computed from the body, so a hit is a dict lookup and a
+    matching `If-None-Match` is answered with 304 and no body. Only 200
+    responses to GET and HEAD are stored.
+    """
+
+    def __init__(self, vary=(), max_entries=1024):
+        self.vary = vary
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def make_key(self, request, path, *extra):
+        headers = tuple(request.header(name) for name in self.vary)
+        return (path, request.query_string, headers, *extra)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry.expires <= time.monotonic():
+                del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def set(self, key, response, ttl):
+        """Store `response` bytes for `ttl` seconds and return the entry.
+
+        Returns None for responses that are not cacheable.
+        """
+        if not isinstance(response, bytes) or not response.startswith(b"HTTP/1.1 200 "):
+            return None
+
+        head, _, body = response.partition(b"\r\n\r\n")
+        if b"\r\netag:" in head.lower():
+            return None
+
+        etag = f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+        head = b"".join([head, f"\r\nETag: {etag}".encode(), b"\r\n\r\n"])
+        entry = CachedResponse(key[0], time.monotonic() + ttl, etag, head, head + body)
+
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def respond(self, request, entry):
+        if_none_match = request.header("If-None-Match")
+        if if_none_match is not None:
+            etags = [etag.strip() for etag in if_none_match.split(",")]
+            if "*" in etags or entry.etag in etags:
+                return HttpResponse().write(
+                    b"",
+                    extra_headers={"ETag": entry.etag},
+                    status_code=HTTPStatus.NOT_MODIFIED,
+                )
+
+        if request.method == "HEAD":
+            return entry.head
+        return entry.response
+
+    def invalidate(self, path=None):
+        """Drop the entries of `path` (every query and header variant),
+        or every entry when no path is given.
+        """
+        with self._lock:
+            if path is None:
+                self._entries.clear()
+                return
+
+            path = path.rstrip("/")
+            for key in [k for k, entry in self._entries.items() if entry.path == path]:
+                del self._entries[key]
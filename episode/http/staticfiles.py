@@ -0,0 +1,269 @@
+import mimetypes
+import mmap
+import os
+import threading
+from collections import OrderedDict
+from email.utils import formatdate, parsedate_to_datetime
+
+from episode.http.compression import accepts
+from episode.http.fileresponse import FileResponse
+from episode.http.httpresponse import HttpResponse
+from episode.http.httpstatus import HTTPStatus
+
+
+def gzip_etag(etag):
+    # The `.gz` variant is a different representation of the same file
+    return f'{etag[:-1]}-gz"'
+
+
+class OpenFile:
+    """A cached file descriptor with the metadata needed to serve it.
+
+    Responses hold a reference while they send; a file evicted from the
+    cache is only closed once the last response using it is done.
+    """
+
+    def __init__(self, path, stat):
+        self.path = path
+        self.fd = os.open(path, os.O_RDONLY)
+        self.size = stat.st_size
+        self.mtime_ns = stat.st_mtime_ns
+        self.etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+        self.last_modified = formatdate(stat.st_mtime, usegmt=True)
+        self.content_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+        self._mapped = None
+        self._refs = 1  # the cache reference
+        self._lock = threading.Lock()
+
+    def is_current(self, stat):
+        return stat.st_mtime_ns == self.mtime_ns and stat.st_size == self.size
+
+    def mapped(self):
+        with self._lock:
+            if self._mapped is None:
+                self._mapped = mmap.mmap(self.fd, 0, access=mmap.ACCESS_READ)
+            return self._mapped
+
+    def acquire(self):
+        with self._lock:
+            self._refs += 1
+        return self
+
+    def release(self):
+        with self._lock:
+            self._refs -= 1
+            if self._refs:
+                return
+            if self._mapped is not None:
+                self._mapped.close()
+                self._mapped = None
+            os.close(self.fd)
+
+
+class StaticFiles:
+    """Route handler serving the files under `directory`.
+
+    Registered with `Episode.static`. File descriptors are kept open in an
+    LRU cache of `max_open_files` entries and revalidated with one `stat`
+    per request. Supports conditional GETs (ETag / Last-Modified), single
+    byte `Range` requests, HEAD, and precompressed `.gz` variants when
+    `precompressed` is on and the client accepts gzip.
+    """
+
+    def __init__(
+        self,
+        directory,
+        max_open_files=256,
+        cache_control="public, max-age=3600",
+        precompressed=True,
+    ):
+        self.directory = os.path.realpath(directory)
+        self.max_open_files = max_open_files
+        self.cache_control = cache_control
+        self.precompressed = precompressed
+        self._files = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __call__(self, request, filepath: str):
+        if request.method not in ("GET", "HEAD"):
+            return HttpResponse().write(
+                f"<h1>Request method {request.method} is not allowed.<h1>".encode(),
+                extra_headers={"Allow": "GET, HEAD"},
+                status_code=HTTPStatus.METHOD_NOT_ALLOWED,
+            )
+
+        path = self.resolve(filepath)
+        open_file = self.open(path) if path else None
+        if open_file is None:
+            return HttpResponse().write(
+                b"<h1>404 Not Found</h1>", status_code=HTTPStatus.NOT_FOUND
+            )
+
+        try:
+            return self.respond(request, open_file)
+        except Exception:
+            open_file.release()
+            raise
+
+    def resolve(self, filepath):
+        path = os.path.realpath(os.path.join(self.directory, filepath))
+        # Never serve anything outside the directory, e.g. through `..`
+        if not path.startswith(self.directory + os.sep):
+            return None
+        return path
+
+    def open(self, path):
+        """Return the cached OpenFile for `path` with a reference taken."""
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        if not os.path.isfile(path):
+            return None
+
+        with self._lock:
+            open_file = self._files.get(path)
+            if open_file is not None and open_file.is_current(stat):
+                self._files.move_to_end(path)
+                return open_file.acquire()
+
+            if open_file is not None:
+                del self._files[path]
+                open_file.release()
+
+            try:
+                open_file = OpenFile(path, stat)
+            except OSError:
+                return None
+            self._files[path] = open_file
+
+            while len(self._files) > self.max_open_files:
+                _, evicted = self._files.popitem(last=False)
+                evicted.release()
+
+            return open_file.acquire()
+
+    def respond(self, request, open_file):
+        headers = {
+            "ETag": open_file.etag,
+            "Last-Modified": open_file.last_modified,
+            "Accept-Ranges": "bytes",
+        }
+        if self.cache_control:
+            headers["Cache-Control"] = self.cache_control
+
+        if self.not_modified(request, open_file):
+            open_file.release()
+            return FileResponse(
+                extra_headers=headers,
+                status_code=HTTPStatus.NOT_MODIFIED,
+                content_type=open_file.content_type,
+            )
+
+        content_type = open_file.content_type
+        compressed = self.open_precompressed(request, open_file)
+        if compressed is not None:
+            # Ranges of the encoded variant are not supported, send it whole
+            open_file.release()
+            open_file = compressed
+            headers["Content-Encoding"] = "gzip"
+            headers["Vary"] = "Accept-Encoding"
+            headers["ETag"] = gzip_etag(headers["ETag"])
+            byte_range = None
+        else:
+            byte_range = self.byte_range(request, open_file)
+
+        status_code = HTTPStatus.OK
+        offset, count = 0, open_file.size
+        if byte_range == "unsatisfiable":
+            open_file.release()
+            headers["Content-Range"] = f"bytes */{open_file.size}"
+            return HttpResponse().write(
+                b"",
+                extra_headers=headers,
+                status_code=HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE,
+            )
+        elif byte_range is not None:
+            start, end = byte_range
+            status_code = HTTPStatus.PARTIAL_CONTENT
+            offset, count = start, end - start + 1
+            headers["Content-Range"] = f"bytes {start}-{end}/{open_file.size}"
+
+        headers["Content-Length"] = str(count)
+        if request.method == "HEAD":
+            count = 0
+
+        return FileResponse(
+            open_file,
+            offset=offset,
+            count=count,
+            extra_headers=headers,
+            status_code=status_code,
+            content_type=content_type,
+        )
+
+    def not_modified(self, request, open_file):
+        if_none_match = request.header("If-None-Match")
+        if if_none_match is not None:
+            etags = [etag.strip() for etag in if_none_match.split(",")]
+            return (
+                "*" in etags
+                or open_file.etag in etags
+                or gzip_etag(open_file.etag) in etags
+            )
+
+        if_modified_since = request.header("If-Modified-Since")
+        if if_modified_since:
+            try:
+                since = parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError):
+                return False
+            return open_file.mtime_ns // 1_000_000_000 <= since
+
+        return False
+
+    def open_precompressed(self, request, open_file):
+        if not self.precompressed:
+            return None
+        if not accepts(request.header("Accept-Encoding"), "gzip"):
+            return None
+        return self.open(f"{open_file.path}.gz")
+
+    def byte_range(self, request, open_file):
+        """Return `(start, end)` of a single byte range, None for the whole file."""
+        range_header = request.header("Range")
+        if not range_header or not range_header.startswith("bytes="):
+            return None
+
+        if_range = request.header("If-Range")
+        if if_range is not None and if_range != open_file.etag:
+            return None
+
+        ranges = range_header[len("bytes="):].split(",")
+        if len(ranges) != 1:
+            # Multipart ranges are not supported, the whole file is sent
+            return None
+
+        start, _, end = ranges[0].strip().partition("-")
+        size = open_file.size
+        try:
+            if not start:
+                # Suffix range: the last `end` bytes
+                length = int(end)
+                if length <= 0:
+                    return "unsatisfiable"
+                return max(size - length, 0), size - 1
+            start = int(start)
+            end = int(end) if end else size - 1
+        except ValueError:
+            return None
+
+        if start >= size or start > end:
+            return "unsatisfiable"
+        return start, min(end, size - 1)
+
+    def close(self):
+        with self._lock:
+            for open_file in self._files.values():
+                open_file.release()
+            self._files.clear()
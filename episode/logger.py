@@ -1,6 +1,10 @@
+import atexit
 import logging
 import os
+import queue
 import sys
+import threading
+from logging.handlers import QueueHandler
 
 # Define our log-level constants
 CRITICAL = logging.CRITICAL  # 50
@@ -16,41 +20,223 @@ LOGFILE_FORMAT = (
     "%(name)-10s %(levelname)-7s %(message)s"
 )
 
+LOG_QUEUE_SIZE = 10000
+LOG_BATCH_SIZE = 256
+
+
+class BatchedFlush:
+    """Handler mixin leaving flushes to the LogListener, once per batch."""
+
+    def flush(self):
+        pass
+
+    def flush_batch(self):
+        super().flush()
+
+
+class BatchedStreamHandler(BatchedFlush, logging.StreamHandler):
+    pass
+
+
+class BatchedFileHandler(BatchedFlush, logging.FileHandler):
+    pass
+
+
+class DroppingQueueHandler(QueueHandler):
+    """Puts records on a bounded queue without ever blocking the caller.
+
+    Records that don't fit are dropped and counted in `dropped`. Records
+    are queued as they are: the message is only formatted by the
+    listener thread.
+
+    With a `listener`, the level follows the lowest level of its
+    handlers, so records none of them writes are not even queued.
+    """
+
+    def __init__(self, log_queue, listener=None):
+        # Set first, Handler.__init__ sets the level
+        self.listener = listener
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    @property
+    def level(self):
+        # Read on every record, so handlers added, removed or given a new
+        # level later are taken into account
+        if self.listener is not None:
+            level = self.listener.level
+            if level is not None:
+                return level
+        return self._level
+
+    @level.setter
+    def level(self, level):
+        self._level = level
+
+    def prepare(self, record):
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class LogListener:
+    """Background thread writing queued records to its handlers.
+
+    Records are taken off the queue in batches of up to `batch_size` and
+    the handlers are flushed once per batch.
+    """
+
+    _stop = object()
+
+    def __init__(self, log_queue, batch_size=LOG_BATCH_SIZE):
+        self.queue = log_queue
+        self.batch_size = batch_size
+        self.handlers = ()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def add_handler(self, handler):
+        with self._lock:
+            # Replaced rather than mutated, the writer thread reads it unlocked
+            self.handlers = (*self.handlers, handler)
+
+    def remove_handler(self, handler):
+        with self._lock:
+            self.handlers = tuple(h for h in self.handlers if h is not handler)
+
+    @property
+    def level(self):
+        """The lowest level any handler writes, or None without handlers."""
+        levels = [handler.level for handler in self.handlers]
+        return min(levels) if levels else None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self.run, name="episode-logger", daemon=True
+            )
+            self._thread.start()
+
+    def stop(self):
+        if self._thread is not None:
+            self.queue.put(self._stop)
+            self._thread.join()
+            self._thread = None
+
+    def restart_after_fork(self):
+        """Start a writer thread in a forked child process.
+
+        The parent's thread doesn't survive the fork. Records it had
+        queued are dropped, the parent writes them.
+        """
+        self._lock = threading.Lock()
+        while True:
+            try:
+                self.queue.get_nowait()
+            except queue.Empty:
+                break
+        self._thread = None
+        self.start()
+
+    def run(self):
+        while True:
+            batch = [self.queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            stopping = False
+            written = set()
+            handlers = self.handlers
+            for record in batch:
+                if record is self._stop:
+                    stopping = True
+                    continue
+                for handler in handlers:
+                    if record.levelno >= handler.level:
+                        handler.handle(record)
+                        written.add(handler)
+            for handler in written:
+                getattr(handler, "flush_batch", handler.flush)()
+
+            if stopping:
+                return
+
 
 def _initial_setup():
     episode_logger = logging.getLogger(LOGGER_NAME)
 
     episode_logger.setLevel(DEBUG)
-    stdout_handler = logging.StreamHandler(sys.stdout)
+    stdout_handler = BatchedStreamHandler(sys.stdout)
     stdout_formatter = logging.Formatter("%(message)s")
     stdout_handler.setFormatter(stdout_formatter)
     stdout_handler.setLevel(INFO)
-    episode_logger.addHandler(stdout_handler)
+
+    # Request threads only queue records, a background thread writes them
+    log_listener = LogListener(queue.Queue(LOG_QUEUE_SIZE))
+    log_listener.add_handler(stdout_handler)
+    log_listener.start()
+    atexit.register(log_listener.stop)
+
+    queue_handler = DroppingQueueHandler(log_listener.queue, log_listener)
+    episode_logger.addHandler(queue_handler)
     episode_logger.propagate = False
 
-    return episode_logger, stdout_handler
+    return episode_logger, stdout_handler, queue_handler, log_listener
+
+
+EPISODE_LOGGER, STDOUT_HANDLER, QUEUE_HANDLER, LOG_LISTENER = _initial_setup()
+
+
+def add_log_handler(handler):
+    """Write EPISODE_LOGGER records to `handler` from the listener thread."""
+    LOG_LISTENER.add_handler(handler)
+
+
+# File handlers installed by configure_file_logger, by path and logger name
+FILE_HANDLERS = {}
+_FILE_HANDLERS_LOCK = threading.Lock()
+
 
+def configure_file_logger(
+    filename=LOGFILE_NAME, filepath="./", level=DEBUG, logger_name=None
+):
+    """Also write EPISODE_LOGGER records to a file.
 
-EPISODE_LOGGER, STDOUT_HANDLER = _initial_setup()
+    With `logger_name` only the records of that logger (or its children)
+    are written. Calling it again for the same file returns the handler
+    installed the first time.
+    """
+    logfile_path = os.path.abspath(os.path.join(filepath, filename))
 
+    with _FILE_HANDLERS_LOCK:
+        file_handler = FILE_HANDLERS.get((logfile_path, logger_name))
+        if file_handler is not None:
+            return file_handler
 
-def configure_file_logger(filename=LOGFILE_NAME, filepath="./", level=DEBUG):
-    logfile_path = os.path.join(filepath, filename)
+        try:
+            file_handler = BatchedFileHandler(logfile_path, encoding="utf-8")
+        except IOError as err:
+            # If we cannot open the logfile for any reason just continue
+            # regardless, but log the error (it will go to stdout).
+            EPISODE_LOGGER.error(
+                "Cannot open log file at %s for writing: %s", logfile_path, err
+            )
+            return None
 
-    try:
-        file_handler = logging.FileHandler(logfile_path, encoding="utf-8")
-    except IOError as err:
-        # If we cannot open the logfile for any reason just continue
-        # regardless, but log the error (it will go to stdout).
-        EPISODE_LOGGER.error(
-            "Cannot open log file at %s for writing: %s", logfile_path, err
-        )
-        return None
-    else:
         file_handler.setLevel(level)
         formatter = logging.Formatter(LOGFILE_FORMAT)
         file_handler.setFormatter(formatter)
-        EPISODE_LOGGER.addHandler(file_handler)
+        if logger_name is not None:
+            file_handler.addFilter(logging.Filter(logger_name))
+        add_log_handler(file_handler)
+        FILE_HANDLERS[(logfile_path, logger_name)] = file_handler
 
-        EPISODE_LOGGER.debug("Enabled logging to file: %s", logfile_path)
-        return file_handler
+    EPISODE_LOGGER.debug("Enabled logging to file: %s", logfile_path)
+    return file_handler
@@ -0,0 +1,281 @@
+import threading
+import time
+from bisect import bisect_left
+
+from episode.template_engine import TEMPLATE_CACHE
+
+# Upper bounds in seconds, the +Inf bucket is implicit
+DEFAULT_BUCKETS = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+
+def format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def format_labels(names, values, extra=None):
+    pairs = [f'{name}="{escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(f'{extra[0]}="{extra[1]}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class PerThread:
+    """Metric values sharded per thread.
+
+    Each thread updates its own dict without a lock; the shards are only
+    merged when the metrics are collected.
+    """
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._local = threading.local()
+        self._shards = []
+        self._lock = threading.Lock()
+
+    def shard(self):
+        try:
+            return self._local.shard
+        except AttributeError:
+            shard = self._local.shard = {}
+            with self._lock:
+                self._shards.append(shard)
+            return shard
+
+    def merged(self, size):
+        totals = {}
+        with self._lock:
+            shards = list(self._shards)
+        for shard in shards:
+            # dict.copy is atomic, the owning thread may be writing to it
+            for labels, values in shard.copy().items():
+                total = totals.setdefault(labels, [0] * size)
+                for index in range(size):
+                    total[index] += values[index]
+        return totals
+
+
+class Counter(PerThread):
+    type = "counter"
+
+    def inc(self, labels=(), amount=1):
+        shard = self.shard()
+        values = shard.get(labels)
+        if values is None:
+            values = shard[labels] = [0]
+        values[0] += amount
+
+    def collect(self):
+        for labels, (value,) in sorted(self.merged(1).items()):
+            label_text = format_labels(self.labelnames, labels)
+            yield f"{self.name}{label_text} {format_value(value)}"
+
+
+class Histogram(PerThread):
+    """Fixed-bucket histogram of observed values, e.g. durations."""
+
+    type = "histogram"
+
+    def __init__(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, labels=()):
+        shard = self.shard()
+        values = shard.get(labels)
+        if values is None:
+            # One count per bucket, the +Inf bucket, then the sum
+            values = shard[labels] = [0] * (len(self.buckets) + 2)
+        values[bisect_left(self.buckets, value)] += 1
+        values[-1] += value
+
+    def time(self, labels=()):
+        return Timer(self, labels)
+
+    def collect(self):
+        size = len(self.buckets) + 2
+        for labels, values in sorted(self.merged(size).items()):
+            cumulative = 0
+            for bound, count in zip((*self.buckets, float("inf")), values):
+                cumulative += count
+                label_text = format_labels(
+                    self.labelnames, labels, ("le", format_value(bound))
+                )
+                yield f"{self.name}_bucket{label_text} {cumulative}"
+            label_text = format_labels(self.labelnames, labels)
+            yield f"{self.name}_sum{label_text} {format_value(values[-1])}"
+            yield f"{self.name}_count{label_text} {cumulative}"
+
+
+class Timer:
+    __slots__ = ("histogram", "labels", "started")
+
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        self.histogram.observe(time.perf_counter() - self.started, self.labels)
+
+
+class Gauge:
+    """A value read from `callback` when the metrics are collected.
+
+    The callback returns a number, or a dict of label values tuples to
+    numbers. `type` may be "counter" for totals kept elsewhere.
+    """
+
+    def __init__(self, name, help, callback, labelnames=(), type="gauge"):
+        self.name = name
+        self.help = help
+        self.callback = callback
+        self.labelnames = tuple(labelnames)
+        self.type = type
+
+    def collect(self):
+        values = self.callback()
+        if not isinstance(values, dict):
+            values = {(): values}
+        for labels, value in sorted(values.items()):
+            label_text = format_labels(self.labelnames, labels)
+            yield f"{self.name}{label_text} {format_value(value)}"
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def counter(self, name, help, labelnames=()):
+        return self.register(Counter(name, help, labelnames))
+
+    def histogram(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram(name, help, labelnames, buckets))
+
+    def gauge(self, name, help, callback, labelnames=(), type="gauge"):
+        return self.register(Gauge(name, help, callback, labelnames, type))
+
+    def collect(self):
+        for metric in self.metrics:
+            yield f"# HELP {metric.name} {metric.help}"
+            yield f"# TYPE {metric.name} {metric.type}"
+            yield from metric.collect()
+
+    def render(self):
+        """The metrics in the Prometheus text exposition format."""
+        return "\n".join(self.collect()) + "\n"
+
+
+# Process wide metrics, updated wherever the work happens
+METRICS = Registry()
+
+DB_QUERY_DURATION = METRICS.histogram(
+    "episode_db_query_duration_seconds",
+    "Duration of database queries run by Sessions.",
+    ("operation",),
+)
+
+
+class ServerMetrics(Registry):
+    """Metrics of an Episode app, see `Episode(metrics=True)`.
+
+    Requests are labeled by route template rather than raw path. The
+    app's metrics route serves these together with the process wide
+    METRICS. Connection pools to report are added with `track_pool`.
+    """
+
+    def __init__(self, app):
+        super().__init__()
+        self.pools = {}
+        self.request_duration = self.histogram(
+            "episode_http_request_duration_seconds",
+            "Time from parsing a request to its serialized response.",
+            ("route", "method", "status"),
+        )
+        self.gauge(
+            "episode_http_connections_open",
+            "Client connections currently open.",
+            lambda: app.open_connections,
+        )
+        self.gauge(
+            "episode_http_requests_in_flight",
+            "Requests running or waiting for a worker.",
+            lambda: app.admission.in_flight,
+        )
+        self.gauge(
+            "episode_http_requests_rejected_total",
+            "Requests answered with 503 by the admission controller.",
+            lambda: app.admission.rejected,
+            type="counter",
+        )
+        self.gauge(
+            "episode_template_cache_requests_total",
+            "Template cache lookups by result.",
+            lambda: {("hit",): TEMPLATE_CACHE.hits, ("miss",): TEMPLATE_CACHE.misses},
+            ("result",),
+            type="counter",
+        )
+        self.gauge(
+            "episode_response_cache_requests_total",
+            "Response cache lookups by result.",
+            lambda: {
+                ("hit",): app.response_cache.hits,
+                ("miss",): app.response_cache.misses,
+            },
+            ("result",),
+            type="counter",
+        )
+        self.gauge(
+            "episode_db_pool_connections",
+            "Database pool connections by state.",
+            self.pool_stats,
+            ("pool", "state"),
+        )
+
+    def track_pool(self, name, connection):
+        """Report the `pool_stats()` of a database connection as `name`."""
+        self.pools[name] = connection
+
+    def pool_stats(self):
+        return {
+            (name, state): value
+            for name, connection in self.pools.items()
+            for state, value in connection.pool_stats().items()
+        }
+
+    def observe_request(self, route, method, status, seconds):
+        self.request_duration.observe(seconds, (route, method, status))
+
+    def render(self):
+        return METRICS.render() + super().render()
@@ -1,16 +1,38 @@
 import copy
+import importlib
+import queue
+import re
 import sqlite3
-import pymongo
+import threading
+import time
 from abc import ABC, abstractmethod
+from contextlib import contextmanager
 from enum import Enum
 from itertools import count
 from typing import get_origin, get_args
+from .accesslog import timed
+from .hooks import HOOKS
 from .logger import configure_file_logger, EPISODE_LOGGER
-import mysql.connector
+from .metrics import DB_QUERY_DURATION
 
 counter = count()
 
 
+def import_driver(name, dbms):
+    """Import the driver module of `dbms`, when a connection needs it."""
+    try:
+        return importlib.import_module(name)
+    except ImportError as e:
+        raise Exception(
+            f"{dbms} connections need the '{name}' package, which is not installed"
+        ) from e
+
+
+def nosql_name(name):
+    # MongoDB stores the Model id as the document `_id`
+    return "_id" if name == "id" else name
+
+
 class Condition:
     def __init__(self, op, field, value):
         self.op = op
@@ -23,6 +45,75 @@ class Condition:
         return dbms.condition_to_sql(self.field, self.value, self.op)
 
 
+class OrderBy:
+    def __init__(self, name, descending=False):
+        self.name = name
+        self.descending = descending
+
+    @classmethod
+    def parse(cls, key):
+        """Accept an OrderBy, a Field, or a field name with `-` for descending."""
+        if isinstance(key, OrderBy):
+            return key
+        if isinstance(key, Field):
+            return cls(key.name)
+        if key.startswith("-"):
+            return cls(key[1:], descending=True)
+        return cls(key)
+
+
+class Aggregate:
+    function = None
+    nosql_function = None
+
+    def __init__(self, field=None):
+        self.field = field
+
+    def to_sql(self):
+        column = self.field.name if self.field is not None else "*"
+        return f"{self.function}({column})"
+
+    def to_nosql(self):
+        return {self.nosql_function: f"${nosql_name(self.field.name)}"}
+
+
+class Count(Aggregate):
+    function = "COUNT"
+
+    def to_nosql(self):
+        if self.field is None:
+            return {"$sum": 1}
+        # Like COUNT(column), skip documents where the field is null;
+        # null and missing values sort below every other BSON value
+        column = f"${nosql_name(self.field.name)}"
+        return {"$sum": {"$cond": [{"$gt": [column, None]}, 1, 0]}}
+
+
+class Sum(Aggregate):
+    function = "SUM"
+    nosql_function = "$sum"
+
+
+class Avg(Aggregate):
+    function = "AVG"
+    nosql_function = "$avg"
+
+
+class Min(Aggregate):
+    function = "MIN"
+    nosql_function = "$min"
+
+
+class Max(Aggregate):
+    function = "MAX"
+    nosql_function = "$max"
+
+
+AGGREGATES = {"count": Count, "sum": Sum, "avg": Avg, "min": Min, "max": Max}
+
+IDENTIFIER = re.compile(r"[A-Za-z_][A-Za-z0-9_]*\Z")
+
+
 class QueryBuilder(ABC):
 
     @abstractmethod
@@ -49,19 +140,199 @@ class QueryBuilder(ABC):
     def get_query_stmt(self):
         pass
 
+    def order_by(self, *keys):
+        """Order rows by `Student.age`, `Student.age.desc()`, "age" or "-age"."""
+        self._order.extend(OrderBy.parse(key) for key in keys)
+        return self
+
+    def offset(self, offset):
+        self.row_offset = offset
+        return self
+
+    def after(self, cursor):
+        """Keyset pagination: only return rows ordered after `cursor`.
+
+        `cursor` is the last Model of the previous page, or a tuple of its
+        order_by values followed by its id. Unlike `offset`, the database
+        seeks straight to the cursor, so every page costs the same.
+        """
+        self._cursor = cursor
+        return self
+
+    def ordering(self):
+        order = self.checked_order(self._order)
+        if self._cursor is not None and not order:
+            order.append(OrderBy("id"))
+        elif order and not any(key.name == "id" for key in order):
+            # Break ties on id, or rows with equal keys would be ordered
+            # differently from one page to the next
+            order.append(OrderBy("id", order[-1].descending))
+        return order
+
+    def checked_order(self, order, names=()):
+        """`order` as a new list, raising for keys that are not fields of
+        the model or one of `names`, they are written into the query.
+        """
+        for key in order:
+            if key.name not in self.model._cols and key.name not in names:
+                raise Exception(
+                    f"Cannot order by `{key.name}`, it is not a field of "
+                    f"`{self.model.__name__}`."
+                )
+        return list(order)
+
+    def cursor_values(self, order):
+        if isinstance(self._cursor, (Model, RelationProxy)):
+            values = [getattr(self._cursor, key.name) for key in order]
+        elif isinstance(self._cursor, (tuple, list)):
+            values = list(self._cursor)
+        else:
+            values = [self._cursor]
+
+        if len(values) != len(order):
+            raise Exception(
+                f"Cursor needs a value for each of {[key.name for key in order]}."
+            )
+        return [
+            value.id if isinstance(value, (Model, RelationProxy)) else value
+            for value in values
+        ]
+
+    def group_by(self, *fields):
+        for field in fields:
+            name = field.name if isinstance(field, Field) else field
+            if name not in self.model._cols:
+                raise Exception(
+                    f"Cannot group by `{name}`, it is not a field of "
+                    f"`{self.model.__name__}`."
+                )
+            self._group_by.append(name)
+        return self
+
+    def count(self):
+        """Number of matching rows, or a row per group with group_by."""
+        self.check_aggregate("count")
+        return self.get_session().count(self)
+
+    def aggregate(self, **aggregates):
+        """Compute aggregates in the database.
+
+            session.select(Student).aggregate(avg=Student.age)
+            session.select(Student).group_by(Student.age).aggregate(
+                students=Count(), oldest=Max(Student.age)
+            )
+
+        A keyword naming a function (count, sum, avg, min, max) takes a
+        field; any other keyword is an alias for an Aggregate. Returns a
+        dict, or a list of dicts holding the group columns with group_by.
+        """
+        self.check_aggregate("aggregate")
+        for alias, aggregate in aggregates.items():
+            # Written into the statement as `AS alias`
+            if not IDENTIFIER.match(alias):
+                raise Exception(f"Aggregate alias `{alias}` is not a valid name.")
+            if isinstance(aggregate, Field) and alias in AGGREGATES:
+                aggregates[alias] = AGGREGATES[alias](aggregate)
+            elif not isinstance(aggregate, Aggregate):
+                raise Exception(
+                    f"Aggregate `{alias}` must be an Aggregate or a field with "
+                    f"one of {', '.join(AGGREGATES)} as keyword."
+                )
+
+        return self.get_session().aggregate(self, aggregates)
+
+    def delete(self):
+        """Delete every matching row in one statement, returns the count."""
+        self.check_bulk_write("delete")
+        return self.get_session().bulk_delete(self)
+
+    def update(self, **values):
+        """Set `values` on every matching row in one statement.
+
+            session.select(Student).where(Student.age < 18).update(age=18)
+
+        Returns the number of updated rows.
+        """
+        self.check_bulk_write("update")
+        for name, value in values.items():
+            field = self.model._cols.get(name)
+            if field is None or name == "id":
+                raise Exception(
+                    f"`{name}` is not an updatable field of `{self.model.__name__}`."
+                )
+            field.validate(value)
+            if isinstance(value, (Model, RelationProxy)):
+                values[name] = value.id
+
+        return self.get_session().bulk_update(self, values)
+
+    def check_aggregate(self, operation):
+        # Without groups there is one result row, limit and offset apply
+        # to the groups only
+        if not self._group_by and (self.row_limit is not None or self.row_offset):
+            raise Exception(
+                f"`{operation}` covers every matching row, limit and offset "
+                f"only apply with group_by."
+            )
+
+    def check_bulk_write(self, operation):
+        # The statements have no LIMIT, they would write every matching row
+        if self.row_limit is not None or self.row_offset or self._order:
+            raise Exception(
+                f"`{operation}` writes every matching row, it cannot be "
+                f"combined with limit, offset or order_by."
+            )
+
+    def get_session(self):
+        if self.session is None:
+            raise Exception(
+                "Query was not created with `Session.select`, it cannot be run."
+            )
+        return self.session
+
+    def eager(self, *relations):
+        """Load the given relation fields, or all of them, with the rows."""
+        self.eager_relations.update(relations or self.model._relations)
+        return self
+
+    def lazy(self, *relations):
+        """Hydrate the given relation fields, or all of them, as proxies."""
+        if relations:
+            self.eager_relations.difference_update(relations)
+        else:
+            self.eager_relations.clear()
+        return self
+
+    def cache(self, ttl=None, enabled=True):
+        """Opt this query in or out of the session query cache.
+
+        `ttl` overrides the cache default for the rows of this query.
+        """
+        self.use_cache = enabled
+        self.cache_ttl = ttl
+        return self
+
 
 class SqlQueryBuilder(QueryBuilder):
-    def __init__(self, model, dbms):
+    def __init__(self, model, dbms, session=None):
         self.model = model
         self.dbms = dbms
+        self.session = session
         self._where_condition = None
         self._values = None
         self._columns = "*"
+        self._order = []
+        self._group_by = []
+        self._cursor = None
         self.row_limit = None
+        self.row_offset = None
+        self.use_cache = True
+        self.cache_ttl = None
+        self.eager_relations = set()
 
     def where(self, condition: Condition):
         where_sql, values = condition.to_sql(dbms=self.dbms)
-        self._where_condition = f"WHERE {where_sql}"
+        self._where_condition = where_sql
         self._values = values
         return self
     
@@ -88,24 +359,136 @@ class SqlQueryBuilder(QueryBuilder):
         self.row_limit = limit
         return self
     
+    def keyset_condition(self, order):
+        values = None
+        placeholders = []
+        for value in self.cursor_values(order):
+            placeholder, value = self.dbms.placeholder(value)
+            placeholders.append(placeholder)
+            values = self.concatenate_values(values, value)
+
+        if len({key.descending for key in order}) == 1:
+            # Row value comparison, served by an index on the order columns
+            op = "<" if order[0].descending else ">"
+            if len(order) == 1:
+                return f"{order[0].name} {op} {placeholders[0]}", values
+            columns = ", ".join(key.name for key in order)
+            return f"({columns}) {op} ({', '.join(placeholders)})", values
+
+        # Mixed directions: (a > ?) OR (a = ? AND b < ?) ...
+        clauses = []
+        for index, key in enumerate(order):
+            terms = [f"{order[i].name} = {placeholders[i]}" for i in range(index)]
+            op = "<" if key.descending else ">"
+            terms.append(f"{key.name} {op} {placeholders[index]}")
+            clauses.append(f"({' AND '.join(terms)})")
+        return f"({' OR '.join(clauses)})", values
+
+    def concatenate_values(self, val1, val2):
+        if val1 is None:
+            return val2
+        return self.dbms.concatenate_condition_values(val1, val2)
+
+    def where_clause(self):
+        conditions = []
+        values = self._values
+        if self._where_condition:
+            conditions.append(self._where_condition)
+
+        if self._cursor is not None:
+            keyset_sql, keyset_values = self.keyset_condition(self.ordering())
+            if conditions:
+                conditions[0] = f"({conditions[0]})"
+            conditions.append(keyset_sql)
+            values = self.concatenate_values(values, keyset_values)
+
+        if not conditions:
+            return "", values
+        return f"WHERE {' AND '.join(conditions)}", values
+
     def get_query_stmt(self):
         sql_stmt = f"SELECT {self._columns} FROM {self.model._name}"
 
-        if self._where_condition:
-            sql_stmt += f" {self._where_condition}"
+        where_sql, values = self.where_clause()
+        if where_sql:
+            sql_stmt += f" {where_sql}"
 
-        if self.row_limit:
-            sql_stmt += f" limit {self.row_limit}"
+        order = self.ordering()
+        if order:
+            sql_stmt += " ORDER BY %s" % ", ".join(
+                f"{key.name} {'DESC' if key.descending else 'ASC'}" for key in order
+            )
+
+        sql_stmt += self.limit_clause()
+
+        return sql_stmt, values
+
+    def limit_clause(self):
+        if self.row_offset:
+            return f" {self.dbms.limit_offset(self.row_limit, self.row_offset)}"
+        elif self.row_limit:
+            return f" limit {self.row_limit}"
+        return ""
+
+    def get_delete_stmt(self):
+        sql_stmt = f"DELETE FROM {self.model._name}"
+        where_sql, values = self.where_clause()
+        if where_sql:
+            sql_stmt += f" {where_sql}"
+        return sql_stmt, values
+
+    def get_update_stmt(self, values):
+        assignments = []
+        params = None
+        for name, value in values.items():
+            placeholder, value = self.dbms.placeholder(value)
+            assignments.append(f"{name} = {placeholder}")
+            params = self.concatenate_values(params, value)
+
+        sql_stmt = f"UPDATE {self.model._name} SET {', '.join(assignments)}"
+        where_sql, where_values = self.where_clause()
+        if where_sql:
+            sql_stmt += f" {where_sql}"
+            params = self.concatenate_values(params, where_values)
+        return sql_stmt, params
+
+    def get_aggregate_stmt(self, aggregates):
+        columns = self._group_by + [
+            f"{aggregate.to_sql()} AS {alias}" for alias, aggregate in aggregates.items()
+        ]
+        sql_stmt = f"SELECT {', '.join(columns)} FROM {self.model._name}"
+
+        where_sql, values = self.where_clause()
+        if where_sql:
+            sql_stmt += f" {where_sql}"
+
+        if self._group_by:
+            sql_stmt += f" GROUP BY {', '.join(self._group_by)}"
+            if self._order:
+                order = self.checked_order(self._order, aggregates)
+                sql_stmt += " ORDER BY %s" % ", ".join(
+                    f"{key.name} {'DESC' if key.descending else 'ASC'}"
+                    for key in order
+                )
+            sql_stmt += self.limit_clause()
 
-        return sql_stmt, self._values
+        return sql_stmt, values
 
 
 class NOSqlQueryBuilder(QueryBuilder):
-    def __init__(self, model):
+    def __init__(self, model, session=None):
         self.model = model
+        self.session = session
         self._where_condition = None
         self._columns = {}
+        self._order = []
+        self._group_by = []
+        self._cursor = None
         self.row_limit = None
+        self.row_offset = None
+        self.use_cache = True
+        self.cache_ttl = None
+        self.eager_relations = set()
     
     def where(self, condition: Condition):
         self._where_condition = condition.to_sql(is_nosql=True)
@@ -133,8 +516,59 @@ class NOSqlQueryBuilder(QueryBuilder):
         self.row_limit = limit
         return self
     
+    def keyset_condition(self, order):
+        values = self.cursor_values(order)
+        clauses = []
+        for index, key in enumerate(order):
+            clause = {nosql_name(order[i].name): values[i] for i in range(index)}
+            op = "$lt" if key.descending else "$gt"
+            clause[nosql_name(key.name)] = {op: values[index]}
+            clauses.append(clause)
+        return clauses[0] if len(clauses) == 1 else {"$or": clauses}
+
     def get_query_stmt(self):
-        return self._where_condition, self._columns, self.row_limit
+        query = self._where_condition
+        order = self.ordering()
+
+        if self._cursor is not None:
+            keyset = self.keyset_condition(order)
+            query = keyset if query is None else {"$and": [query, keyset]}
+
+        sort = [
+            (nosql_name(key.name), -1 if key.descending else 1) for key in order
+        ]
+        return query, self._columns, self.row_limit, sort, self.row_offset
+
+    def get_aggregate_pipeline(self, aggregates):
+        query = self.get_query_stmt()[0]
+        pipeline = [{"$match": query}] if query else []
+
+        group = {
+            "_id": {name: f"${nosql_name(name)}" for name in self._group_by} or None
+        }
+        group.update(
+            {alias: aggregate.to_nosql() for alias, aggregate in aggregates.items()}
+        )
+        pipeline.append({"$group": group})
+
+        # Lift the group columns out of `_id` so rows look like SQL rows
+        project = {"_id": 0}
+        project.update({name: f"$_id.{name}" for name in self._group_by})
+        project.update({alias: 1 for alias in aggregates})
+        pipeline.append({"$project": project})
+
+        if self._group_by:
+            if self._order:
+                order = self.checked_order(self._order, aggregates)
+                pipeline.append(
+                    {"$sort": {key.name: -1 if key.descending else 1 for key in order}}
+                )
+            if self.row_offset:
+                pipeline.append({"$skip": self.row_offset})
+            if self.row_limit:
+                pipeline.append({"$limit": self.row_limit})
+
+        return pipeline
 
 
 class Field:
@@ -145,21 +579,26 @@ class Field:
         self.is_nosql = False
 
     def __set__(self, instance, value):
+        self.validate(value)
+        instance._values[self.name] = value
+
+    def validate(self, value):
         type_args = get_args(self.py_type)
         type_origin = get_origin(self.py_type)
+        value_type = (
+            value._model if isinstance(value, RelationProxy) else type(value)
+        )
         if type_args and type_origin:
-            if type(value) is not type_args[0] and value is not None:
+            if value_type is not type_args[0] and value is not None:
                 msg: str = (
-                    f"Expected type of value {value} is `{type_args[0]}` but got `{type(value)}`."
+                    f"Expected type of value {value} is `{type_args[0]}` but got `{value_type}`."
                 )
                 raise Exception(msg)
-        elif type(value) is not self.py_type and value is not None:
+        elif value_type is not self.py_type and value is not None:
             msg: str = (
-                f"Expected type of value {value} is `{self.py_type}` but got `{type(value)}`."
+                f"Expected type of value {value} is `{self.py_type}` but got `{value_type}`."
             )
             raise Exception(msg)
-        
-        instance._values[self.name] = value
 
     def __get__(self, instance, cls):
         if instance:
@@ -167,6 +606,12 @@ class Field:
         else:
             return self
 
+    def asc(self):
+        return OrderBy(self.name)
+
+    def desc(self):
+        return OrderBy(self.name, descending=True)
+
     def __eq__(self, value):
         if self.is_nosql:
             return Condition("$eq", self, value)
@@ -211,6 +656,101 @@ class Field:
         return value
 
 
+class RelationProxy:
+    """Stand-in for a related Model that is only loaded on first access.
+
+    The proxy holds the related id and the Session that read the row; any
+    attribute other than `id` loads the Model through `Session.get`, which
+    goes through the session identity map. Once `detach`ed, loading raises
+    instead.
+    """
+
+    __slots__ = ("_model", "_id", "_session", "_instance")
+
+    def __init__(self, model, id, session):
+        object.__setattr__(self, "_model", model)
+        object.__setattr__(self, "_id", id)
+        object.__setattr__(self, "_session", session)
+        object.__setattr__(self, "_instance", None)
+
+    @property
+    def id(self):
+        return self._id
+
+    @property
+    def is_loaded(self):
+        return self._instance is not None
+
+    def detach(self):
+        """Forget the Session, e.g. one owned by another thread."""
+        object.__setattr__(self, "_session", None)
+
+    def load(self):
+        if self._instance is None:
+            if self._session is None:
+                raise Exception(
+                    f"`{self._model.__name__}` with id {self._id} was not loaded "
+                    "and is detached from its Session, select it with `.eager()`."
+                )
+            instance = self._session.get(self._model, self._id)
+            if instance is None:
+                raise Exception(
+                    f"`{self._model.__name__}` with id {self._id} does not exist."
+                )
+            object.__setattr__(self, "_instance", instance)
+        return self._instance
+
+    def __getattr__(self, name):
+        return getattr(self.load(), name)
+
+    def __setattr__(self, name, value):
+        setattr(self.load(), name, value)
+
+    def __eq__(self, other):
+        if isinstance(other, RelationProxy):
+            return (other._model, other._id) == (self._model, self._id)
+        if isinstance(other, self._model):
+            return other.id == self._id
+        return NotImplemented
+
+    def __hash__(self):
+        return hash((self._model, self._id))
+
+    def __deepcopy__(self, memo):
+        # The session is not copyable, a copy is detached from it
+        return copy.deepcopy(self.load(), memo)
+
+    def __repr__(self):
+        if self._instance is not None:
+            return repr(self._instance)
+        return f"<{self._model.__name__} id={self._id} (not loaded)>"
+
+
+class Index:
+    """Index declaration for a Model, listed in its `__indexes__`.
+
+        class Student(Model):
+            user_name: str
+            first_name: str
+            last_name: str
+
+            __indexes__ = [
+                Index("user_name", unique=True),
+                Index("last_name", "first_name"),
+            ]
+    """
+
+    def __init__(self, *columns, unique=False, name=None):
+        if not columns:
+            raise Exception("An index needs at least one column.")
+        self.columns = columns
+        self.unique = unique
+        self.name = name
+
+    def index_name(self, model):
+        return self.name or f"ix_{model._name}_{'_'.join(self.columns)}"
+
+
 class Model:
     def __new__(mcs, *args, **kwargs):
         cls = super().__new__(mcs)
@@ -239,6 +779,22 @@ class Model:
                 if type_args[0].__base__ is not Model:
                     field.py_type = type_args[0]
 
+        # Related Model of each relation field, one to one or one to many
+        cls._relations = {}
+        for name, field in cls._cols.items():
+            type_args = get_args(field.py_type)
+            related = type_args[0] if type_args else field.py_type
+            if isinstance(related, type) and issubclass(related, Model):
+                cls._relations[name] = related
+
+        cls._indexes = list(getattr(cls, "__indexes__", []))
+        for index in cls._indexes:
+            for column in index.columns:
+                if column not in cls._cols:
+                    raise Exception(
+                        f"Index column `{column}` is not a field of `{cls.__name__}`."
+                    )
+
     def __init__(self, **kwargs):
         self._values = {}
         for key, value in kwargs.items():
@@ -252,14 +808,18 @@ class Model:
         return f"<{self.__class__.__name__} {', '.join(stmt)}>"
     
     def to_dict(self):
-        return self.jsonify_model(copy.deepcopy(self._values))
+        return self.jsonify_model(self._values)
     
     def jsonify_model(self, dict_obj):
+        # A new dict is built on the way, so the values are not copied first
         new_dict = {}
-        dict_obj.pop("id")
         for key, value in dict_obj.items():
+            if key == "id":
+                continue
+            if isinstance(value, RelationProxy):
+                value = value.load()
             if isinstance(value, Model):
-                new_dict[key] = self.jsonify_model(copy.deepcopy(value._values))
+                new_dict[key] = self.jsonify_model(value._values)
             else:
                 new_dict[key] = value
         return new_dict
@@ -277,7 +837,17 @@ class DBType(Enum):
 
 
 class MongoDBConnection:
+    # `pymongo`, imported by `load_driver`
+    driver = None
+
+    @classmethod
+    def load_driver(cls):
+        if cls.driver is None:
+            cls.driver = import_driver("pymongo", "MongoDB")
+        return cls.driver
+
     def __init__(self, database: str, host: str = "localhost", port: str = "27017"):
+        self.load_driver()
         self.host = host
         self.port = port
         self.database_name = database
@@ -286,18 +856,45 @@ class MongoDBConnection:
         self.db_type = DBType.NOSQL
     
     def connect(self):
-        conn = pymongo.MongoClient(f"mongodb://{self.host}:{self.port}/")
+        conn = self.driver.MongoClient(f"mongodb://{self.host}:{self.port}/")
         self.database = conn[self.database_name]
         return conn
+
+    def disconnect(self, conn):
+        conn.close()
     
     def create(self, model: Model):
         return self.database[model._name]
+
+    def create_indexes(self, model: Model):
+        # create_index is a no-op for indexes that already exist
+        collection = self.database[model._name]
+        for index in model._indexes:
+            keys = [
+                (nosql_name(column), self.driver.ASCENDING) for column in index.columns
+            ]
+            collection.create_index(
+                keys, unique=index.unique, name=index.index_name(model)
+            )
     
     def drop(self, model: Model):
         collist = self.database.list_collection_names()
         if model._name in collist:
             self.database[model._name].delete_many({})
     
+    def delete_many(self, model, query):
+        return self.database[model._name].delete_many(query or {}).deleted_count
+
+    def update_many(self, model, query, values):
+        result = self.database[model._name].update_many(query or {}, {"$set": values})
+        return result.modified_count
+
+    def process_pipeline(self, model, pipeline):
+        return self.database[model._name].aggregate(pipeline)
+
+    def find_by_id(self, model, id):
+        return self.database[model._name].find_one({"_id": id})
+
     def delete(self, model: Model):
         query = {"_id": model.id}
         self.database[model._name].delete_one(query)
@@ -318,15 +915,30 @@ class MongoDBConnection:
         else:
             model.id = self.collection.insert_one(values).inserted_id
     
-    def process_query(self, query, columns, limit):
+    def process_query(self, query, columns, limit, sort=None, skip=None):
+        cursor = self.collection.find(query, columns)
+        if sort:
+            cursor = cursor.sort(sort)
+        if skip:
+            cursor = cursor.skip(skip)
         if limit:
-            return self.collection.find(query, columns).limit(limit)
-        
-        return self.collection.find(query, columns)
+            cursor = cursor.limit(limit)
+
+        return cursor
 
 
 class MySQLConnection:
+    # `mysql.connector`, imported by `load_driver`
+    driver = None
+
+    @classmethod
+    def load_driver(cls):
+        if cls.driver is None:
+            cls.driver = import_driver("mysql.connector", "MySQL")
+        return cls.driver
+
     def __init__(self, host: str, database: str, user: str, password: str):
+        self.load_driver()
         self.host = host
         self.database = database
         self.user = user
@@ -334,11 +946,25 @@ class MySQLConnection:
         self.db_type = DBType.SQL
     
     def connect(self):
-        conn = mysql.connector.connect(host=self.host, database=self.database, user=self.user, password=self.password)
+        conn = self.driver.connect(host=self.host, database=self.database, user=self.user, password=self.password)
         return conn
+
+    def disconnect(self, conn):
+        conn.close()
+
+    @contextmanager
+    def reader(self, conn):
+        yield conn
+
+    @contextmanager
+    def writer(self, conn):
+        yield conn
     
     def configure_cursor(self, cursor):
         return cursor(dictionary=True)
+
+    def explain(self, sql_stmt):
+        return f"EXPLAIN {sql_stmt}"
     
     def drop(self, model: Model):
         return f"DROP TABLE IF EXISTS {model._name}"
@@ -354,6 +980,21 @@ class MySQLConnection:
             )
         )
     
+    def create_index(self, model: Model, index: Index):
+        unique = "UNIQUE " if index.unique else ""
+        return (
+            f"CREATE {unique}INDEX {index.index_name(model)} "
+            f"ON {model._name} ({', '.join(index.columns)})"
+        )
+
+    def index_exists(self, model: Model, index: Index):
+        # MySQL has no CREATE INDEX IF NOT EXISTS
+        return (
+            "SELECT index_name FROM information_schema.statistics "
+            "WHERE table_schema = DATABASE() AND table_name = %s AND index_name = %s",
+            (model._name, index.index_name(model)),
+        )
+
     def py_to_db_type(self, field):
         python_sql_type = {int: "INTEGER", str: "VARCHAR(255)"}
 
@@ -402,20 +1043,146 @@ class MySQLConnection:
     
     def concatenate_condition_values(self, val1, val2):
         return tuple([*val1, *val2])
+
+    def placeholder(self, value):
+        return "%s", (value,)
+
+    def limit_offset(self, limit, offset):
+        # MySQL has no OFFSET without LIMIT, use the largest row count
+        return f"LIMIT {limit or 18446744073709551615} OFFSET {offset}"
         
 
 class SQLiteConnection:
-    def __init__(self, database_path):
+    """SQLite dialect.
+
+    With `tuned=True` the database runs in WAL mode with
+    `synchronous=NORMAL`, and Sessions share one writer connection,
+    serialized by a lock, plus a pool of up to `readers` read-only
+    connections. WAL readers never wait for the writer. `cache_size`
+    follows the PRAGMA convention (negative values are KiB), and
+    `busy_timeout` is in milliseconds.
+    """
+
+    def __init__(
+        self,
+        database_path,
+        tuned=False,
+        cache_size=-64000,
+        mmap_size=256 * 1024 * 1024,
+        busy_timeout=5000,
+        readers=4,
+    ):
         self.database_path = database_path
         self.db_type = DBType.SQL
-    
+        self.tuned = tuned
+        self.cache_size = cache_size
+        self.mmap_size = mmap_size
+        self.busy_timeout = busy_timeout
+        # An in-memory database is private to its connection
+        self.readers = 0 if database_path == ":memory:" else readers
+
+        self._lock = threading.Lock()
+        self._write_lock = threading.RLock()
+        self._writer = None
+        self._read_pool = queue.LifoQueue()
+        self._reader_count = 0
+
     def connect(self):
-        conn = sqlite3.connect(self.database_path)
+        if not self.tuned:
+            conn = sqlite3.connect(self.database_path)
+            conn.row_factory = sqlite3.Row
+            return conn
+
+        with self._lock:
+            if self._writer is None:
+                self._writer = self.open_connection()
+                self._writer.execute("PRAGMA journal_mode=WAL")
+                self._writer.execute("PRAGMA synchronous=NORMAL")
+            return self._writer
+
+    def open_connection(self, read_only=False):
+        if read_only:
+            conn = sqlite3.connect(
+                f"file:{self.database_path}?mode=ro",
+                uri=True,
+                check_same_thread=False,
+                timeout=self.busy_timeout / 1000,
+            )
+        else:
+            conn = sqlite3.connect(
+                self.database_path,
+                check_same_thread=False,
+                timeout=self.busy_timeout / 1000,
+            )
         conn.row_factory = sqlite3.Row
+        conn.execute(f"PRAGMA busy_timeout={int(self.busy_timeout)}")
+        conn.execute(f"PRAGMA cache_size={int(self.cache_size)}")
+        conn.execute(f"PRAGMA mmap_size={int(self.mmap_size)}")
         return conn
+
+    def disconnect(self, conn):
+        # Tuned connections are shared between Sessions, see `close_all`
+        if not self.tuned:
+            conn.close()
+
+    def pool_stats(self):
+        return {
+            "readers_open": self._reader_count,
+            "readers_idle": self._read_pool.qsize(),
+            "readers_max": self.readers if self.tuned else 0,
+        }
+
+    def close_all(self):
+        with self._lock:
+            while not self._read_pool.empty():
+                self._read_pool.get_nowait().close()
+            self._reader_count = 0
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+
+    @contextmanager
+    def reader(self, conn):
+        if not self.tuned:
+            yield conn
+            return
+        if not self.readers:
+            # Reads share the writer connection, keep them out of its
+            # transactions
+            with self._write_lock:
+                yield conn
+            return
+
+        try:
+            read_conn = self._read_pool.get_nowait()
+        except queue.Empty:
+            read_conn = None
+            with self._lock:
+                if self._reader_count < self.readers:
+                    self._reader_count += 1
+                    read_conn = self.open_connection(read_only=True)
+            if read_conn is None:
+                read_conn = self._read_pool.get()
+
+        try:
+            yield read_conn
+        finally:
+            self._read_pool.put(read_conn)
+
+    @contextmanager
+    def writer(self, conn):
+        if not self.tuned:
+            yield conn
+            return
+
+        with self._write_lock:
+            yield conn
     
     def configure_cursor(self, cursor):
         return cursor()
+
+    def explain(self, sql_stmt):
+        return f"EXPLAIN QUERY PLAN {sql_stmt}"
     
     def create(self, model: Model):
         return (
@@ -425,6 +1192,19 @@ class SQLiteConnection:
             )
         )
     
+    def create_index(self, model: Model, index: Index):
+        unique = "UNIQUE " if index.unique else ""
+        return (
+            f"CREATE {unique}INDEX IF NOT EXISTS {index.index_name(model)} "
+            f"ON {model._name} ({', '.join(index.columns)})"
+        )
+
+    def index_exists(self, model: Model, index: Index):
+        return (
+            "SELECT name FROM sqlite_master WHERE type = 'index' AND name = :name",
+            {"name": index.index_name(model)},
+        )
+
     def drop(self, model: Model):
         return f"DROP TABLE IF EXISTS {model._name}"
     
@@ -482,25 +1262,44 @@ class SQLiteConnection:
     def concatenate_condition_values(self, val1, val2):
         return {**val1, **val2}
 
+    def placeholder(self, value):
+        name = f"var{next(counter)}"
+        return f":{name}", {name: value}
+
+    def limit_offset(self, limit, offset):
+        return f"LIMIT {limit or -1} OFFSET {offset}"
+
 
 class DBConnection:
     @staticmethod
     def dialect(dbms):
+        # Driver packages are only imported for the selected backend
         if dbms == DBMS.MYSQL:
+            MySQLConnection.load_driver()
             return MySQLConnection
         elif dbms == DBMS.SQLITE:
             return SQLiteConnection
         elif dbms == DBMS.MONGODB:
+            MongoDBConnection.load_driver()
             return MongoDBConnection
 
 
+# `operation` labels of DB_QUERY_DURATION
+SELECT = ("select",)
+EXECUTE = ("execute",)
+
+
 class Session:
-    def __init__(self, dbms, log=False):
+    def __init__(self, dbms, log=False, cache=None, slow_query_log=None):
         self.log = log
         self.dbms = dbms
+        self.cache = cache
+        # A SlowQueryLog, see `episode.slowquery`
+        self.slow_query_log = slow_query_log
         if self.log:
             configure_file_logger(filename="episodeDB.log")
         self.conn = self.dbms.connect()
+        self.identity_map = {}
 
     def __enter__(self):
         return self
@@ -511,20 +1310,48 @@ class Session:
         ...
 
     def sql_run(self, sql_stmt, values=None):
-        self.log_sql_stmt(f"Running '{sql_stmt}', with, {values}")
-        cur = self.dbms.configure_cursor(self.conn.cursor)
-        cur.execute(sql_stmt, values or {})
-        self.conn.commit()
-        return cur.lastrowid
+        return self.sql_execute(sql_stmt, values).lastrowid
+
+    def sql_execute(self, sql_stmt, values=None):
+        self.log_sql_stmt("Running '%s' with %s", sql_stmt, values)
+        with self.dbms.writer(self.conn) as conn:
+            with timed("db"):
+                started = time.perf_counter()
+                cur = self.dbms.configure_cursor(conn.cursor)
+                cur.execute(sql_stmt, values or {})
+                conn.commit()
+                seconds = self.observe_query(
+                    EXECUTE, sql_stmt, values, started, cur.rowcount
+                )
+        if self.slow_query_log is not None:
+            self.slow_query_log.check(self, sql_stmt, values, seconds, cur.rowcount)
+        return cur
 
     def create(self, model: Model):
+        self.invalidate_cache(model)
         if self.dbms.db_type is DBType.NOSQL:
             self.dbms.collection = self.dbms.create(model)
+            self.dbms.create_indexes(model)
         else:
             sql_statement = self.dbms.create(model)
-            return self.sql_run(sql_statement)
+            row_id = self.sql_run(sql_statement)
+            for index in model._indexes:
+                self.sql_run(self.dbms.create_index(model, index))
+            return row_id
+
+    def ensure_indexes(self, model: Model):
+        """Create the declared indexes of `model` that its table is missing."""
+        if self.dbms.db_type is DBType.NOSQL:
+            self.dbms.create_indexes(model)
+            return
+
+        for index in model._indexes:
+            sql_statement, values = self.dbms.index_exists(model, index)
+            if not self.fetch_rows(sql_statement, values):
+                self.sql_run(self.dbms.create_index(model, index))
 
     def drop(self, model: Model):
+        self.invalidate_cache(model)
         if self.dbms.db_type is DBType.NOSQL:
             self.dbms.drop(model)
         else:
@@ -542,6 +1369,8 @@ class Session:
         else:
             sql_statement, values = self.dbms.delete(model)
             self.sql_run(sql_statement, values)
+        self.invalidate_cache(model)
+        self.identity_map.pop((type(model), model.id), None)
 
         if model.id:
             model.id = None
@@ -555,60 +1384,247 @@ class Session:
 
             if row_id:
                 model.id = row_id
+        self.invalidate_cache(model)
 
-    def sql_select(self, sql_stmt, values=None):
-        self.log_sql_stmt(f"Selecting '{sql_stmt}' with {values}")
-        cur = self.dbms.configure_cursor(self.conn.cursor)
-        cur.execute(sql_stmt, values or ())
-        yield from cur.fetchall()
-    
-    def log_sql_stmt(self, sql_stmt):
+    def bulk_delete(self, query_builder):
+        model = query_builder.model
+        if self.dbms.db_type is DBType.NOSQL:
+            query = query_builder.get_query_stmt()[0]
+            row_count = self.dbms.delete_many(model, query)
+        else:
+            sql_statement, values = query_builder.get_delete_stmt()
+            row_count = self.sql_execute(sql_statement, values).rowcount
+
+        self.invalidate_cache(model)
+        self.forget(model)
+        return row_count
+
+    def bulk_update(self, query_builder, values):
+        model = query_builder.model
+        if self.dbms.db_type is DBType.NOSQL:
+            query = query_builder.get_query_stmt()[0]
+            row_count = self.dbms.update_many(model, query, values)
+        else:
+            sql_statement, params = query_builder.get_update_stmt(values)
+            row_count = self.sql_execute(sql_statement, params).rowcount
+
+        self.invalidate_cache(model)
+        self.forget(model)
+        return row_count
+
+    def forget(self, model):
+        """Drop the identity map entries of `model` after a bulk change."""
+        for key in [key for key in self.identity_map if key[0] is model]:
+            del self.identity_map[key]
+
+    def invalidate_cache(self, model: Model):
+        if self.cache is not None:
+            self.cache.invalidate(model._name)
+
+    def sql_select(self, sql_stmt, values=None, table=None, query_builder=None):
+        if (
+            self.cache is None
+            or table is None
+            or (query_builder is not None and not query_builder.use_cache)
+        ):
+            yield from self.fetch_rows(sql_stmt, values)
+            return
+
+        key = self.cache.make_key(sql_stmt, values)
+        rows = self.cache.get(key)
+        if rows is None:
+            generations = self.cache.generations((table,))
+            rows = [dict(row) for row in self.fetch_rows(sql_stmt, values)]
+            ttl = query_builder.cache_ttl if query_builder is not None else None
+            self.cache.set(key, rows, (table,), ttl, generations)
+        else:
+            self.log_sql_stmt("Cache hit for '%s' with %s", sql_stmt, values)
+        yield from rows
+
+    def fetch_rows(self, sql_stmt, values=None):
+        self.log_sql_stmt("Selecting '%s' with %s", sql_stmt, values)
+        with self.dbms.reader(self.conn) as conn:
+            with timed("db"):
+                started = time.perf_counter()
+                cur = self.dbms.configure_cursor(conn.cursor)
+                cur.execute(sql_stmt, values or ())
+                rows = cur.fetchall()
+                seconds = self.observe_query(
+                    SELECT, sql_stmt, values, started, len(rows)
+                )
+        if self.slow_query_log is not None:
+            self.slow_query_log.check(self, sql_stmt, values, seconds, len(rows))
+        return rows
+
+    def fetch_batches(self, sql_stmt, values=None, size=100):
+        """Like `fetch_rows`, yielding lists of up to `size` rows as they
+        are read rather than all rows at once.
+        """
+        self.log_sql_stmt("Selecting '%s' with %s", sql_stmt, values)
+        rows = 0
+        with self.dbms.reader(self.conn) as conn:
+            started = time.perf_counter()
+            cur = self.dbms.configure_cursor(conn.cursor)
+            cur.execute(sql_stmt, values or ())
+            while True:
+                batch = cur.fetchmany(size)
+                if not batch:
+                    break
+                rows += len(batch)
+                paused = time.perf_counter()
+                yield batch
+                # The time the caller holds the batch is not query time
+                started += time.perf_counter() - paused
+            seconds = self.observe_query(SELECT, sql_stmt, values, started, rows)
+        if self.slow_query_log is not None:
+            self.slow_query_log.check(self, sql_stmt, values, seconds, rows)
+
+    def observe_query(self, operation, statement, values, started, rows):
+        seconds = time.perf_counter() - started
+        DB_QUERY_DURATION.observe(seconds, operation)
+        if HOOKS.on_db_query:
+            HOOKS.run("on_db_query", statement, values, seconds, rows)
+        return seconds
+
+    def explain(self, statement, values=None):
+        """The query plan of `statement` as lines of text."""
+        try:
+            if self.dbms.db_type is DBType.NOSQL:
+                plan = self.dbms.process_query(*statement).explain()
+                return [str(plan.get("queryPlanner", plan))]
+
+            with self.dbms.reader(self.conn) as conn:
+                cur = self.dbms.configure_cursor(conn.cursor)
+                cur.execute(self.dbms.explain(statement), values or ())
+                rows = [dict(row) for row in cur.fetchall()]
+        except Exception as e:
+            return [f"EXPLAIN failed: {e}"]
+
+        return [
+            row["detail"]
+            if "detail" in row
+            else " | ".join(f"{name}={value}" for name, value in row.items())
+            for row in rows
+        ]
+
+    def log_sql_stmt(self, message, *args):
         if self.log:
-            EPISODE_LOGGER.debug(sql_stmt)
+            EPISODE_LOGGER.debug(message, *args)
     
+    def get(self, model, id):
+        """Return the `model` row with `id`, at most one query per session."""
+        key = (model, id)
+        instance = self.identity_map.get(key)
+        if instance is not None:
+            return instance
+
+        if self.dbms.db_type is DBType.NOSQL:
+            row = self.dbms.find_by_id(model, id)
+            if row is not None:
+                instance = model(**self.process_row_data(row, self.select(model)))
+        else:
+            query_builder = self.select(model).where(model.id == id)
+            instance = next(self.exec(query_builder), None)
+
+        if instance is not None:
+            self.identity_map[key] = instance
+        return instance
+
     def process_row_data(self, row, query_builder: QueryBuilder):
         row_data = {}
+        relations = query_builder.model._relations
+        eager_relations = query_builder.eager_relations
         for name, value in dict(row).items():
-            if isinstance(self.dbms, MySQLConnection):
-                sql_stmt, values = f"SELECT * FROM {name} WHERE id = %s", (value,)
-            else:
-                sql_stmt, values = f"SELECT * FROM {name} WHERE id=:id", {"id": value}
-            column = query_builder.model._cols.get(name, None)
-            if (
-                column is not None
-                and (get_origin(column.py_type) is list)
-                and (issubclass(get_args(column.py_type)[0], Model))
-            ):
-                row_data[name] = get_args(column.py_type)[0](
-                    **dict(next(self.sql_select(sql_stmt, values)))
-                )
-            elif column is not None and column.py_type.__base__ is Model:
-                row_data[name] = column.py_type(
-                    **dict(next(self.sql_select(sql_stmt, values)))
-                )
-            else:
+            if name == "_id":
+                name = "id"
+            related_model = relations.get(name)
+            if related_model is None or value is None:
                 row_data[name] = value
-        
+            elif name in eager_relations:
+                row_data[name] = self.get(related_model, value)
+            else:
+                row_data[name] = RelationProxy(related_model, value, self)
+
         return row_data
 
+    def nosql_select(self, query_builder):
+        query_stmt = query_builder.get_query_stmt()
+        if self.cache is None or not query_builder.use_cache:
+            return self.nosql_fetch(query_stmt)
+
+        table = query_builder.model._name
+        key = f"{table}\x00{query_stmt!r}"
+        rows = self.cache.get(key)
+        if rows is None:
+            generations = self.cache.generations((table,))
+            rows = self.nosql_fetch(query_stmt)
+            self.cache.set(key, rows, (table,), query_builder.cache_ttl, generations)
+        return rows
+
+    def nosql_fetch(self, query_stmt):
+        with timed("db"):
+            started = time.perf_counter()
+            rows = list(self.dbms.process_query(*query_stmt))
+            seconds = self.observe_query(SELECT, query_stmt, None, started, len(rows))
+        if self.slow_query_log is not None:
+            self.slow_query_log.check(self, query_stmt, None, seconds, len(rows))
+        return rows
+
     def exec(self, query_builder):
         if self.dbms.db_type is DBType.NOSQL:
-            query, cols, limit = query_builder.get_query_stmt()
-            for row_data in self.dbms.process_query(query, cols, limit):
-                if "_id" in row_data.keys():
-                    row_data["id"] = row_data["_id"]
-                    row_data.pop("_id")
+            for row in self.nosql_select(query_builder):
+                row_data = self.process_row_data(row, query_builder)
                 yield query_builder.model(**row_data)
         else:
             sql_stmt, values = query_builder.get_query_stmt()
-            for row in self.sql_select(sql_stmt, values):
+            table = query_builder.model._name
+            for row in self.sql_select(sql_stmt, values, table, query_builder):
                 row_data = self.process_row_data(row, query_builder)
                 yield query_builder.model(**row_data)
  
+    def aggregate(self, query_builder, aggregates):
+        table = query_builder.model._name
+        if self.dbms.db_type is DBType.NOSQL:
+            pipeline = query_builder.get_aggregate_pipeline(aggregates)
+            rows = self.nosql_aggregate(query_builder, pipeline)
+        else:
+            sql_stmt, values = query_builder.get_aggregate_stmt(aggregates)
+            rows = self.sql_select(sql_stmt, values, table, query_builder)
+
+        rows = [dict(row) for row in rows]
+        if query_builder._group_by:
+            return rows
+        if rows:
+            return rows[0]
+        # MongoDB returns no group at all for an empty match
+        return {
+            alias: 0 if isinstance(aggregate, Count) else None
+            for alias, aggregate in aggregates.items()
+        }
+
+    def count(self, query_builder):
+        result = self.aggregate(query_builder, {"count": Count()})
+        return result if query_builder._group_by else result["count"]
+
+    def nosql_aggregate(self, query_builder, pipeline):
+        model = query_builder.model
+        if self.cache is None or not query_builder.use_cache:
+            return self.dbms.process_pipeline(model, pipeline)
+
+        key = f"{model._name}\x00{pipeline!r}"
+        rows = self.cache.get(key)
+        if rows is None:
+            generations = self.cache.generations((model._name,))
+            rows = list(self.dbms.process_pipeline(model, pipeline))
+            self.cache.set(
+                key, rows, (model._name,), query_builder.cache_ttl, generations
+            )
+        return rows
+
     def close(self):
-        self.conn.close()
+        self.dbms.disconnect(self.conn)
     
     def select(self, model):
         if self.dbms.db_type is DBType.NOSQL:
-            return NOSqlQueryBuilder(model)
-        return SqlQueryBuilder(model, self.dbms)
+            return NOSqlQueryBuilder(model, session=self)
+        return SqlQueryBuilder(model, self.dbms, session=self)
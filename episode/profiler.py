@@ -0,0 +1,215 @@
+import cProfile
+import io
+import os
+import pstats
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from itertools import count
+
+SAMPLERS = ("cprofile", "stack")
+
+
+class StackSampler:
+    """Background thread recording the stacks of registered threads.
+
+    Every `interval` seconds the stack of each registered thread is
+    folded into one `outer;...;inner` line and counted. The thread only
+    runs while threads are registered. `remove` returns the counts of a
+    thread, which are no longer updated after it.
+    """
+
+    def __init__(self, interval=0.001):
+        self.interval = interval
+        self._threads = {}
+        self._lock = threading.Lock()
+        self._wanted = threading.Event()
+        self._thread = None
+
+    def add(self, thread_id):
+        with self._lock:
+            self._threads[thread_id] = Counter()
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self.run, name="episode-profiler", daemon=True
+                )
+                self._thread.start()
+        self._wanted.set()
+
+    def remove(self, thread_id):
+        with self._lock:
+            stacks = self._threads.pop(thread_id, Counter())
+            if not self._threads:
+                self._wanted.clear()
+        return stacks
+
+    def run(self):
+        while True:
+            self._wanted.wait()
+            frames = sys._current_frames()
+            with self._lock:
+                thread_ids = list(self._threads)
+            # Folded unlocked, counted only for threads still registered
+            folded = [
+                (thread_id, fold(frames[thread_id]))
+                for thread_id in thread_ids
+                if thread_id in frames
+            ]
+            del frames
+            with self._lock:
+                for thread_id, stack in folded:
+                    stacks = self._threads.get(thread_id)
+                    if stacks is not None:
+                        stacks[stack] += 1
+            time.sleep(self.interval)
+
+
+def fold(frame):
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({os.path.basename(code.co_filename)})")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+class RouteProfile:
+    """Aggregated samples of one route."""
+
+    def __init__(self):
+        self.samples = 0
+        self.stats = None
+        self.stacks = Counter()
+
+
+class RouteProfiler:
+    """Profiles 1 in `every` requests of each route.
+
+        profiler = episode.profile(every=100, sampler="stack")
+        print(profiler.dump("/users/{user_id}"))
+
+    With the "cprofile" sampler a sampled handler runs under cProfile
+    and the stats are merged per route. With "stack" a background
+    thread samples the handler's stack every `interval` seconds instead,
+    which costs the request much less. The requests that are not
+    sampled only pay for a counter. Uses the `before_handler` and
+    `after_response` hooks, see `attach`.
+    """
+
+    def __init__(self, every=100, sampler="cprofile", interval=0.001):
+        if sampler not in SAMPLERS:
+            raise Exception(f"Unknown sampler '{sampler}', expected one of {SAMPLERS}")
+        self.every = every
+        self.sampler = sampler
+        self.stack_sampler = StackSampler(interval) if sampler == "stack" else None
+        self.profiles = {}
+        self._counters = {}
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def attach(self, hooks):
+        hooks.on("before_handler", self.before_handler)
+        hooks.on("after_response", self.after_response)
+
+    def detach(self, hooks):
+        hooks.remove("before_handler", self.before_handler)
+        hooks.remove("after_response", self.after_response)
+
+    def sampled(self, route):
+        counter = self._counters.get(route)
+        if counter is None:
+            counter = self._counters.setdefault(route, count())
+        # `next` on itertools.count is atomic
+        return next(counter) % self.every == 0
+
+    def before_handler(self, request, handler, params):
+        route = request.route or "unmatched"
+        if not self.sampled(route):
+            return
+
+        if self.sampler == "cprofile":
+            profile = cProfile.Profile()
+            try:
+                profile.enable()
+            except ValueError:
+                # Another profiler is active, skip this sample
+                return
+            self._local.sample = (route, profile)
+        else:
+            self.stack_sampler.add(threading.get_ident())
+            self._local.sample = (route, None)
+
+    def after_response(self, request, response):
+        sample = getattr(self._local, "sample", None)
+        if sample is None:
+            return
+        self._local.sample = None
+
+        route, data = sample
+        if self.sampler == "cprofile":
+            data.disable()
+        else:
+            data = self.stack_sampler.remove(threading.get_ident())
+
+        with self._lock:
+            profile = self.profiles.get(route)
+            if profile is None:
+                profile = self.profiles[route] = RouteProfile()
+            profile.samples += 1
+            if self.sampler == "stack":
+                profile.stacks.update(data)
+            elif profile.stats is None:
+                profile.stats = pstats.Stats(data)
+            else:
+                profile.stats.add(data)
+
+    def dump(self, route=None, limit=30):
+        """The aggregated stats of `route`, or of every route, as text.
+
+        cProfile stats are sorted by cumulative time, stacks are in the
+        folded format flame graph tools read.
+        """
+        with self._lock:
+            if route is None:
+                profiles = sorted(self.profiles.items())
+            else:
+                profiles = [(route, self.profiles.get(route))]
+
+            output = io.StringIO()
+            for name, profile in profiles:
+                if profile is None:
+                    output.write(f"== {name}: no samples\n")
+                    continue
+                output.write(f"== {name}: {profile.samples} samples\n")
+                if profile.stats is not None:
+                    profile.stats.stream = output
+                    profile.stats.sort_stats("cumulative").print_stats(limit)
+                for stack, hits in profile.stacks.most_common(limit):
+                    output.write(f"{stack} {hits}\n")
+            return output.getvalue()
+
+    def save(self, directory):
+        """Write each route's stats to `directory`, `.prof` files for
+        cProfile (see `pstats`), `.folded` files for stacks.
+        """
+        os.makedirs(directory, exist_ok=True)
+        paths = []
+        with self._lock:
+            for route, profile in self.profiles.items():
+                name = re.sub(r"[^\w.-]+", "_", route).strip("_") or "root"
+                if profile.stats is not None:
+                    path = os.path.join(directory, f"{name}.prof")
+                    profile.stats.dump_stats(path)
+                else:
+                    path = os.path.join(directory, f"{name}.folded")
+                    with open(path, "w", encoding="utf-8") as file:
+                        for stack, hits in profile.stacks.items():
+                            file.write(f"{stack} {hits}\n")
+                paths.append(path)
+        return paths
+
+    def reset(self):
+        with self._lock:
+            self.profiles = {}
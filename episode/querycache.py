@@ -0,0 +1,262 @@
+import multiprocessing
+import os
+import pickle
+import re
+import threading
+import time
+from collections import OrderedDict
+
+# Named placeholders (`:var12`) are generated from a global counter, so the
+# same query gets a different statement text on every call. They are
+# rewritten positionally before the statement is used as a cache key.
+_NAMED_PLACEHOLDER = re.compile(r":(\w+)")
+
+
+def normalize_query(sql_stmt, values=None):
+    """Return a cache key for `sql_stmt` bound with `values`.
+
+    Whitespace is collapsed and named placeholders are replaced by `?` with
+    their values ordered by position, so two builds of the same query map to
+    the same key whatever placeholder names they were given.
+    """
+    sql_stmt = " ".join(sql_stmt.split())
+
+    if isinstance(values, dict):
+        params = []
+
+        def positional(match):
+            params.append(values.get(match.group(1)))
+            return "?"
+
+        sql_stmt = _NAMED_PLACEHOLDER.sub(positional, sql_stmt)
+        values = params
+
+    return f"{sql_stmt}\x00{tuple(values or ())!r}"
+
+
+class MemoryCacheBackend:
+    """In-process LRU store, shared by every Session of the process."""
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._tables = {}
+        # Bumped by `invalidate`, see `generations`
+        self._generations = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+
+            expires_at, tables, rows = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                self._remove(key)
+                return None
+
+            self._entries.move_to_end(key)
+            return rows
+
+    def generations(self, tables):
+        """Version of `tables`, taken before a read to pass to `set`."""
+        with self._lock:
+            return tuple((table, self._generations.get(table, 0)) for table in tables)
+
+    def set(self, key, rows, tables, ttl=None, generations=None):
+        expires_at = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            # A table was written to while the rows were read
+            if generations is not None and any(
+                self._generations.get(table, 0) != generation
+                for table, generation in generations
+            ):
+                return
+            if key in self._entries:
+                self._remove(key)
+
+            self._entries[key] = (expires_at, tables, rows)
+            for table in tables:
+                self._tables.setdefault(table, set()).add(key)
+
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def invalidate(self, table):
+        with self._lock:
+            self._generations[table] = self._generations.get(table, 0) + 1
+            for key in list(self._tables.get(table, ())):
+                self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._tables.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _remove(self, key):
+        _, tables, _ = self._entries.pop(key)
+        for table in tables:
+            keys = self._tables.get(table)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tables[table]
+
+
+class SharedMemoryCacheBackend:
+    """Store living in a `multiprocessing` manager process.
+
+    Create it before forking workers; every child then reads and
+    invalidates the same entries. Invalidation bumps a per-table generation
+    recorded in each stored entry, so a write in one worker is seen by all
+    the others without scanning the store.
+    """
+
+    def __init__(self, max_entries=1024, manager=None):
+        self.max_entries = max_entries
+        self._manager = manager or multiprocessing.Manager()
+        self._pid = os.getpid()
+        self._shared = {
+            "entries": self._manager.dict(),
+            "accessed": self._manager.dict(),
+            "generations": self._manager.dict(),
+            "lock": self._manager.Lock(),
+        }
+
+    def _proxies(self):
+        # A forked child would share the parent's connections to the
+        # manager; unpickling a proxy connects it anew from this process
+        if self._pid != os.getpid():
+            self._shared = {
+                name: pickle.loads(pickle.dumps(proxy))
+                for name, proxy in self._shared.items()
+            }
+            self._pid = os.getpid()
+        return self._shared
+
+    @property
+    def _entries(self):
+        return self._proxies()["entries"]
+
+    @property
+    def _accessed(self):
+        return self._proxies()["accessed"]
+
+    @property
+    def _generations(self):
+        return self._proxies()["generations"]
+
+    @property
+    def _lock(self):
+        return self._proxies()["lock"]
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        expires_at, generations, rows = entry
+        if expires_at is not None and expires_at <= time.time():
+            self._discard(key)
+            return None
+
+        for table, generation in generations:
+            if self._generations.get(table, 0) != generation:
+                self._discard(key)
+                return None
+
+        self._accessed[key] = time.time()
+        return rows
+
+    def generations(self, tables):
+        """Version of `tables`, taken before a read to pass to `set`."""
+        return tuple((table, self._generations.get(table, 0)) for table in tables)
+
+    def set(self, key, rows, tables, ttl=None, generations=None):
+        expires_at = time.time() + ttl if ttl else None
+        with self._lock:
+            current = self.generations(tables)
+            # A table was written to while the rows were read
+            if generations is not None and tuple(generations) != current:
+                return
+            self._entries[key] = (expires_at, current, rows)
+            self._accessed[key] = time.time()
+            if len(self._entries) > self.max_entries:
+                self._evict()
+
+    def invalidate(self, table):
+        with self._lock:
+            self._generations[table] = self._generations.get(table, 0) + 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._accessed.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _discard(self, key):
+        self._entries.pop(key, None)
+        self._accessed.pop(key, None)
+
+    def _evict(self):
+        # Only runs when the store overflows, so a full scan is acceptable
+        accessed = self._accessed.copy()
+        keys = sorted(self._entries.keys(), key=lambda k: accessed.get(k, 0))
+        for key in keys[: len(keys) - self.max_entries]:
+            self._discard(key)
+
+
+class QueryCache:
+    """Result cache for `Session` reads.
+
+    Rows are stored per normalized statement and tagged with the tables
+    they come from; `Session.save`, `Session.delete` and schema changes
+    invalidate every entry of the table they touch.
+
+        cache = QueryCache(ttl=30, max_entries=4096)
+        with Session(connection, cache=cache) as session:
+            ...
+    """
+
+    def __init__(self, backend=None, ttl=60, max_entries=1024):
+        if backend is None:
+            backend = MemoryCacheBackend(max_entries)
+        self.backend = backend
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        # Sessions of every server thread count into the same totals
+        self._stats_lock = threading.Lock()
+
+    def make_key(self, sql_stmt, values=None):
+        return normalize_query(sql_stmt, values)
+
+    def get(self, key):
+        rows = self.backend.get(key)
+        with self._stats_lock:
+            if rows is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return rows
+
+    def generations(self, tables):
+        return self.backend.generations(tuple(tables))
+
+    def set(self, key, rows, tables, ttl=None, generations=None):
+        """Store `rows`, unless `tables` changed since `generations`
+        was taken: rows read across a write would be stale.
+        """
+        self.backend.set(key, rows, tuple(tables), ttl or self.ttl, generations)
+
+    def invalidate(self, table):
+        self.backend.invalidate(table)
+
+    def clear(self):
+        self.backend.clear()
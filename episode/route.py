@@ -1,41 +1,53 @@
+from urllib.parse import unquote
+
+
 class Action:
-    def __init__(self, terminal=False, handler=None, method="all"):
+    def __init__(self, terminal=False, handler=None, method="all", cache=None):
         self.terminal = terminal
         self.handler = handler
         self.accepted_method = method
+        # Seconds the handler's responses are kept in the response cache
+        self.cache = cache
 
 
 class Node:
-    def __init__(self, value):
+    def __init__(self, value, parent=None):
         self.value = value
         self.children_nodes = []
         self.children_values = []
         self.actions = []
+        # Route template of the node, e.g. "/users/{id}"
+        if parent is None:
+            self.pattern = value
+        else:
+            self.pattern = parent.pattern.rstrip("/") + "/" + value
 
 
 class Router:
     def __init__(self):
         self.root = Node("/")
 
-    def add_route(self, route, handler, node=None, accepted_method="all"):
+    def add_route(
+        self, route, handler, node=None, accepted_method="all", cache=None
+    ):
         if not node:
             # First time adding a new route to the tree
             route_points = route.lstrip("/").split("/")  # strip leading / from route
             first_route_point = route_points[0]
             if not first_route_point:
                 if handler:
-                    self.root.actions = [Action(True, handler, accepted_method)]
+                    self.root.actions = [Action(True, handler, accepted_method, cache)]
                 return
             if first_route_point not in self.root.children_values:
-                child_node = Node(first_route_point)
+                child_node = Node(first_route_point, self.root)
                 self.root.children_nodes.append(child_node)
                 self.root.children_values.append(first_route_point)
-                self.add_route(route_points[1:], handler, child_node, accepted_method)
+                self.add_route(route_points[1:], handler, child_node, accepted_method, cache)
             else:
                 for child_node in self.root.children_nodes:
                     if child_node.value == first_route_point:
                         self.add_route(
-                            route_points[1:], handler, child_node, accepted_method
+                            route_points[1:], handler, child_node, accepted_method, cache
                         )
         else:
             if route:
@@ -44,21 +56,29 @@ class Router:
                     for child_node in node.children_nodes:
                         if child_node.value == first_route_point:
                             self.add_route(
-                                route[1:], handler, child_node, accepted_method
+                                route[1:], handler, child_node, accepted_method, cache
                             )
                 else:
-                    child_node = Node(first_route_point)
+                    child_node = Node(first_route_point, node)
                     node.children_nodes.append(child_node)
                     node.children_values.append(first_route_point)
-                    self.add_route(route[1:], handler, child_node, accepted_method)
+                    self.add_route(route[1:], handler, child_node, accepted_method, cache)
             else:
-                action = Action(True, handler, accepted_method)
+                action = Action(True, handler, accepted_method, cache)
                 if node.actions:
                     node.actions.append(action)
                 else:
                     node.actions = [action]
                 return
 
+    def routes(self, node=None):
+        """Yield the (node, action) pairs of every registered route."""
+        node = node or self.root
+        for action in node.actions:
+            yield node, action
+        for child_node in node.children_nodes:
+            yield from self.routes(child_node)
+
     def print_router(self, node=None):
         if not node:
             if self.root.children_values:
@@ -76,6 +96,9 @@ class Router:
             route_params = {}
         if not node:
             route_points = route.lstrip("/").split("/")
+            if "%" in route:
+                # Decode each segment, an encoded "/" stays inside its segment
+                route_points = [unquote(point) for point in route_points]
             first_route_point = route_points[0]
             if not first_route_point:
                 return self.root, route_params
@@ -87,6 +110,10 @@ class Router:
                     ):
                         has_node_with_params = True
                         param = child_node.value.strip("{}")
+                        if param.endswith(":path"):
+                            # Path parameter, matches the rest of the route
+                            route_params[param[:-5]] = "/".join(route_points)
+                            return child_node, route_params
                         route_params[param] = first_route_point
                         return self.get_route_info(
                             route_points[1:], route_params, child_node
@@ -120,6 +147,9 @@ class Router:
                         ) and child_node.value.endswith("}"):
                             has_node_with_params = True
                             param = child_node.value.strip("{}")
+                            if param.endswith(":path"):
+                                route_params[param[:-5]] = "/".join(route)
+                                return child_node, route_params
                             route_params[param] = first_route_point
                             return self.get_route_info(
                                 route[1:], route_params, child_node
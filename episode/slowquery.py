@@ -0,0 +1,87 @@
+import logging
+import threading
+import time
+from collections import deque
+
+from episode.logger import LOGGER_NAME, WARNING, configure_file_logger
+from episode.querycache import normalize_query
+
+SLOW_QUERY_LOGGER = logging.getLogger(f"{LOGGER_NAME}.slow_query")
+
+
+class SlowQuery:
+    __slots__ = ("time", "statement", "params", "seconds", "rows", "plan")
+
+    def __init__(self, statement, params, seconds, rows, plan=None):
+        self.time = time.time()
+        self.statement = statement
+        self.params = params
+        self.seconds = seconds
+        self.rows = rows
+        self.plan = plan
+
+    def to_dict(self):
+        return {
+            "time": round(self.time, 3),
+            "statement": str(self.statement),
+            "params": repr(self.params),
+            "duration_ms": round(self.seconds * 1000, 3),
+            "rows": self.rows,
+            "plan": self.plan,
+        }
+
+
+class SlowQueryLog:
+    """Logs the Session queries taking `threshold` seconds or more.
+
+        slow_queries = SlowQueryLog(threshold=0.05, explain=True)
+        with Session(connection, slow_query_log=slow_queries) as session:
+            ...
+
+    Each slow query is logged with its parameters, duration and row
+    count to the `EPISODE.slow_query` logger, and to the file `path`
+    when given. With `explain=True` the plan of the statement, from
+    `EXPLAIN QUERY PLAN` on SQLite and `EXPLAIN` on MySQL, is captured
+    the first time it is slow. The last `keep` slow queries are kept in
+    `recent`.
+    """
+
+    def __init__(self, threshold=0.1, explain=False, path=None, keep=100):
+        self.threshold = threshold
+        self.explain = explain
+        self.recent = deque(maxlen=keep)
+        self._explained = set()
+        self._lock = threading.Lock()
+        if path is not None:
+            configure_file_logger(
+                filename=path, level=WARNING, logger_name=SLOW_QUERY_LOGGER.name
+            )
+
+    def check(self, session, statement, params, seconds, rows):
+        if seconds < self.threshold:
+            return None
+
+        plan = None
+        if self.explain and self.first_time(statement):
+            plan = session.explain(statement, params)
+
+        slow_query = SlowQuery(statement, params, seconds, rows, plan)
+        self.recent.append(slow_query)
+        SLOW_QUERY_LOGGER.warning(
+            "Slow query (%.1f ms, %s rows): %s %r%s",
+            seconds * 1000,
+            rows,
+            statement,
+            params,
+            "".join(f"\n    {line}" for line in plan or ()),
+        )
+        return slow_query
+
+    def first_time(self, statement):
+        # Placeholder names differ between builds of the same query
+        key = normalize_query(str(statement), {})
+        with self._lock:
+            if key in self._explained:
+                return False
+            self._explained.add(key)
+            return True
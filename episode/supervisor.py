@@ -0,0 +1,268 @@
+"""Runs an Episode app in worker processes with zero-downtime reloads.
+
+    python -m episode.supervisor myapp:app --port 8880 --processes 4
+
+The supervisor binds the listening socket once and forks a generation of
+worker processes serving on it. On SIGHUP a new generation is started
+and warmed up, then the old one is shut down gracefully: it stops
+accepting and finishes its open connections, while the new generation
+accepts from the same socket, so no connection is refused or dropped.
+SIGTERM or SIGINT shuts every worker down the same way and exits.
+
+The app is imported in each worker, never in the supervisor, so a new
+generation runs the current code and route table.
+"""
+import argparse
+import importlib
+import os
+import select
+import signal
+import socket
+import sys
+import threading
+import time
+
+from episode.logger import EPISODE_LOGGER, LOG_LISTENER
+from episode.tcpserver import TCPServer
+
+
+def load_app(spec):
+    """Import "module:attribute", an app or a function returning one."""
+    module_name, _, attribute = spec.partition(":")
+    app = getattr(importlib.import_module(module_name), attribute or "app")
+    return app if isinstance(app, TCPServer) else app()
+
+
+class Worker:
+    def __init__(self, pid, ready_fd, generation):
+        self.pid = pid
+        self.ready_fd = ready_fd
+        self.generation = generation
+        self.ready = False
+
+
+class Supervisor:
+    def __init__(
+        self,
+        app,
+        host="127.0.0.1",
+        port=8880,
+        processes=2,
+        backlog=128,
+        drain_timeout=30,
+        ready_timeout=60,
+    ):
+        self.app = app
+        self.host = host
+        self.port = port
+        self.processes = processes
+        self.backlog = backlog
+        self.drain_timeout = drain_timeout
+        self.ready_timeout = ready_timeout
+        self.workers = {}
+        self.generation = 0
+        self.server_socket = None
+        self._reload = False
+        self._stopping = False
+
+    def run(self):
+        self.server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.server_socket.bind((self.host, self.port))
+        self.server_socket.listen(self.backlog)
+        host, port = self.server_socket.getsockname()
+        EPISODE_LOGGER.info("Supervisor listening on http://%s:%s", host, port)
+
+        signal.signal(signal.SIGHUP, self.request_reload)
+        signal.signal(signal.SIGTERM, self.request_stop)
+        signal.signal(signal.SIGINT, self.request_stop)
+
+        try:
+            if not self.start_generation():
+                EPISODE_LOGGER.error("Workers failed to start")
+                return 1
+
+            while not self._stopping:
+                if self._reload:
+                    self._reload = False
+                    self.reload()
+                self.reap(respawn=True)
+                time.sleep(0.1)
+
+            self.stop_workers(list(self.workers.values()))
+            return 0
+        finally:
+            self.server_socket.close()
+
+    def request_reload(self, signum, frame):
+        self._reload = True
+
+    def request_stop(self, signum, frame):
+        self._stopping = True
+
+    def reload(self):
+        old_workers = list(self.workers.values())
+        EPISODE_LOGGER.info("Reloading, starting generation %d", self.generation + 1)
+        if self.start_generation():
+            self.stop_workers(old_workers)
+            EPISODE_LOGGER.info("Reloaded, generation %d serving", self.generation)
+        else:
+            EPISODE_LOGGER.error(
+                "Generation %d failed to start, generation %d keeps serving",
+                self.generation,
+                old_workers[0].generation if old_workers else 0,
+            )
+
+    def start_generation(self):
+        """Fork a new generation and wait until every worker accepts.
+
+        A generation that doesn't get ready within `ready_timeout` is
+        killed and False is returned.
+        """
+        self.generation += 1
+        workers = [self.spawn(self.generation) for _ in range(self.processes)]
+        deadline = time.monotonic() + self.ready_timeout
+
+        waiting = {worker.ready_fd: worker for worker in workers}
+        while waiting and time.monotonic() < deadline and not self._stopping:
+            readable, _, _ = select.select(list(waiting), [], [], 0.1)
+            for fd in readable:
+                worker = waiting.pop(fd)
+                # Empty when the worker exited before it got ready
+                worker.ready = bool(os.read(fd, 1))
+                if not worker.ready:
+                    waiting.clear()
+
+        for worker in workers:
+            os.close(worker.ready_fd)
+        if all(worker.ready for worker in workers):
+            return True
+
+        self.kill_workers(workers)
+        return False
+
+    def spawn(self, generation):
+        ready_reader, ready_writer = os.pipe()
+        # Flushed so the child doesn't repeat the parent's buffered output
+        sys.stdout.flush()
+        sys.stderr.flush()
+        pid = os.fork()
+        if pid == 0:
+            os.close(ready_reader)
+            status = 1
+            try:
+                status = self.serve(ready_writer)
+            except BaseException:
+                EPISODE_LOGGER.exception("Worker failed")
+            finally:
+                LOG_LISTENER.stop()
+                sys.stdout.flush()
+                os._exit(status)
+
+        os.close(ready_writer)
+        worker = Worker(pid, ready_reader, generation)
+        self.workers[pid] = worker
+        return worker
+
+    def serve(self, ready_fd):
+        """Run in the worker process: load the app and serve until shut down."""
+        LOG_LISTENER.restart_after_fork()
+        signal.signal(signal.SIGHUP, signal.SIG_IGN)
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+
+        app = load_app(self.app) if isinstance(self.app, str) else self.app()
+        app.drain_timeout = self.drain_timeout
+
+        def ready():
+            # `start` warms the app up before it starts accepting
+            app.started.wait()
+            try:
+                os.write(ready_fd, b"1")
+            except OSError:
+                # A respawned worker, nobody waits for it
+                pass
+            os.close(ready_fd)
+
+        threading.Thread(target=ready, daemon=True).start()
+        app.start(sock=self.server_socket)
+        return 0
+
+    def reap(self, respawn=False):
+        """Collect exited workers, and replace the current generation's
+        unexpected exits when `respawn` is set. Returns the exited pids.
+        """
+        exited = []
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                break
+            if pid == 0:
+                break
+            worker = self.workers.pop(pid, None)
+            exited.append(pid)
+            if worker is None:
+                continue
+            if respawn and worker.generation == self.generation and not self._stopping:
+                EPISODE_LOGGER.warning(
+                    "Worker %d exited with status %d, restarting", pid, status
+                )
+                # Not waited for, it joins a generation that is serving
+                os.close(self.spawn(self.generation).ready_fd)
+        return exited
+
+    def stop_workers(self, workers):
+        """Shut `workers` down gracefully, kill them after the drain timeout."""
+        for worker in workers:
+            self.signal(worker, signal.SIGTERM)
+
+        # Workers close their connections at the drain deadline themselves
+        deadline = time.monotonic() + self.drain_timeout + 5
+        pids = {worker.pid for worker in workers}
+        while pids and time.monotonic() < deadline:
+            pids.difference_update(self.reap(respawn=True))
+            time.sleep(0.05)
+        self.kill_workers([self.workers[pid] for pid in pids if pid in self.workers])
+
+    def kill_workers(self, workers):
+        for worker in workers:
+            self.signal(worker, signal.SIGKILL)
+        for worker in workers:
+            try:
+                os.waitpid(worker.pid, 0)
+            except ChildProcessError:
+                pass
+            self.workers.pop(worker.pid, None)
+
+    def signal(self, worker, signum):
+        try:
+            os.kill(worker.pid, signum)
+        except ProcessLookupError:
+            pass
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("app", help="module:attribute of the app or app factory")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8880)
+    parser.add_argument("--processes", type=int, default=2)
+    parser.add_argument("--drain-timeout", type=float, default=30)
+    parser.add_argument("--ready-timeout", type=float, default=60)
+    args = parser.parse_args(argv)
+
+    sys.path.insert(0, os.getcwd())
+    supervisor = Supervisor(
+        args.app,
+        host=args.host,
+        port=args.port,
+        processes=args.processes,
+        drain_timeout=args.drain_timeout,
+        ready_timeout=args.ready_timeout,
+    )
+    return supervisor.run()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
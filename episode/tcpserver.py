@@ -1,7 +1,15 @@
+import signal
 import socket
-import select
+import selectors
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from enum import Enum
 
+from episode.accesslog import CURRENT_TIMER
+from episode.http.httpresponse import HttpResponse
+from episode.http.httpstatus import HTTPStatus
 from episode.logger import EPISODE_LOGGER
 
 
@@ -11,47 +19,515 @@ class AppMode(Enum):
     TEST = "Testing"
 
 
+# Longest request line and headers read before answering 431
+MAX_HEAD_SIZE = 65536
+
+
+def content_length(data, head_end):
+    """The Content-Length of the request head ending at `head_end`, 0 when
+    missing or invalid.
+    """
+    for line in bytes(data[:head_end]).split(b"\r\n")[1:]:
+        name, _, value = line.partition(b":")
+        if name.strip().lower() == b"content-length":
+            try:
+                return max(int(value.strip()), 0)
+            except ValueError:
+                return 0
+    return 0
+
+
+def request_length(data):
+    """Return the length of the request at the start of `data`, or None
+    while its head or body is still incomplete.
+    """
+    head_end = data.find(b"\r\n\r\n")
+    if head_end == -1:
+        return None
+
+    length = head_end + 4 + content_length(data, head_end)
+    return length if len(data) >= length else None
+
+
+class Connection:
+    """A client socket of the serving loop, with its read buffer and
+    the response being written to it.
+    """
+
+    def __init__(self, sock, addr):
+        self.sock = sock
+        self.addr = addr
+        self.buffer = bytearray()
+        self.response = None
+        self.pending = None
+        self.reading = True
+        self.accepted_at = self.last_active = time.monotonic()
+        self.head_received_at = None
+        # Access log timing, only when the request is sampled
+        self.timer = None
+        self.phase_started = None
+
+    def set_response(self, response):
+        self.response = response
+        if isinstance(response, bytes):
+            self.pending = memoryview(response)
+        if self.timer is not None:
+            self.timer.set_response(response)
+            self.phase_started = time.perf_counter()
+
+    def write(self):
+        """Write what the socket takes without blocking, True once done."""
+        self.last_active = time.monotonic()
+        if self.pending is None:
+            # Responses such as FileResponse write themselves
+            return self.response.send_some(self.sock)
+
+        try:
+            sent = self.sock.send(self.pending)
+        except BlockingIOError:
+            return False
+        self.pending = self.pending[sent:]
+        return not self.pending
+
+    def timed_out(self, now, server):
+        if now - self.last_active > server.idle_timeout:
+            return True
+        if not self.reading:
+            return False
+        if self.head_received_at is None:
+            return now - self.accepted_at > server.header_timeout
+        return now - self.head_received_at > server.body_timeout
+
+    def close(self):
+        if self.response is not None and not isinstance(self.response, bytes):
+            self.response.close()
+        self.sock.close()
+
+
+class AdmissionController:
+    """Caps the requests in flight, running or waiting for a worker.
+
+    Requests over `limit` are rejected with 503 and a `Retry-After` of
+    `retry_after` seconds, so an overloaded server answers quickly
+    instead of letting latency grow without bound.
+    """
+
+    def __init__(self, limit, retry_after=1):
+        self.limit = limit
+        self.retry_after = retry_after
+        self.in_flight = 0
+        self.rejected = 0
+
+    def admit(self):
+        if self.in_flight >= self.limit:
+            self.rejected += 1
+            return False
+        self.in_flight += 1
+        return True
+
+    def done(self):
+        self.in_flight -= 1
+
+
 class TCPServer:
-    def __init__(self, host="127.0.0.1", port=8880):
+    """Serves connections from one `select` loop, which reads until a
+    request is complete, handles it and writes the response without
+    blocking on any one client.
+
+    With `workers` set, requests are handled on a thread pool of that
+    size instead, so a slow handler doesn't hold up other connections.
+    When every worker is busy and `max_pending` requests are already
+    waiting, new ones are answered with 503, see `AdmissionController`.
+
+    `backlog` is the listen queue length. While `max_connections` are
+    open no more are accepted, new ones wait in the backlog. Connections
+    are closed with 408 when the request head doesn't arrive within
+    `header_timeout` seconds, the body within `body_timeout`, or nothing
+    is read or written for `idle_timeout`. A Content-Length over
+    `max_body_size` bytes is answered with 413, a head over
+    `MAX_HEAD_SIZE` with 431.
+
+    `shutdown`, also run on SIGTERM, stops accepting and lets the open
+    connections finish for up to `drain_timeout` seconds.
+    """
+
+    def __init__(
+        self,
+        host="127.0.0.1",
+        port=8880,
+        workers=0,
+        max_pending=64,
+        backlog=128,
+        max_connections=1024,
+        header_timeout=10,
+        body_timeout=30,
+        idle_timeout=5,
+        retry_after=1,
+        drain_timeout=30,
+        max_body_size=10 * 1024 * 1024,
+    ):
         self.host = host
         self.port = port
-        self.connections_fds = []
+        self.workers = workers
+        self.max_pending = max_pending
+        self.backlog = backlog
+        self.max_connections = max_connections
+        self.header_timeout = header_timeout
+        self.body_timeout = body_timeout
+        self.idle_timeout = idle_timeout
+        self.max_body_size = max_body_size
+        self.drain_timeout = drain_timeout
+        self.admission = AdmissionController(workers + max_pending, retry_after)
+        # An AccessLog, set by Episode
+        self.access_log = None
+        self.open_connections = 0
+        self.server_address = None
+        self.started = threading.Event()
+        self._running = False
+        self._wakeup = None
+        # time.monotonic() deadline of a graceful shutdown, once requested
+        self._drain_deadline = None
 
-    def start(self, host="127.0.0.1", port=8880, mode=AppMode.DEV):
+    def start(self, host=None, port=None, mode=AppMode.DEV, sock=None):
+        """Serve until `stop` or `shutdown`.
+
+        `sock` is a listening socket to accept on, e.g. one inherited from
+        a Supervisor, instead of binding `host` and `port`.
+        """
         if host:
             self.host = host
         if port:
             self.port = port
-        server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        self.connections_fds.append(server_socket)
-        server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-        server_socket.bind((self.host, self.port))
-        server_socket.listen(5)
 
-        sockhost, sockport = server_socket.getsockname()
+        # Before listening, so no connection waits on the warmup
+        self.warmup()
+
+        if sock is None:
+            server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            server_socket.bind((self.host, self.port))
+            server_socket.listen(self.backlog)
+        else:
+            server_socket = sock
+
+        self.server_address = server_socket.getsockname()
+        sockhost, sockport = self.server_address
 
         EPISODE_LOGGER.info("Serving at http://{}:{}  (Press CTRL+C to quit)".format(sockhost, sockport))
 
-        while True:
-            read_fds, _, _ = select.select(self.connections_fds, [], [], 10)
+        # Written to by `stop` and by workers to wake the loop up
+        wakeup_reader, wakeup_writer = socket.socketpair()
+        wakeup_reader.setblocking(False)
+        wakeup_writer.setblocking(False)
+        self._wakeup = wakeup_writer
+        self._running = True
+        self._drain_deadline = None
+
+        # Signal handlers can only be set from the main thread
+        previous_handler = None
+        if threading.current_thread() is threading.main_thread():
+            previous_handler = signal.signal(
+                signal.SIGTERM, lambda signum, frame: self.shutdown()
+            )
+
+        try:
+            self.serve(server_socket, wakeup_reader)
+        finally:
+            self._running = False
+            self.started.clear()
+            if previous_handler is not None:
+                signal.signal(signal.SIGTERM, previous_handler)
+            server_socket.close()
+            wakeup_reader.close()
+            wakeup_writer.close()
+
+    def warmup(self):
+        """Run before accepting connections. Override this in subclass."""
+
+    def stop(self):
+        """Stop serving now, closing the open connections."""
+        self._running = False
+        self.wakeup()
+
+    def shutdown(self, timeout=None):
+        """Stop accepting and stop serving once the open connections are
+        done, or after `timeout` (default `drain_timeout`) seconds.
+        """
+        if timeout is None:
+            timeout = self.drain_timeout
+        self._drain_deadline = time.monotonic() + timeout
+        self.wakeup()
+
+    def select_timeout(self, timeout):
+        """`timeout`, or less to wake up at the drain deadline."""
+        if self._drain_deadline is None:
+            return timeout
+        return max(0, min(timeout, self._drain_deadline - time.monotonic()))
+
+    def drained(self, open_connections):
+        """Whether a shutdown is done, leaving `open_connections` behind."""
+        if self._drain_deadline is None:
+            return False
+        if open_connections and time.monotonic() < self._drain_deadline:
+            return False
+        if open_connections:
+            EPISODE_LOGGER.warning(
+                "Closing %d connections still open at the drain deadline",
+                open_connections,
+            )
+        return True
+
+    def wakeup(self):
+        try:
+            self._wakeup.send(b"\0")
+        except (AttributeError, OSError):
+            # Not serving, or a wake up is already pending
+            pass
+
+    def serve(self, server_socket, wakeup_reader):
+        server_socket.setblocking(False)
+        selector = selectors.DefaultSelector()
+        selector.register(server_socket, selectors.EVENT_READ)
+        self._accepting = True
+        selector.register(wakeup_reader, selectors.EVENT_READ)
+
+        # Responses posted back by workers, written by this loop
+        completed = deque()
+        connections = set()
+        admission = self.admission
+        # Often enough to enforce the timeouts to within half their length
+        sweep_interval = min(
+            1, self.header_timeout / 2, self.body_timeout / 2, self.idle_timeout / 2
+        )
+        next_sweep = time.monotonic() + sweep_interval
+        executor = None
+        if self.workers:
+            executor = ThreadPoolExecutor(
+                max_workers=self.workers, thread_name_prefix="episode-worker"
+            )
+
+        def run(conn, data):
+            if conn.timer is not None:
+                conn.timer.add("queue", time.perf_counter() - conn.phase_started)
+            completed.append((conn, self.respond(data, conn.timer)))
+            if executor is not None:
+                self.wakeup()
+
+        def accept(accepting):
+            if accepting:
+                selector.register(server_socket, selectors.EVENT_READ)
+            else:
+                # New connections wait in the listen backlog meanwhile
+                selector.unregister(server_socket)
+            self._accepting = accepting
+
+        def close(conn):
+            connections.discard(conn)
+            self.open_connections = len(connections)
+            if (
+                not self._accepting
+                and self._drain_deadline is None
+                and len(connections) < self.max_connections
+            ):
+                accept(True)
+            try:
+                selector.unregister(conn.sock)
+            except (KeyError, ValueError):
+                pass
+            conn.close()
+
+        def refuse(conn, response):
+            """Answer `response` without reading the rest of the request."""
+            EPISODE_LOGGER.debug("Refused a request from %s", conn.addr)
+            conn.reading = False
+            conn.set_response(response)
+            selector.modify(conn.sock, selectors.EVENT_WRITE, conn)
+
+        def write(conn):
+            try:
+                done = conn.write()
+            except OSError as e:
+                EPISODE_LOGGER.debug("Error sending response: %s", e)
+                done = True
+            if done:
+                if conn.timer is not None:
+                    conn.timer.add("write", time.perf_counter() - conn.phase_started)
+                    self.access_log.log(conn.timer)
+                close(conn)
+
+        self.started.set()
+        try:
+            while self._running:
+                if self._drain_deadline is not None:
+                    if self._accepting:
+                        accept(False)
+                    if self.drained(len(connections)):
+                        break
+
+                for key, events in selector.select(self.select_timeout(sweep_interval)):
+                    if key.fileobj is server_socket:
+                        while True:
+                            try:
+                                sock, addr = server_socket.accept()
+                            except BlockingIOError:
+                                break
+                            EPISODE_LOGGER.debug("Connected by %s", addr)
+                            sock.setblocking(False)
+                            conn = Connection(sock, addr)
+                            connections.add(conn)
+                            self.open_connections = len(connections)
+                            selector.register(sock, selectors.EVENT_READ, conn)
+                            if len(connections) >= self.max_connections:
+                                accept(False)
+                                break
+
+                    elif key.fileobj is wakeup_reader:
+                        try:
+                            wakeup_reader.recv(4096)
+                        except BlockingIOError:
+                            pass
+
+                    elif events & selectors.EVENT_READ:
+                        conn = key.data
+                        if conn.phase_started is None:
+                            conn.timer = self.start_timer()
+                            conn.phase_started = time.perf_counter()
+                        try:
+                            data = conn.sock.recv(65536)
+                        except BlockingIOError:
+                            continue
+                        except OSError:
+                            data = b""
+                        if not data:
+                            close(conn)
+                            continue
+
+                        conn.buffer += data
+                        conn.last_active = time.monotonic()
+                        if conn.head_received_at is None:
+                            head_end = conn.buffer.find(b"\r\n\r\n")
+                            if head_end == -1:
+                                if len(conn.buffer) > MAX_HEAD_SIZE:
+                                    refuse(conn, self.HTTP_431_response())
+                                continue
+                            conn.head_received_at = conn.last_active
+                            body_size = content_length(conn.buffer, head_end)
+                            if body_size > self.max_body_size:
+                                refuse(conn, self.HTTP_413_response())
+                                continue
+
+                        length = request_length(conn.buffer)
+                        if length is None:
+                            continue
+
+                        selector.unregister(conn.sock)
+                        conn.reading = False
+                        if conn.timer is not None:
+                            now = time.perf_counter()
+                            conn.timer.add("read", now - conn.phase_started)
+                            conn.phase_started = now
+                        if executor is None:
+                            # Handled on this loop, one request at a time
+                            run(conn, bytes(conn.buffer[:length]))
+                            continue
+                        if not admission.admit():
+                            # Shed load rather than queue without bound
+                            conn.set_response(self.HTTP_503_response())
+                            selector.register(conn.sock, selectors.EVENT_WRITE, conn)
+                            continue
+
+                        executor.submit(run, conn, bytes(conn.buffer[:length]))
+
+                    elif events & selectors.EVENT_WRITE:
+                        write(key.data)
+
+                while completed:
+                    conn, response = completed.popleft()
+                    if executor is not None:
+                        admission.done()
+                    conn.set_response(response)
+                    conn.last_active = time.monotonic()
+                    selector.register(conn.sock, selectors.EVENT_WRITE, conn)
+
+                now = time.monotonic()
+                if now >= next_sweep:
+                    next_sweep = now + sweep_interval
+                    for conn in list(connections):
+                        # Connections waiting for a worker have no selector key
+                        if conn.timed_out(now, self) and (
+                            conn.reading or conn.response is not None
+                        ):
+                            EPISODE_LOGGER.debug("Connection from %s timed out", conn.addr)
+                            if conn.reading:
+                                self.reject(conn.sock, self.HTTP_408_response())
+                            close(conn)
+        finally:
+            # Closed first, a handler still running must not hold them open
+            for conn in list(connections):
+                close(conn)
+            if executor is not None:
+                executor.shutdown(wait=True)
+            while completed:
+                conn, response = completed.popleft()
+                conn.set_response(response)
+                conn.close()
+            selector.close()
+
+    def respond(self, data, timer=None):
+        # Phases timed while handling are added to the request's timer
+        token = CURRENT_TIMER.set(timer)
+        try:
+            return self.handle_request(data)
+        except Exception:
+            # A failing handler must not take the server down
+            EPISODE_LOGGER.exception("Error handling request")
+            return self.HTTP_500_response()
+        finally:
+            CURRENT_TIMER.reset(token)
+
+    def start_timer(self):
+        if self.access_log is None:
+            return None
+        return self.access_log.start()
+
+    def HTTP_500_response(self):
+        return HttpResponse().write(
+            b"<h1>500 Internal Server Error</h1>",
+            status_code=HTTPStatus.INTERNAL_SERVER_ERROR,
+        )
+
+    def HTTP_503_response(self):
+        return HttpResponse().write(
+            b"<h1>503 Service Unavailable</h1>",
+            extra_headers={"Retry-After": str(self.admission.retry_after)},
+            status_code=HTTPStatus.SERVICE_UNAVAILABLE,
+        )
 
-            for fd in read_fds:
-                if fd == server_socket:
-                    conn, addr = server_socket.accept()
-                    print("Connected by", addr)
-                    self.connections_fds.append(conn)
-                else:
-                    data = fd.recv(1024)
+    def HTTP_413_response(self):
+        return HttpResponse().write(
+            b"<h1>413 Content Too Large</h1>",
+            status_code=HTTPStatus.REQUEST_ENTITY_TOO_LARGE,
+        )
 
-                    response = self.handle_request(data)
+    def HTTP_431_response(self):
+        return HttpResponse().write(
+            b"<h1>431 Request Header Fields Too Large</h1>",
+            status_code=HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE,
+        )
 
-                    fd.sendall(response)
-                    fds = self.connections_fds.copy()
-                    for i in fds:
-                        if i == fd:
-                            self.connections_fds.remove(i)
+    def HTTP_408_response(self):
+        return HttpResponse().write(
+            b"<h1>408 Request Timeout</h1>", status_code=HTTPStatus.REQUEST_TIMEOUT
+        )
 
-                    fd.close()
+    def reject(self, sock, response):
+        """Best effort write of a short error `response`, then close."""
+        try:
+            sock.setblocking(False)
+            sock.send(response)
+        except OSError:
+            pass
+        sock.close()
 
     def handle_request(self, data):
         """Handles incoming data and returns a response.
@@ -1,27 +1,96 @@
 import os
 import sys
+import threading
 
 from .template import Oeye
 
 sys.path.append(os.path.join(os.path.dirname(__file__), "../"))
 
+from episode.accesslog import timed
 from episode.http.httpresponse import HttpResponse
 
 
-__all__ = ["render_template"]
+__all__ = ["render_template", "TemplateCache", "TEMPLATE_CACHE"]
+
+
+FILTERS = {"upper": str.upper, "capitalize": str.capitalize, "lower": str.lower}
+
+
+class TemplateCache:
+    """Compiled templates and context-free renders, keyed by file path.
+
+    Entries are revalidated against the file modification time, so an
+    edited template is recompiled on its next render.
+    """
+
+    def __init__(self):
+        self._templates = {}
+        self._renders = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, template):
+        """Return the compiled Oeye for the `template` file."""
+        mtime_ns = os.stat(template).st_mtime_ns
+        entry = self._templates.get(template)
+        if entry is not None and entry[0] == mtime_ns:
+            self.hits += 1
+            return entry[1]
+
+        self.misses += 1
+        with open(template, "r") as f:
+            oeye = Oeye(f.read(), FILTERS)
+        with self._lock:
+            self._templates[template] = (mtime_ns, oeye)
+            self._renders.pop(template, None)
+        return oeye
+
+    def render(self, template):
+        """Return the rendered `template` file for an empty context."""
+        mtime_ns = os.stat(template).st_mtime_ns
+        entry = self._renders.get(template)
+        if entry is not None and entry[0] == mtime_ns:
+            self.hits += 1
+            return entry[1]
+
+        rendered_template = self.get(template).render({}).encode()
+        with self._lock:
+            self._renders[template] = (mtime_ns, rendered_template)
+        return rendered_template
+
+    def precompile(self, directory, extensions=(".html",)):
+        """Compile the templates under `directory`, return how many."""
+        compiled = 0
+        for root, _, names in os.walk(directory):
+            for name in names:
+                if name.endswith(extensions):
+                    # Keyed like render_template("templates/page.html")
+                    self.get(os.path.normpath(os.path.join(root, name)))
+                    compiled += 1
+        return compiled
+
+    def clear(self):
+        with self._lock:
+            self._templates.clear()
+            self._renders.clear()
+
+
+TEMPLATE_CACHE = TemplateCache()
 
 
 def render_template(template, context=None, headers=None):
     """Render an html template using the Oeye templete engine"""
     try:
-        filters = {"upper": str.upper, "capitalize": str.capitalize, "lower": str.lower}
-        with open(template, "r") as f:
-            html_content = f.read()
-            oeye = Oeye(html_content, filters)
-
-            rendered_template = oeye.render(context or {})
+        with timed("template"):
+            if context:
+                oeye = TEMPLATE_CACHE.get(template)
+                rendered_template = oeye.render(context).encode()
+            else:
+                # Without a context the output only changes with the file
+                rendered_template = TEMPLATE_CACHE.render(template)
 
-            return HttpResponse().write(rendered_template.encode(), extra_headers=headers, content_type="html")
+        return HttpResponse().write(rendered_template, extra_headers=headers, content_type="html")
 
     except IOError as e:
         raise IOError(e)
@@ -1,12 +1,13 @@
 from episode.episode import Episode
 from episode.http.httpresponse import HttpResponse
+from episode.http.jsonresponse import JsonResponse
 from episode.http.httpstatus import HTTPStatus
-from episode.model import Model, Session, DBMS, DBConnection
+from episode.model import Model, Session, DBMS, DBConnection, Index
 from episode.template_engine import render_template
 
 file_path = "student_db.sqlite"
 db_conn = DBConnection.dialect(DBMS.SQLITE)
-connection = db_conn(database_path=file_path)
+connection = db_conn(database_path=file_path, tuned=True)
 
 
 class Student(Model):
@@ -15,6 +16,8 @@ class Student(Model):
     user_name: str
     age: int
 
+    __indexes__ = [Index("user_name", unique=True)]
+
 
 with Session(connection) as session:
     session.drop_create(Student)
@@ -70,11 +73,8 @@ if __name__ == "__main__":
     def delete_student_by_username(request, username: str):
         with Session(connection) as session:
             sql_stmt = session.select(Student).where(Student.user_name == username)
-            students = list(session.exec(sql_stmt))
-            student = students[0] if students else None
 
-            if student:
-                session.delete(student)
+            if sql_stmt.delete():
                 return HttpResponse().write(
                     "Student Deleted successfully", status_code=HTTPStatus.CREATED
                 )
@@ -88,10 +88,10 @@ if __name__ == "__main__":
     # Expecting path parameter 'id' and a query parameter 'q'
     @episode.route("/data/{id}/")
     def get_params(request, id: int, q: int):
-        return HttpResponse().write({"id": id, "query_param": q})
+        return JsonResponse().write({"id": id, "query_param": q})
 
 
-    @episode.get("/index/")
+    @episode.get("/index/", cache=60)
     def get_index(request):
         return render_template(
             "index.html", context={"topics": ["Python", "Golang", "Java", "C++"]}
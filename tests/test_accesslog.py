@@ -0,0 +1,131 @@
+import io
+import json
+import os
+import socket
+import sys
+import tempfile
+import threading
+import time
+import unittest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "../"))
+from episode.accesslog import AccessEntry, AccessLog, RequestTimer
+from episode.episode import Episode
+from episode.http.httpresponse import HttpResponse
+from episode.model import Model, Session, DBMS, DBConnection
+from episode.route import Router
+
+
+class Visit(Model):
+    page: str
+
+
+class RequestTimerTests(unittest.TestCase):
+    def test_nested_phases_are_exclusive(self):
+        timer = RequestTimer()
+        with timer.phase("handler"):
+            with timer.phase("db"):
+                time.sleep(0.05)
+            with timer.phase("db"):
+                pass
+
+        self.assertGreaterEqual(timer.phases["db"], 0.05)
+        self.assertLess(timer.phases["handler"], 0.05)
+        self.assertEqual(timer.counts, {"db": 2, "handler": 1})
+        self.assertAlmostEqual(
+            timer.duration, timer.phases["db"] + timer.phases["handler"]
+        )
+
+    def test_custom_format(self):
+        timer = RequestTimer()
+        timer.method, timer.path = "GET", "/index"
+        timer.set_response(HttpResponse().write(b"hi"))
+        timer.add("handler", 0.0125)
+
+        entry = AccessEntry(timer, "%(method)s %(path)s %(status)d %(handler_ms).1f")
+        self.assertEqual(str(entry), "GET /index 200 12.5")
+
+
+class AccessLogTests(unittest.TestCase):
+    server_options = {}
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        db_connect = DBConnection.dialect(DBMS.SQLITE)
+        connection = db_connect(
+            database_path=os.path.join(self.tmp_dir.name, "test.sqlite")
+        )
+        with Session(connection) as session:
+            session.drop_create(Visit)
+
+        self.stream = io.StringIO()
+        self.app = Episode(
+            port=0, access_log=AccessLog(stream=self.stream), **self.server_options
+        )
+        self.app.router = Router()
+
+        @self.app.get("/visit/{page}")
+        def visit(request, page: str):
+            with Session(connection) as session:
+                session.save(Visit(page=page))
+                count = session.select(Visit).count()
+            return HttpResponse().write(str(count))
+
+        self.thread = threading.Thread(target=self.app.start)
+        self.thread.start()
+        self.assertTrue(self.app.started.wait(5))
+
+    def tearDown(self):
+        self.app.stop()
+        self.thread.join(5)
+        self.tmp_dir.cleanup()
+
+    def fetch(self, path):
+        with socket.create_connection(self.app.server_address, timeout=5) as client:
+            client.sendall(f"GET {path} HTTP/1.1\r\n\r\n".encode())
+            chunks = []
+            while True:
+                chunk = client.recv(65536)
+                if not chunk:
+                    return b"".join(chunks)
+                chunks.append(chunk)
+
+    def entries(self):
+        self.app.access_log.close()
+        return [json.loads(line) for line in self.stream.getvalue().splitlines()]
+
+    def test_request_is_logged_with_phases(self):
+        self.fetch("/visit/home")
+        self.fetch("/missing")
+
+        first, second = self.entries()
+        self.assertEqual(
+            (first["method"], first["path"], first["status"]),
+            ("GET", "/visit/home", 200),
+        )
+        self.assertEqual(first["db_queries"], 2)
+        self.assertTrue(
+            {"read", "parse", "route", "bind", "handler", "db", "write"}
+            <= set(first["phases"])
+        )
+        self.assertAlmostEqual(
+            first["duration_ms"], sum(first["phases"].values()), places=2
+        )
+        self.assertEqual(second["status"], 404)
+        self.assertEqual(second["db_queries"], 0)
+
+    def test_sampling(self):
+        self.app.access_log.sample_rate = 0
+        self.fetch("/visit/home")
+
+        self.assertEqual(self.entries(), [])
+
+
+class WorkerModeAccessLogTests(AccessLogTests):
+    server_options = {"workers": 2}
+
+    def test_queue_phase(self):
+        self.fetch("/visit/home")
+
+        (entry,) = self.entries()
+        self.assertIn("queue", entry["phases"])
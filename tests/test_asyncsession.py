@@ -0,0 +1,258 @@
+import asyncio
+import os
+import socket
+import sys
+import tempfile
+import threading
+import time
+import unittest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "../"))
+from episode.asyncsession import AsyncConnectionPool, AsyncSession
+from episode.episode import Episode
+from episode.hooks import HOOKS
+from episode.http.jsonresponse import JsonResponse, StdlibJsonEncoder
+from episode.model import DBConnection, DBMS, Max, Model
+from episode.route import Router
+
+
+class Faculty(Model):
+    name: str
+
+
+class Course(Model):
+    title: str
+    credits: int
+
+
+class Lecturer(Model):
+    name: str
+    course: Course
+    faculty: Faculty
+
+
+class AsyncSQLiteTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        db_connect = DBConnection.dialect(DBMS.SQLITE)
+        self.connection = db_connect(
+            database_path=os.path.join(self.tmp_dir.name, "async.sqlite")
+        )
+        self.pool = AsyncConnectionPool(self.connection, size=4)
+
+        async def create():
+            session = AsyncSession(self.pool)
+            await session.drop_create(Course)
+            for index, title in enumerate(["Algebra", "Biology", "Chemistry"]):
+                await session.save(Course(title=title, credits=index + 1))
+
+        asyncio.run(create())
+
+    def tearDown(self):
+        self.pool.close()
+        self.tmp_dir.cleanup()
+
+
+class AsyncSessionTests(AsyncSQLiteTestCase):
+    def test_select_and_iterate(self):
+        async def read():
+            async with AsyncSession(self.pool) as session:
+                query = session.select(Course).order_by("-credits")
+                titles = [course.title async for course in session.exec(query)]
+                courses = await session.exec(session.select(Course))
+                first = await session.exec(
+                    session.select(Course).where(Course.title == "Biology")
+                ).first()
+                missing = await session.exec(
+                    session.select(Course).where(Course.title == "Art")
+                ).first()
+                return titles, courses, first, missing
+
+        titles, courses, first, missing = asyncio.run(read())
+
+        self.assertEqual(titles, ["Chemistry", "Biology", "Algebra"])
+        self.assertEqual(len(courses), 3)
+        self.assertEqual(first.credits, 2)
+        self.assertIsNone(missing)
+
+    def test_writes_and_aggregates(self):
+        async def write():
+            session = AsyncSession(self.pool)
+            course = await session.get(Course, 1)
+            course.credits = 10
+            await session.save(course)
+            updated = await session.select(Course).where(Course.credits < 3).update(
+                credits=5
+            )
+            await session.delete(await session.get(Course, 3))
+            count, aggregate = await asyncio.gather(
+                session.select(Course).count(),
+                session.select(Course).aggregate(most=Max(Course.credits)),
+            )
+            return updated, count, aggregate
+
+        updated, count, aggregate = asyncio.run(write())
+
+        self.assertEqual(updated, 1)
+        self.assertEqual(count, 2)
+        self.assertEqual(aggregate, {"most": 10})
+
+    def test_queries_run_concurrently(self):
+        def slow_count(session):
+            time.sleep(0.2)
+            return session.count(session.select(Course))
+
+        async def read():
+            return await asyncio.gather(*(self.pool.run(slow_count) for _ in range(4)))
+
+        started = time.perf_counter()
+        counts = asyncio.run(read())
+
+        self.assertEqual(counts, [3, 3, 3, 3])
+        self.assertLess(time.perf_counter() - started, 0.6)
+        self.assertEqual(self.pool.pool_stats()["threads_open"], 4)
+
+    def test_stream_in_batches(self):
+        async def read():
+            session = AsyncSession(self.pool)
+            for index in range(7):
+                await session.save(Course(title=f"Extra {index}", credits=0))
+
+            result = session.exec(session.select(Course).order_by("id"), batch_size=2)
+            ids = [course.id async for course in result]
+
+            async for course in session.exec(session.select(Course), batch_size=2):
+                if course.id == 3:
+                    break
+            # The pool thread streaming the rows is released
+            for _ in range(100):
+                if self.pool.pool_stats()["threads_busy"] == 0:
+                    break
+                await asyncio.sleep(0.01)
+            return ids, self.pool.pool_stats()["threads_busy"]
+
+        ids, busy = asyncio.run(read())
+
+        self.assertEqual(ids, list(range(1, 11)))
+        self.assertEqual(busy, 0)
+
+    def test_stream_error_reaches_the_caller(self):
+        async def read():
+            session = AsyncSession(self.pool)
+            query = session.select(Course).where(Course.credits > 0)
+            query._where_condition = "missing_column > 0"
+            return [course async for course in session.exec(query)]
+
+        with self.assertRaises(Exception):
+            asyncio.run(read())
+
+    def save_lecturer(self, session):
+        async def save():
+            await session.drop_create(Faculty)
+            await session.drop_create(Lecturer)
+            faculty = Faculty(name="Science")
+            await session.save(faculty)
+            course = await session.get(Course, 2)
+            await session.save(Lecturer(name="Ama", course=course, faculty=faculty))
+
+        return save()
+
+    def test_eager_relations_are_loaded_on_the_pool(self):
+        async def read():
+            session = AsyncSession(self.pool)
+            await self.save_lecturer(session)
+            lecturers = await session.exec(session.select(Lecturer).eager())
+            streamed = [
+                lecturer
+                async for lecturer in session.exec(
+                    session.select(Lecturer).eager("faculty")
+                )
+            ]
+            return lecturers, streamed
+
+        lecturers, streamed = asyncio.run(read())
+
+        # Read on this thread, without a query
+        self.assertEqual(lecturers[0].course.title, "Biology")
+        self.assertEqual(streamed[0].faculty.name, "Science")
+        response = JsonResponse(StdlibJsonEncoder()).write(lecturers)
+        self.assertIn(b"Biology", response)
+
+    def test_lazy_relations_are_not_queried(self):
+        statements = []
+
+        def on_db_query(statement, params, seconds, rows):
+            statements.append(statement)
+
+        async def read():
+            session = AsyncSession(self.pool)
+            await self.save_lecturer(session)
+            HOOKS.on("on_db_query", on_db_query)
+            try:
+                lecturers = await session.exec(session.select(Lecturer).lazy())
+                lecturer = await session.get(Lecturer, 1)
+            finally:
+                HOOKS.remove("on_db_query", on_db_query)
+            return lecturers, lecturer
+
+        lecturers, lecturer = asyncio.run(read())
+
+        self.assertEqual(len(statements), 2)
+        self.assertTrue(all("lecturer" in statement.lower() for statement in statements))
+        self.assertEqual(lecturers[0].course.id, 2)
+        self.assertFalse(lecturer.faculty.is_loaded)
+        # Loading would query through the pool's connection from this thread
+        with self.assertRaises(Exception):
+            lecturer.course.title
+
+    def test_errors_reach_the_caller(self):
+        def query_error(session):
+            raise ValueError("broken")
+
+        with self.assertRaises(ValueError):
+            asyncio.run(self.pool.run(query_error))
+
+        self.pool.close()
+        with self.assertRaises(Exception):
+            asyncio.run(AsyncSession(self.pool).select(Course).count())
+
+    def test_memory_database_uses_one_thread(self):
+        db_connect = DBConnection.dialect(DBMS.SQLITE)
+        pool = AsyncConnectionPool(db_connect(database_path=":memory:"), size=4)
+
+        self.assertEqual(pool.size, 1)
+
+
+class AsyncHandlerTests(AsyncSQLiteTestCase):
+    def test_async_handler_awaits_queries(self):
+        app = Episode(port=0)
+        app.router = Router()
+
+        @app.get("/courses/{title}")
+        async def course(request, title: str):
+            session = AsyncSession(self.pool)
+            found, total = await asyncio.gather(
+                session.exec(session.select(Course).where(Course.title == title)).first(),
+                session.select(Course).count(),
+            )
+            return JsonResponse().write({"credits": found.credits, "total": total})
+
+        thread = threading.Thread(target=app.start)
+        thread.start()
+        self.assertTrue(app.started.wait(5))
+        try:
+            with socket.create_connection(app.server_address, timeout=5) as client:
+                client.sendall(b"GET /courses/Biology HTTP/1.1\r\n\r\n")
+                response = b""
+                while True:
+                    chunk = client.recv(65536)
+                    if not chunk:
+                        break
+                    response += chunk
+        finally:
+            app.stop()
+            thread.join(5)
+
+        self.assertTrue(response.startswith(b"HTTP/1.1 200 "))
+        self.assertIn(b'"credits":2', response.replace(b" ", b""))
+        self.assertIn(b'"total":3', response.replace(b" ", b""))
@@ -0,0 +1,71 @@
+import os
+import sys
+import threading
+import unittest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "../"))
+sys.path.append(os.path.join(os.path.dirname(__file__), "../benchmarks"))
+from app import create_app
+from loadgen import percentile, run_load
+from run import SCENARIOS, compare
+import microbench
+
+
+class LoadGeneratorTests(unittest.TestCase):
+    def test_percentile(self):
+        values = [index / 1000 for index in range(1, 1001)]
+
+        self.assertEqual(percentile(values, 50), 0.5)
+        self.assertEqual(percentile(values, 99), 0.99)
+        self.assertEqual(percentile(values, 99.9), 0.999)
+        self.assertEqual(percentile([], 50), 0.0)
+
+    def test_compare_flags_regressions(self):
+        def result(rps, p99_ms):
+            return {
+                "scenario": "hello",
+                "mode": "select",
+                "concurrency": 1,
+                "rps": rps,
+                "p99_ms": p99_ms,
+            }
+
+        baseline = {"results": [result(1000, 2.0)]}
+
+        self.assertFalse(compare([result(950, 2.1)], baseline, 0.1)[1])
+        self.assertTrue(compare([result(850, 2.0)], baseline, 0.1)[1])
+        self.assertTrue(compare([result(1000, 2.5)], baseline, 0.1)[1])
+
+    def test_scenarios_against_app(self):
+        app = create_app()
+        thread = threading.Thread(target=app.start)
+        thread.start()
+        self.assertTrue(app.started.wait(5))
+        try:
+            for scenario in SCENARIOS.values():
+                result = run_load(app.server_address, scenario, 4, duration=0.2)
+                self.assertEqual(result.errors, 0, scenario.name)
+                self.assertGreater(len(result.latencies), 0, scenario.name)
+        finally:
+            app.stop()
+            thread.join(5)
+
+
+class MicroBenchmarkTests(unittest.TestCase):
+    def test_benchmarks_are_discovered(self):
+        names = microbench.load_benchmarks()
+
+        for prefix in ("router.", "http.", "template.", "model."):
+            self.assertTrue(any(name.startswith(prefix) for name in names), prefix)
+
+    def test_measure_and_compare(self):
+        seconds = microbench.measure(lambda: None, repeat=2, min_time=0.01)
+        self.assertGreater(seconds, 0)
+
+        baseline = {"results": [{"name": "noop", "seconds": 1.0}]}
+        self.assertFalse(
+            microbench.compare([{"name": "noop", "seconds": 1.1}], baseline, 0.15)[1]
+        )
+        self.assertTrue(
+            microbench.compare([{"name": "noop", "seconds": 1.2}], baseline, 0.15)[1]
+        )
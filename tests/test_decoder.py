@@ -0,0 +1,138 @@
+import json
+import os
+import sys
+import unittest
+from typing import Optional
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "../"))
+from episode.decoder import ModelDecoder, ValidationError
+from episode.episode import Episode
+from episode.http.httpresponse import HttpResponse
+from episode.model import Model
+from episode.route import Router
+
+
+class Address(Model):
+    city: str
+
+
+class Person(Model):
+    name: str
+    age: int
+    height: float
+    active: bool
+    nickname: Optional[str]
+    address: Address
+
+
+def request(body, content_type="application/json"):
+    lines = ["POST /people HTTP/1.1", f"Content-Type: {content_type}", "", ""]
+    return "\r\n".join(lines).encode() + body
+
+
+class ModelDecoderTests(unittest.TestCase):
+    def setUp(self):
+        self.decoder = ModelDecoder.for_model(Person)
+
+    def test_decoder_is_cached(self):
+        self.assertIs(ModelDecoder.for_model(Person), self.decoder)
+
+    def test_json_body(self):
+        body = json.dumps(
+            {
+                "name": "Ama",
+                "age": 30,
+                "height": 2,
+                "active": True,
+                "address": {"city": "Accra"},
+            },
+            indent=2,
+        ).encode()
+        person = self.decoder.decode(body, "application/json; charset=utf-8")
+
+        self.assertEqual(person.name, "Ama")
+        self.assertEqual(person.height, 2.0)
+        self.assertIsNone(person.nickname)
+        self.assertIsNone(person.id)
+        self.assertEqual(person.address.city, "Accra")
+
+    def test_form_body(self):
+        person = ModelDecoder.for_model(Address).decode(
+            b"city=Kumasi", "application/x-www-form-urlencoded"
+        )
+        self.assertEqual(person.city, "Kumasi")
+
+        with self.assertRaises(ValidationError) as cm:
+            self.decoder.decode(
+                b"name=Ama&age=x&height=1.5&active=on&address=1",
+                "application/x-www-form-urlencoded",
+            )
+        self.assertEqual(
+            cm.exception.errors,
+            [
+                {"field": "age", "message": "Expected integer"},
+                {"field": "address", "message": "Expected Address"},
+            ],
+        )
+
+    def test_field_errors(self):
+        body = b'{"name": 1, "age": "30", "address": {"town": "Tema"}, "extra": 0}'
+        with self.assertRaises(ValidationError) as cm:
+            self.decoder.decode(body)
+
+        self.assertEqual(cm.exception.status_code, 422)
+        self.assertEqual(
+            cm.exception.errors,
+            [
+                {"field": "name", "message": "Expected string"},
+                {"field": "age", "message": "Expected integer"},
+                {"field": "address.town", "message": "Unknown field"},
+                {"field": "address.city", "message": "Field is required"},
+                {"field": "extra", "message": "Unknown field"},
+                {"field": "height", "message": "Field is required"},
+                {"field": "active", "message": "Field is required"},
+            ],
+        )
+
+    def test_bad_bodies(self):
+        for body, content_type, status_code in [
+            (b"", "application/json", 400),
+            (b"{not json", "application/json", 400),
+            (b"[1, 2]", "application/json", 400),
+            (b"<person/>", "application/xml", 415),
+        ]:
+            with self.assertRaises(ValidationError) as cm:
+                self.decoder.decode(body, content_type)
+            self.assertEqual(cm.exception.status_code, status_code)
+
+
+class HandlerBodyTests(unittest.TestCase):
+    def setUp(self):
+        self.app = Episode()
+        self.app.router = Router()
+
+        @self.app.post("/people")
+        def add_address(request, address: Address):
+            return HttpResponse().write(address.city)
+
+    def test_valid_body(self):
+        response = self.app.handle_request(request(b'{"city": "Accra"}'))
+        self.assertTrue(response.startswith(b"HTTP/1.1 200 OK"))
+        self.assertTrue(response.endswith(b"\r\n\r\nAccra"))
+
+    def test_invalid_body_gets_structured_error(self):
+        response = self.app.handle_request(request(b'{"city": 3}'))
+        head, _, body = response.partition(b"\r\n\r\n")
+
+        self.assertTrue(head.startswith(b"HTTP/1.1 422 Unprocessable"))
+        self.assertIn(b"Content-Type: application/json", head)
+        self.assertEqual(
+            json.loads(body),
+            {
+                "detail": "Invalid `Address`",
+                "errors": [{"field": "city", "message": "Expected string"}],
+            },
+        )
+
+        response = self.app.handle_request(request(b""))
+        self.assertTrue(response.startswith(b"HTTP/1.1 400 Bad Request"))
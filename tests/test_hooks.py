@@ -0,0 +1,138 @@
+import os
+import sys
+import tempfile
+import threading
+import time
+import unittest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "../"))
+from episode.episode import Episode
+from episode.hooks import HOOKS
+from episode.http.httpresponse import HttpResponse
+from episode.model import Model, Session, DBMS, DBConnection
+from episode.profiler import RouteProfiler, StackSampler
+from episode.route import Router
+
+
+class Note(Model):
+    text: str
+
+
+def busy():
+    deadline = time.perf_counter() + 0.02
+    while time.perf_counter() < deadline:
+        pass
+
+
+class HooksTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        db_connect = DBConnection.dialect(DBMS.SQLITE)
+        connection = db_connect(
+            database_path=os.path.join(self.tmp_dir.name, "test.sqlite")
+        )
+        with Session(connection) as session:
+            session.drop_create(Note)
+
+        self.app = Episode(port=0)
+        self.app.router = Router()
+
+        @self.app.get("/notes/{text}")
+        def add_note(request, text: str):
+            with Session(connection) as session:
+                session.save(Note(text=text))
+                count = session.select(Note).count()
+            busy()
+            return HttpResponse().write(str(count))
+
+    def tearDown(self):
+        HOOKS.clear()
+        self.tmp_dir.cleanup()
+
+    def get(self, path):
+        return self.app.handle_request(f"GET {path} HTTP/1.1\r\n\r\n".encode())
+
+    def test_events_run_in_order(self):
+        events = []
+        self.app.hook("before_request")(lambda request: events.append("request"))
+        self.app.hook("after_route")(
+            lambda request, handler: events.append(("route", request.route))
+        )
+        self.app.hook("before_handler")(
+            lambda request, handler, params: events.append(("handler", params))
+        )
+        self.app.hook("on_db_query")(
+            lambda statement, params, seconds, rows: events.append(
+                statement.split()[0]
+            )
+        )
+        self.app.hook("after_response")(
+            lambda request, response: events.append(response[9:12])
+        )
+
+        self.get("/notes/hello")
+
+        self.assertEqual(
+            events,
+            [
+                "request",
+                ("route", "/notes/{text}"),
+                ("handler", {"text": "hello"}),
+                "INSERT",
+                "SELECT",
+                b"200",
+            ],
+        )
+
+    def test_failing_hook_is_logged_not_raised(self):
+        def fail(request):
+            raise RuntimeError("hook failed")
+
+        self.app.hook("before_request")(fail)
+
+        with self.assertLogs("EPISODE", "ERROR"):
+            response = self.get("/notes/hello")
+        self.assertTrue(response.startswith(b"HTTP/1.1 200 "))
+
+    def test_unknown_event(self):
+        with self.assertRaises(Exception):
+            self.app.hook("before_everything")
+
+    def test_cprofile_samples_one_in_every(self):
+        profiler = self.app.profile(every=2)
+        for _ in range(5):
+            self.get("/notes/hello")
+        self.get("/missing")
+
+        self.assertEqual(profiler.profiles["/notes/{text}"].samples, 3)
+        self.assertEqual(profiler.profiles["unmatched"].samples, 1)
+        self.assertIn("busy", profiler.dump("/notes/{text}"))
+
+        paths = profiler.save(os.path.join(self.tmp_dir.name, "profiles"))
+        self.assertEqual(
+            sorted(os.path.basename(path) for path in paths),
+            ["notes_text.prof", "unmatched.prof"],
+        )
+
+    def test_stack_sampler(self):
+        profiler = self.app.profile(every=1, sampler="stack")
+        self.get("/notes/hello")
+
+        self.assertIn("busy (test_hooks.py)", profiler.dump())
+
+    def test_stack_sampler_counts_stop_at_remove(self):
+        sampler = StackSampler(interval=0.0001)
+        thread_id = threading.get_ident()
+        sampler.add(thread_id)
+        busy()
+        stacks = sampler.remove(thread_id)
+        counted = dict(stacks)
+        time.sleep(0.05)
+
+        self.assertTrue(any("busy (test_hooks.py)" in stack for stack in counted))
+        self.assertEqual(stacks, counted)
+        self.assertEqual(sampler.remove(thread_id), {})
+
+    def test_unknown_sampler(self):
+        with self.assertRaises(Exception):
+            RouteProfiler(sampler="perf")
@@ -1,11 +1,15 @@
+import gzip
 import os
 import sys
+import threading
 import unittest
+import zlib
 
 sys.path.append(os.path.join(os.path.dirname(__file__), "../"))
-from episode.http.httprequest import HttpRequest
+from episode.http.httprequest import HttpRequest, QueryDict
 from episode.http.httpresponse import HttpResponse
 from episode.http.httpstatus import HTTPStatus
+from episode.http.compression import Compressor
 
 get_request_info = b"""GET /library/\r
 Host: www.cloudacademy.com\r
@@ -54,6 +58,32 @@ class HttpRequestTests(unittest.TestCase):
         http_request_body = self.post_request_obj.body.decode()
         self.assertEqual(http_request_body, '{"first_name": "John", "last_name": "Doe", "age": 34}')
 
+    def test_multiline_request_body(self):
+        request = HttpRequest(b'POST / HTTP/1.1\r\nHost: a\r\n\r\n{\r\n  "age": 34\r\n}')
+        self.assertEqual(request.body, b'{\r\n  "age": 34\r\n}')
+        self.assertEqual(request.headers, {"Host": ["a"]})
+
+
+class QueryParametersTests(unittest.TestCase):
+    def test_query_dict(self):
+        query = QueryDict("tag=a&tag=b%20c&expr=x%3D1&empty=&plus=1+2")
+
+        self.assertEqual(query["tag"], "b c")
+        self.assertEqual(query.getlist("tag"), ["a", "b c"])
+        self.assertEqual(query["expr"], "x=1")
+        self.assertEqual(query["empty"], "")
+        self.assertEqual(query["plus"], "1 2")
+        self.assertEqual(query.getlist("missing"), [])
+
+    def test_request_query(self):
+        request = HttpRequest(b"GET /search?q=a=b?c&page=2 HTTP/1.1\r\n\r\n")
+
+        self.assertEqual(request.path, "/search")
+        self.assertEqual(request.query_string, "q=a=b?c&page=2")
+        self.assertIsNone(request._query_parameters)
+        self.assertEqual(request.query_parameters, {"q": "a=b?c", "page": "2"})
+        self.assertIs(request.query_parameters, request.query_parameters)
+
 
 class HttpResponseTests(unittest.TestCase):
     @classmethod
@@ -77,3 +107,91 @@ class HttpResponseTests(unittest.TestCase):
         expected_response_headers = b'Server: EpisodeServer\r\nContent-Type: text/plain\r\n'
 
         self.assertEqual(expected_response_headers, response_headers)
+
+    def test_concurrent_content_types(self):
+        wrong = []
+
+        def write(content_type, expected):
+            for _ in range(5000):
+                response = HttpResponse().write(b"{}", content_type=content_type)
+                if f"Content-Type: {expected}\r\n".encode() not in response:
+                    wrong.append(response)
+
+        threads = [
+            threading.Thread(target=write, args=("json", "application/json")),
+            threading.Thread(target=write, args=("html", "text/html")),
+            threading.Thread(target=write, args=("plain", "text/plain")),
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(wrong, [])
+        self.assertEqual(HttpResponse.headers["Content-Type"], "text/html")
+
+
+class CompressorTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.compressor = Compressor(min_size=100)
+        cls.body = b"<p>Episode</p>" * 50
+        cls.html_response = HttpResponse().write(cls.body, content_type="html")
+
+    def request(self, accept_encoding):
+        return HttpRequest(
+            f"GET / HTTP/1.1\r\nAccept-Encoding: {accept_encoding}\r\n\r\n".encode()
+        )
+
+    def test_negotiate(self):
+        self.assertEqual(self.compressor.negotiate("gzip, deflate, br"), "gzip")
+        self.assertEqual(self.compressor.negotiate("gzip;q=0, deflate"), "deflate")
+        self.assertEqual(self.compressor.negotiate("*"), "gzip")
+        self.assertIsNone(self.compressor.negotiate("br"))
+        self.assertIsNone(self.compressor.negotiate(None))
+        self.assertEqual(self.compressor.negotiate("deflate;q=1, gzip;q=0.5"), "deflate")
+        self.assertEqual(self.compressor.negotiate("deflate;q=0.5, gzip;q=0.5"), "gzip")
+        self.assertEqual(self.compressor.negotiate("deflate, *;q=0.1"), "deflate")
+
+    def test_gzip_response(self):
+        response = self.compressor.compress(self.request("gzip"), self.html_response)
+        head, _, body = response.partition(b"\r\n\r\n")
+
+        self.assertIn(b"\r\nContent-Encoding: gzip\r\nVary: Accept-Encoding", head)
+        self.assertEqual(gzip.decompress(body), self.body)
+
+    def test_deflate_response(self):
+        response = self.compressor.compress(self.request("deflate"), self.html_response)
+        _, _, body = response.partition(b"\r\n\r\n")
+
+        self.assertEqual(zlib.decompress(body), self.body)
+
+    def test_skipped_responses(self):
+        small = HttpResponse().write(b"<p>hi</p>", content_type="html")
+        binary = HttpResponse().write(self.body, content_type="image/png")
+
+        for response in (small, binary):
+            self.assertEqual(self.compressor.compress(self.request("gzip"), response), response)
+        self.assertEqual(
+            self.compressor.compress(self.request("identity"), self.html_response),
+            self.html_response,
+        )
+
+    def test_compressed_bodies_are_cached(self):
+        first = self.compressor.compress(self.request("gzip"), self.html_response)
+        second = self.compressor.compress(self.request("gzip"), self.html_response)
+
+        self.assertEqual(first, second)
+        self.assertIn(first.partition(b"\r\n\r\n")[2], self.compressor._cache.values())
+
+    def test_cache_is_bounded_by_bytes(self):
+        compressor = Compressor(min_size=1, cache_bytes=1000)
+        for index in range(50):
+            body = f"<p>{index}</p>".encode() * 100
+            response = HttpResponse().write(body, content_type="html")
+            compressor.compress(self.request("gzip"), response)
+
+        self.assertLessEqual(compressor._cached_bytes, 1000)
+        self.assertEqual(
+            compressor._cached_bytes, sum(map(len, compressor._cache.values()))
+        )
@@ -0,0 +1,53 @@
+import os
+import subprocess
+import sys
+import unittest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "../"))
+import episode
+from episode.model import import_driver
+
+ROOT = os.path.join(os.path.dirname(__file__), "..")
+
+
+def loaded_modules(code):
+    """Names in sys.modules after running `code` in a fresh interpreter."""
+    output = subprocess.run(
+        [sys.executable, "-c", f"{code}\nimport sys\nprint(' '.join(sys.modules))"],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    return set(output.split())
+
+
+class LazyImportTests(unittest.TestCase):
+    def test_drivers_load_with_their_dialect(self):
+        modules = loaded_modules(
+            "from episode.model import DBConnection, DBMS\n"
+            "DBConnection.dialect(DBMS.SQLITE)"
+        )
+        self.assertNotIn("pymongo", modules)
+        self.assertNotIn("mysql.connector", modules)
+
+    def test_package_surface_is_lazy(self):
+        modules = loaded_modules("import episode")
+        self.assertNotIn("episode.episode", modules)
+        self.assertNotIn("episode.model", modules)
+
+        modules = loaded_modules("from episode import Model")
+        self.assertIn("episode.model", modules)
+        self.assertNotIn("episode.episode", modules)
+
+    def test_package_names(self):
+        from episode.episode import Episode
+
+        self.assertIs(episode.Episode, Episode)
+        self.assertIn("Session", dir(episode))
+        with self.assertRaises(AttributeError):
+            episode.Missing
+
+    def test_missing_driver(self):
+        with self.assertRaisesRegex(Exception, "not installed"):
+            import_driver("episode_missing_driver", "Missing")
@@ -0,0 +1,101 @@
+import logging
+import os
+import queue
+import sys
+import tempfile
+import unittest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "../"))
+from episode.logger import (
+    BatchedFileHandler,
+    DroppingQueueHandler,
+    LogListener,
+)
+
+
+class Unformattable:
+    def __init__(self):
+        self.formatted = 0
+
+    def __str__(self):
+        self.formatted += 1
+        return "value"
+
+
+class QueueLoggingTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, "test.log")
+        self.listener = LogListener(queue.Queue(100), batch_size=10)
+        self.file_handler = BatchedFileHandler(self.path, encoding="utf-8")
+        self.file_handler.setFormatter(logging.Formatter("%(levelname)s %(message)s"))
+        self.listener.add_handler(self.file_handler)
+
+        self.logger = logging.getLogger(f"episode-test-{id(self)}")
+        self.logger.propagate = False
+        self.queue_handler = DroppingQueueHandler(self.listener.queue)
+        self.logger.addHandler(self.queue_handler)
+
+    def tearDown(self):
+        self.listener.stop()
+        self.file_handler.close()
+        self.tmp_dir.cleanup()
+
+    def read_log(self):
+        with open(self.path) as f:
+            return f.read().splitlines()
+
+    def test_records_are_written_by_listener(self):
+        value = Unformattable()
+        self.logger.warning("got %s", value)
+        # Formatting happens in the listener, not the caller
+        self.assertEqual(value.formatted, 0)
+
+        self.listener.start()
+        self.listener.stop()
+
+        self.assertEqual(self.read_log(), ["WARNING got value"])
+        self.assertEqual(value.formatted, 1)
+
+    def test_full_queue_drops_records(self):
+        for index in range(150):
+            self.logger.warning("record %d", index)
+
+        self.assertEqual(self.queue_handler.dropped, 50)
+
+        self.listener.start()
+        self.listener.stop()
+        self.assertEqual(len(self.read_log()), 100)
+
+    def test_handler_levels(self):
+        self.file_handler.setLevel(logging.ERROR)
+        self.assertEqual(self.listener.level, logging.ERROR)
+
+        self.listener.start()
+        self.logger.warning("skipped")
+        self.logger.error("kept")
+        self.listener.stop()
+
+        self.assertEqual(self.read_log(), ["ERROR kept"])
+
+    def test_queue_level_follows_listener(self):
+        queue_handler = DroppingQueueHandler(self.listener.queue, self.listener)
+        self.logger.removeHandler(self.queue_handler)
+        self.logger.addHandler(queue_handler)
+        self.logger.setLevel(logging.DEBUG)
+        self.file_handler.setLevel(logging.ERROR)
+        self.assertEqual(queue_handler.level, logging.ERROR)
+
+        self.logger.warning("not queued")
+        self.assertTrue(self.listener.queue.empty())
+
+        # A handler added or lowered later gets the records it writes
+        debug_handler = logging.NullHandler()
+        debug_handler.setLevel(logging.WARNING)
+        self.listener.add_handler(debug_handler)
+        debug_handler.setLevel(logging.DEBUG)
+        self.logger.debug("queued")
+        self.assertEqual(self.listener.queue.qsize(), 1)
+
+        self.listener.remove_handler(debug_handler)
+        self.assertEqual(queue_handler.level, logging.ERROR)
@@ -0,0 +1,100 @@
+import os
+import sys
+import threading
+import unittest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "../"))
+from episode.episode import Episode
+from episode.http.httpresponse import HttpResponse
+from episode.metrics import Registry
+from episode.model import DBConnection, DBMS
+from episode.route import Router
+
+
+class RegistryTests(unittest.TestCase):
+    def test_histogram_buckets_are_cumulative(self):
+        registry = Registry()
+        histogram = registry.histogram(
+            "latency_seconds", "Latency.", ("route",), buckets=(0.1, 1)
+        )
+        histogram.observe(0.05, ("/a",))
+        histogram.observe(0.5, ("/a",))
+        histogram.observe(2, ("/a",))
+
+        self.assertEqual(
+            registry.render().splitlines(),
+            [
+                "# HELP latency_seconds Latency.",
+                "# TYPE latency_seconds histogram",
+                'latency_seconds_bucket{route="/a",le="0.1"} 1',
+                'latency_seconds_bucket{route="/a",le="1"} 2',
+                'latency_seconds_bucket{route="/a",le="+Inf"} 3',
+                'latency_seconds_sum{route="/a"} 2.55',
+                'latency_seconds_count{route="/a"} 3',
+            ],
+        )
+
+    def test_thread_shards_are_merged(self):
+        registry = Registry()
+        counter = registry.counter("hits_total", "Hits.")
+
+        def hit():
+            for _ in range(1000):
+                counter.inc()
+
+        threads = [threading.Thread(target=hit) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertIn("hits_total 4000", registry.render().splitlines())
+
+    def test_label_values_are_escaped(self):
+        registry = Registry()
+        registry.gauge("up", "Up.", lambda: {('a"b',): 1}, ("name",))
+
+        self.assertIn('up{name="a\\"b"} 1', registry.render().splitlines())
+
+
+class EpisodeMetricsTests(unittest.TestCase):
+    def setUp(self):
+        self.app = Episode(port=0)
+        self.app.router = Router()
+        self.app.instrument()
+
+        @self.app.get("/users/{user_id}")
+        def user(request, user_id: int):
+            return HttpResponse().write(str(user_id))
+
+    def get(self, path):
+        return self.app.handle_request(f"GET {path} HTTP/1.1\r\n\r\n".encode())
+
+    def test_requests_are_labeled_by_route(self):
+        self.get("/users/1")
+        self.get("/users/2")
+        self.get("/missing")
+
+        lines = self.get("/metrics").decode().splitlines()
+        self.assertIn(
+            "episode_http_request_duration_seconds_count"
+            '{route="/users/{user_id}",method="GET",status="200"} 2',
+            lines,
+        )
+        self.assertIn(
+            "episode_http_request_duration_seconds_count"
+            '{route="unmatched",method="GET",status="404"} 1',
+            lines,
+        )
+        self.assertIn(
+            "Content-Type: text/plain; version=0.0.4; charset=utf-8", lines
+        )
+
+    def test_pool_stats(self):
+        db_connect = DBConnection.dialect(DBMS.SQLITE)
+        self.app.metrics.track_pool("main", db_connect(database_path=":memory:"))
+
+        body = self.get("/metrics").decode()
+        self.assertIn(
+            'episode_db_pool_connections{pool="main",state="readers_max"}', body
+        )
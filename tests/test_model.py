@@ -0,0 +1,734 @@
+import datetime
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import unittest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "../"))
+from episode.model import (
+    Model,
+    Session,
+    DBMS,
+    DBConnection,
+    Index,
+    RelationProxy,
+    NOSqlQueryBuilder,
+    Condition,
+    Count,
+    Max,
+)
+from episode.http.jsonresponse import (
+    JsonResponse,
+    OrjsonEncoder,
+    StdlibJsonEncoder,
+    orjson,
+)
+from episode.logger import EPISODE_LOGGER, FILE_HANDLERS, LOG_LISTENER
+from episode.slowquery import SlowQueryLog
+from episode.querycache import (
+    QueryCache,
+    MemoryCacheBackend,
+    SharedMemoryCacheBackend,
+    normalize_query,
+)
+
+
+class Department(Model):
+    name: str
+    courses: int
+
+
+class Student(Model):
+    first_name: str
+    user_name: str
+    age: int
+    department: Department
+
+    __indexes__ = [Index("user_name", unique=True), Index("age", "first_name")]
+
+
+class CountingSession(Session):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.queries = 0
+
+    def fetch_rows(self, sql_stmt, values=None):
+        self.queries += 1
+        return super().fetch_rows(sql_stmt, values)
+
+
+class SQLiteTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        db_connect = DBConnection.dialect(DBMS.SQLITE)
+        self.connection = db_connect(
+            database_path=os.path.join(self.tmp_dir.name, "test.sqlite")
+        )
+
+        with Session(self.connection) as session:
+            session.drop_create(Department)
+            session.drop_create(Student)
+
+            # Department is a one to one relation, each student gets its own
+            for index, user_name in enumerate(["kobby", "kwame", "ama"]):
+                department = Department(name=f"Science {index}", courses=index)
+                session.save(department)
+                session.save(
+                    Student(
+                        first_name=user_name.title(),
+                        user_name=user_name,
+                        age=20 + index,
+                        department=department,
+                    )
+                )
+            session.close()
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+
+class QueryCacheTests(SQLiteTestCase):
+    def test_normalized_key_ignores_placeholder_names(self):
+        key1 = normalize_query("SELECT * FROM student WHERE age = :var1", {"var1": 3})
+        key2 = normalize_query("SELECT *  FROM student WHERE age = :var9", {"var9": 3})
+        key3 = normalize_query("SELECT * FROM student WHERE age = :var9", {"var9": 4})
+
+        self.assertEqual(key1, key2)
+        self.assertNotEqual(key1, key3)
+
+    def test_repeated_select_hits_cache(self):
+        cache = QueryCache(ttl=60)
+        with Session(self.connection, cache=cache) as session:
+            for _ in range(3):
+                stmt = session.select(Student).where(Student.user_name == "kwame")
+                students = list(session.exec(stmt))
+                self.assertEqual(students[0].first_name, "Kwame")
+
+        self.assertEqual(cache.misses, 1)
+        self.assertEqual(cache.hits, 2)
+
+    def test_save_invalidates_table_entries(self):
+        cache = QueryCache(ttl=60)
+        with Session(self.connection, cache=cache) as session:
+            stmt = session.select(Student).where(Student.user_name == "kwame")
+            student = list(session.exec(stmt))[0]
+
+            student.age = 99
+            session.save(student)
+
+            stmt = session.select(Student).where(Student.user_name == "kwame")
+            self.assertEqual(list(session.exec(stmt))[0].age, 99)
+
+    def test_query_can_opt_out(self):
+        cache = QueryCache(ttl=60)
+        with Session(self.connection, cache=cache) as session:
+            for _ in range(2):
+                stmt = session.select(Student).cache(enabled=False)
+                list(session.exec(stmt))
+
+        self.assertEqual(cache.hits + cache.misses, 0)
+
+    def test_memory_backend_lru_bound(self):
+        backend = MemoryCacheBackend(max_entries=2)
+        backend.set("a", [1], ("t",))
+        backend.set("b", [2], ("t",))
+        backend.get("a")
+        backend.set("c", [3], ("u",))
+
+        self.assertIsNone(backend.get("b"))
+        self.assertEqual(backend.get("a"), [1])
+
+        backend.invalidate("t")
+        self.assertIsNone(backend.get("a"))
+        self.assertEqual(backend.get("c"), [3])
+
+    def test_shared_backend_generation_invalidation(self):
+        cache = QueryCache(backend=SharedMemoryCacheBackend(max_entries=8))
+        cache.set("k", [{"id": 1}], ("student",))
+        self.assertEqual(cache.get("k"), [{"id": 1}])
+
+        cache.invalidate("student")
+        self.assertIsNone(cache.get("k"))
+
+        generations = cache.generations(("student",))
+        cache.invalidate("student")
+        cache.set("k", [{"id": 1}], ("student",), generations=generations)
+        self.assertIsNone(cache.get("k"))
+
+    def test_shared_backend_in_forked_child(self):
+        backend = SharedMemoryCacheBackend(max_entries=8)
+        backend.set("k", [1], ("t",))
+
+        pid = os.fork()
+        if pid == 0:
+            status = 1
+            try:
+                if backend.get("k") == [1]:
+                    backend.set("child", [2], ("t",))
+                    status = 0
+            finally:
+                os._exit(status)
+
+        _, status = os.waitpid(pid, 0)
+        self.assertEqual(os.waitstatus_to_exitcode(status), 0)
+        self.assertEqual(backend.get("child"), [2])
+        self.assertEqual(backend.get("k"), [1])
+
+    def test_counters_are_thread_safe(self):
+        cache = QueryCache(ttl=60)
+        cache.set("k", [1], ("t",))
+
+        def read():
+            for _ in range(2000):
+                cache.get("k")
+                cache.get("missing")
+
+        threads = [threading.Thread(target=read) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual((cache.hits, cache.misses), (8000, 8000))
+
+    def test_write_during_read_is_not_cached(self):
+        cache = QueryCache(ttl=60)
+        connection = self.connection
+
+        class WritingSession(Session):
+            def fetch_rows(self, sql_stmt, values=None):
+                rows = super().fetch_rows(sql_stmt, values)
+                # Another session writes after the rows were read
+                with Session(connection, cache=cache) as writer:
+                    student = writer.get(Student, 1)
+                    student.age = 99
+                    writer.save(student)
+                return rows
+
+        with WritingSession(self.connection, cache=cache) as session:
+            stmt = session.select(Student).where(Student.id == 1)
+            self.assertEqual(list(session.exec(stmt))[0].age, 20)
+
+        with Session(self.connection, cache=cache) as session:
+            stmt = session.select(Student).where(Student.id == 1)
+            self.assertEqual(list(session.exec(stmt))[0].age, 99)
+
+
+class IndexTests(SQLiteTestCase):
+    def index_names(self, session):
+        rows = session.fetch_rows(
+            "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'student'"
+        )
+        return {row["name"] for row in rows}
+
+    def test_create_builds_declared_indexes(self):
+        with Session(self.connection) as session:
+            names = self.index_names(session)
+
+        self.assertIn("ix_student_user_name", names)
+        self.assertIn("ix_student_age_first_name", names)
+
+    def test_unique_index_is_enforced(self):
+        with Session(self.connection) as session:
+            department = Department(name="Music", courses=3)
+            session.save(department)
+            student = Student(
+                first_name="K", user_name="kwame", age=1, department=department
+            )
+            with self.assertRaisesRegex(Exception, "student.user_name"):
+                session.save(student)
+
+    def test_ensure_indexes_restores_missing_index(self):
+        with Session(self.connection) as session:
+            session.sql_run("DROP INDEX ix_student_age_first_name")
+            session.ensure_indexes(Student)
+            session.ensure_indexes(Student)
+
+            self.assertIn("ix_student_age_first_name", self.index_names(session))
+
+    def test_unknown_index_column(self):
+        with self.assertRaises(Exception):
+
+            class Broken(Model):
+                name: str
+
+                __indexes__ = [Index("missing")]
+
+
+class RelationLoadingTests(SQLiteTestCase):
+    def test_scalar_columns_issue_one_query(self):
+        with CountingSession(self.connection) as session:
+            students = list(session.exec(session.select(Student)))
+            self.assertEqual([s.first_name for s in students], ["Kobby", "Kwame", "Ama"])
+
+        self.assertEqual(session.queries, 1)
+        self.assertIsInstance(students[0].department, RelationProxy)
+        self.assertFalse(students[0].department.is_loaded)
+
+    def test_lazy_relation_loads_on_access(self):
+        with CountingSession(self.connection) as session:
+            student = list(session.exec(session.select(Student)))[1]
+            self.assertEqual(student.department.id, 2)
+            self.assertEqual(session.queries, 1)
+
+            self.assertEqual(student.department.name, "Science 1")
+            self.assertEqual(student.department.name, "Science 1")
+            self.assertEqual(session.queries, 2)
+
+    def test_eager_relation_uses_identity_map(self):
+        with CountingSession(self.connection) as session:
+            stmt = session.select(Student).eager("department")
+            students = list(session.exec(stmt))
+            self.assertIsInstance(students[0].department, Department)
+            self.assertEqual(session.queries, 4)
+
+            self.assertIs(session.get(Department, 1), students[0].department)
+            self.assertEqual(session.queries, 4)
+
+    def test_lazy_overrides_eager(self):
+        with Session(self.connection) as session:
+            stmt = session.select(Student).eager().lazy("department")
+            student = next(session.exec(stmt))
+
+        self.assertIsInstance(student.department, RelationProxy)
+
+    def test_proxy_can_be_saved_back(self):
+        with Session(self.connection) as session:
+            student = next(session.exec(session.select(Student)))
+            student.age = 50
+            session.save(student)
+
+            stmt = session.select(Student).where(Student.user_name == "kobby")
+            reloaded = next(session.exec(stmt))
+
+        self.assertEqual(reloaded.age, 50)
+        self.assertEqual(reloaded.department, student.department)
+        self.assertEqual(reloaded.to_dict()["department"]["name"], "Science 0")
+
+
+class PaginationTests(SQLiteTestCase):
+    def setUp(self):
+        super().setUp()
+        with Session(self.connection) as session:
+            for index in range(3, 10):
+                department = Department(name=f"Art {index}", courses=index)
+                session.save(department)
+                session.save(
+                    Student(
+                        first_name=f"Student{index}",
+                        user_name=f"student{index}",
+                        age=20 + index % 3,
+                        department=department,
+                    )
+                )
+
+    def test_order_by_and_offset(self):
+        with Session(self.connection) as session:
+            stmt = session.select(Student).order_by(Student.age.desc(), "id")
+            stmt.offset(2).limit(3)
+            ids = [student.id for student in session.exec(stmt)]
+
+        # age 22: ids 3, 6, 9; age 21: ids 2, 5, 8; age 20: ids 1, 4, 7, 10
+        self.assertEqual(ids, [9, 2, 5])
+
+    def test_offset_without_limit(self):
+        with Session(self.connection) as session:
+            stmt = session.select(Student).order_by("id").offset(8)
+            self.assertEqual([student.id for student in session.exec(stmt)], [9, 10])
+
+    def test_keyset_pages_match_offset_pages(self):
+        with Session(self.connection) as session:
+            stmt = session.select(Student).order_by("age")
+            expected = [student.id for student in session.exec(stmt.order_by("id"))]
+
+            pages, cursor = [], None
+            while True:
+                stmt = session.select(Student).order_by("age").limit(4)
+                if cursor is not None:
+                    stmt.after(cursor)
+                page = list(session.exec(stmt))
+                if not page:
+                    break
+                pages.extend(student.id for student in page)
+                cursor = page[-1]
+
+        self.assertEqual(pages, expected)
+
+    def test_keyset_pages_with_duplicate_keys(self):
+        with Session(self.connection) as session:
+            pages, cursor = [], None
+            while True:
+                stmt = session.select(Student).order_by("-age").limit(3)
+                if cursor is not None:
+                    stmt.after(cursor)
+                page = list(session.exec(stmt))
+                if not page:
+                    break
+                pages.extend(student.id for student in page)
+                cursor = page[-1]
+
+        self.assertEqual(pages, [9, 6, 3, 8, 5, 2, 10, 7, 4, 1])
+        # Ties on age are broken by id on the first page as well
+        sql_stmt = session.select(Student).order_by("-age").get_query_stmt()[0]
+        self.assertTrue(sql_stmt.endswith("ORDER BY age DESC, id DESC"))
+
+    def test_order_by_unknown_name(self):
+        with Session(self.connection) as session:
+            stmt = session.select(Student).order_by("age; DROP TABLE student --")
+            with self.assertRaises(Exception):
+                stmt.get_query_stmt()
+
+            self.assertEqual(session.select(Student).count(), 10)
+
+    def test_keyset_sql_is_row_value_comparison(self):
+        with Session(self.connection) as session:
+            stmt = session.select(Student).where(Student.age > 1).OR(Student.age < 0)
+            sql_stmt, values = stmt.order_by("age").after((21, 5)).get_query_stmt()
+
+        self.assertRegex(
+            sql_stmt,
+            r"WHERE \(age > :var\d+ OR age < :var\d+\) AND \(age, id\) > "
+            r"\(:var\d+, :var\d+\) ORDER BY age ASC, id ASC$",
+        )
+        self.assertEqual(sorted(values.values()), [0, 1, 5, 21])
+
+    def test_keyset_mixed_directions(self):
+        with Session(self.connection) as session:
+            stmt = session.select(Student).order_by("-age", "id").after((21, 5))
+            ids = [student.id for student in session.exec(stmt)]
+
+        self.assertEqual(ids, [8, 1, 4, 7, 10])
+
+    def test_nosql_keyset_query(self):
+        stmt = NOSqlQueryBuilder(Student).order_by("-age").after((21, "abc")).offset(2)
+        query, _, _, sort, skip = stmt.get_query_stmt()
+
+        self.assertEqual(sort, [("age", -1), ("_id", -1)])
+        self.assertEqual(skip, 2)
+        self.assertEqual(
+            query,
+            {"$or": [{"age": {"$lt": 21}}, {"age": 21, "_id": {"$lt": "abc"}}]},
+        )
+
+        sort = NOSqlQueryBuilder(Student).order_by("age").get_query_stmt()[3]
+        self.assertEqual(sort, [("age", 1), ("_id", 1)])
+
+
+class AggregateTests(SQLiteTestCase):
+    def test_count(self):
+        with Session(self.connection) as session:
+            self.assertEqual(session.select(Student).count(), 3)
+            stmt = session.select(Student).where(Student.age > 20)
+            self.assertEqual(stmt.count(), 2)
+
+    def test_aggregate_shorthand(self):
+        with Session(self.connection) as session:
+            result = session.select(Student).aggregate(
+                avg=Student.age, min=Student.age, max=Student.age, sum=Student.age
+            )
+
+        self.assertEqual(result, {"avg": 21.0, "min": 20, "max": 22, "sum": 63})
+
+    def test_group_by(self):
+        with Session(self.connection) as session:
+            session.save(Department(name="Science 0", courses=7))
+            rows = (
+                session.select(Department)
+                .group_by(Department.name)
+                .order_by("-departments", "name")
+                .limit(2)
+                .aggregate(departments=Count(), most=Max(Department.courses))
+            )
+
+        self.assertEqual(
+            rows,
+            [
+                {"name": "Science 0", "departments": 2, "most": 7},
+                {"name": "Science 1", "departments": 1, "most": 1},
+            ],
+        )
+
+    def test_invalid_aggregate(self):
+        with Session(self.connection) as session:
+            with self.assertRaises(Exception):
+                session.select(Student).aggregate(mean=Student.age)
+
+    def test_limit_without_group_by(self):
+        with Session(self.connection) as session:
+            with self.assertRaises(Exception):
+                session.select(Student).limit(1).count()
+            with self.assertRaises(Exception):
+                session.select(Student).offset(1).aggregate(max=Student.age)
+
+            rows = session.select(Student).group_by("age").limit(2).count()
+            self.assertEqual(len(rows), 2)
+
+    def test_unknown_group_and_alias_names(self):
+        with Session(self.connection) as session:
+            with self.assertRaises(Exception):
+                session.select(Student).group_by("age) FROM student; --")
+            with self.assertRaises(Exception):
+                session.select(Student).aggregate(**{"n FROM student; --": Count()})
+            with self.assertRaises(Exception):
+                session.select(Student).group_by("age").order_by("x; --").aggregate(
+                    students=Count()
+                )
+
+            self.assertEqual(session.select(Student).count(), 3)
+
+    def test_nosql_pipeline(self):
+        stmt = NOSqlQueryBuilder(Student).where(Condition("$gt", Student.age, 20))
+        stmt.group_by("age")
+        pipeline = stmt.get_aggregate_pipeline({"students": Count()})
+
+        self.assertEqual(
+            pipeline,
+            [
+                {"$match": {"age": {"$gt": 20}}},
+                {"$group": {"_id": {"age": "$age"}, "students": {"$sum": 1}}},
+                {"$project": {"_id": 0, "age": "$_id.age", "students": 1}},
+            ],
+        )
+
+
+class BulkWriteTests(SQLiteTestCase):
+    def test_bulk_update(self):
+        with CountingSession(self.connection) as session:
+            updated = session.select(Student).where(Student.age > 20).update(age=30)
+            self.assertEqual(session.queries, 0)
+
+            self.assertEqual(updated, 2)
+            stmt = session.select(Student).where(Student.age == 30)
+            self.assertEqual(stmt.count(), 2)
+
+    def test_bulk_update_validates_values(self):
+        with Session(self.connection) as session:
+            with self.assertRaises(Exception):
+                session.select(Student).update(age="old")
+            with self.assertRaises(Exception):
+                session.select(Student).update(id=4)
+
+    def test_bulk_delete(self):
+        cache = QueryCache()
+        with Session(self.connection, cache=cache) as session:
+            self.assertEqual(session.select(Student).count(), 3)
+
+            stmt = session.select(Student).where(Student.user_name == "kwame")
+            self.assertEqual(stmt.delete(), 1)
+            self.assertEqual(session.select(Student).count(), 2)
+
+            self.assertEqual(session.select(Student).delete(), 2)
+
+    def test_bulk_write_refuses_limits(self):
+        with Session(self.connection) as session:
+            stmt = session.select(Student).where(Student.age >= 0)
+            with self.assertRaises(Exception):
+                stmt.order_by("age").limit(2).delete()
+            with self.assertRaises(Exception):
+                session.select(Student).limit(1).update(age=99)
+            with self.assertRaises(Exception):
+                session.select(Student).offset(1).delete()
+
+            self.assertEqual(session.select(Student).count(), 3)
+            self.assertEqual(session.select(Student).where(Student.age == 99).count(), 0)
+
+
+class TunedSQLiteTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        db_connect = DBConnection.dialect(DBMS.SQLITE)
+        self.connection = db_connect(
+            database_path=os.path.join(self.tmp_dir.name, "tuned.sqlite"),
+            tuned=True,
+            readers=2,
+        )
+        with Session(self.connection) as session:
+            session.drop_create(Department)
+
+    def tearDown(self):
+        self.connection.close_all()
+        self.tmp_dir.cleanup()
+
+    def test_pragmas(self):
+        with Session(self.connection) as session:
+            journal_mode = session.fetch_rows("PRAGMA journal_mode")[0][0]
+            with self.connection.writer(session.conn) as conn:
+                synchronous = conn.execute("PRAGMA synchronous").fetchone()[0]
+
+        self.assertEqual(journal_mode, "wal")
+        self.assertEqual(synchronous, 1)  # NORMAL
+
+    def test_sessions_share_the_writer(self):
+        with Session(self.connection) as first, Session(self.connection) as second:
+            self.assertIs(first.conn, second.conn)
+            first.close()
+            second.save(Department(name="Art", courses=1))
+
+    def test_reads_use_read_only_connections(self):
+        with Session(self.connection) as session:
+            with self.connection.reader(session.conn) as conn:
+                self.assertIsNot(conn, session.conn)
+                with self.assertRaises(sqlite3.OperationalError):
+                    conn.execute("DELETE FROM department")
+
+    def test_concurrent_readers_and_writer(self):
+        errors = []
+
+        def write():
+            with Session(self.connection) as session:
+                for index in range(50):
+                    session.save(Department(name=f"D{index}", courses=index))
+
+        def read():
+            try:
+                with Session(self.connection) as session:
+                    for _ in range(50):
+                        session.select(Department).count()
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=write)]
+        threads += [threading.Thread(target=read) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        with Session(self.connection) as session:
+            self.assertEqual(session.select(Department).count(), 50)
+
+    def test_memory_reads_wait_for_the_writer(self):
+        db_connect = DBConnection.dialect(DBMS.SQLITE)
+        connection = db_connect(database_path=":memory:", tuned=True)
+        self.addCleanup(connection.close_all)
+        session = Session(connection)
+        entered = threading.Event()
+
+        def read():
+            with connection.reader(session.conn):
+                entered.set()
+
+        with connection.writer(session.conn):
+            thread = threading.Thread(target=read)
+            thread.start()
+            # No reads inside an open write transaction
+            self.assertFalse(entered.wait(0.1))
+        thread.join(5)
+        self.assertTrue(entered.is_set())
+
+
+class SerializationTests(SQLiteTestCase):
+    def test_to_dict(self):
+        department = Department(name="Arts", courses=3)
+        student = Student(first_name="Esi", user_name="esi", age=19, department=department)
+        data = student.to_dict()
+
+        self.assertEqual(
+            data,
+            {
+                "first_name": "Esi",
+                "user_name": "esi",
+                "age": 19,
+                "department": {"name": "Arts", "courses": 3},
+            },
+        )
+        # The model is left untouched
+        data["department"]["name"] = "Music"
+        self.assertIn("id", student._values)
+        self.assertEqual(department.name, "Arts")
+
+    def test_json_response(self):
+        with Session(self.connection) as session:
+            stmt = session.select(Student).where(Student.age >= 21)
+            response = JsonResponse().write(session.exec(stmt))
+
+        head, _, body = response.partition(b"\r\n\r\n")
+        self.assertIn(b"Content-Type: application/json", head)
+        self.assertEqual(
+            json.loads(body),
+            [
+                {
+                    "first_name": "Kwame",
+                    "user_name": "kwame",
+                    "age": 21,
+                    "department": {"name": "Science 1", "courses": 1},
+                },
+                {
+                    "first_name": "Ama",
+                    "user_name": "ama",
+                    "age": 22,
+                    "department": {"name": "Science 2", "courses": 2},
+                },
+            ],
+        )
+
+    def test_encoders_agree(self):
+        data = {"name": "Ama", "tags": ("a", "b"), "when": datetime.date(2024, 1, 2)}
+        encoded = StdlibJsonEncoder()(data)
+
+        self.assertEqual(
+            json.loads(encoded),
+            {"name": "Ama", "tags": ["a", "b"], "when": "2024-01-02"},
+        )
+        if orjson is not None:
+            self.assertEqual(json.loads(OrjsonEncoder()(data)), json.loads(encoded))
+
+
+class SlowQueryLogTests(SQLiteTestCase):
+    def test_slow_queries_are_logged_with_plan(self):
+        slow_queries = SlowQueryLog(threshold=0, explain=True)
+        with Session(self.connection, slow_query_log=slow_queries) as session:
+            with self.assertLogs("EPISODE.slow_query", "WARNING") as logs:
+                for _ in range(2):
+                    query = session.select(Student).where(
+                        Student.first_name == "Ama"
+                    )
+                    self.assertEqual(len(list(session.exec(query))), 1)
+
+        first, second = slow_queries.recent
+        self.assertEqual(first.rows, 1)
+        self.assertEqual(list(first.params.values()), ["Ama"])
+        self.assertTrue(any("SCAN student" in line for line in first.plan))
+        # A statement is only explained the first time it is slow
+        self.assertIsNone(second.plan)
+        self.assertIn("SCAN student", logs.output[0])
+
+    def test_fast_queries_are_not_logged(self):
+        slow_queries = SlowQueryLog(threshold=60)
+        with Session(self.connection, slow_query_log=slow_queries) as session:
+            list(session.exec(session.select(Student)))
+
+        self.assertEqual(len(slow_queries.recent), 0)
+
+    def remove_file_handler(self, handler):
+        LOG_LISTENER.remove_handler(handler)
+        FILE_HANDLERS.pop((handler.baseFilename, "EPISODE.slow_query"))
+        handler.close()
+
+    def test_file_handler_is_installed_once(self):
+        path = os.path.join(self.tmp_dir.name, "slow.log")
+        first = SlowQueryLog(threshold=0, path=path)
+        SlowQueryLog(threshold=0, path=path)
+
+        handlers = [
+            handler
+            for handler in LOG_LISTENER.handlers
+            if getattr(handler, "baseFilename", None) == path
+        ]
+        self.assertEqual(len(handlers), 1)
+        self.addCleanup(self.remove_file_handler, handlers[0])
+
+        with Session(self.connection, slow_query_log=first) as session:
+            session.select(Student).count()
+        EPISODE_LOGGER.info("not a slow query")
+        LOG_LISTENER.stop()
+        LOG_LISTENER.start()
+
+        with open(path) as f:
+            lines = f.read().splitlines()
+        self.assertEqual(len(lines), 1)
+        self.assertIn("Slow query", lines[0])
@@ -0,0 +1,99 @@
+import os
+import sys
+import unittest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "../"))
+from episode.episode import Episode
+from episode.http.compression import Compressor
+from episode.http.httpresponse import HttpResponse
+from episode.http.httpstatus import HTTPStatus
+from episode.route import Router
+
+
+def request(method, path, *headers):
+    lines = [f"{method} {path} HTTP/1.1", "Host: localhost", *headers, "", ""]
+    return "\r\n".join(lines).encode()
+
+
+def split(response):
+    head, _, body = response.partition(b"\r\n\r\n")
+    lines = head.decode().split("\r\n")
+    headers = dict(line.split(": ", 1) for line in lines[1:])
+    return lines[0], headers, body
+
+
+class ResponseCacheTests(unittest.TestCase):
+    def setUp(self):
+        self.app = Episode()
+        self.app.router = Router()
+        self.calls = 0
+
+        @self.app.get("/index", cache=60)
+        def index(request, page: int = 1):
+            self.calls += 1
+            return HttpResponse().write(f"page {page}, call {self.calls}")
+
+        @self.app.get("/missing", cache=60)
+        def missing(request):
+            self.calls += 1
+            return HttpResponse().write(b"", status_code=HTTPStatus.NOT_FOUND)
+
+        @self.app.get("/uncached")
+        def uncached(request):
+            self.calls += 1
+            return HttpResponse().write(b"fresh")
+
+    def test_hits_reuse_serialized_response(self):
+        first = self.app.handle_request(request("GET", "/index/"))
+        second = self.app.handle_request(request("GET", "/index"))
+
+        self.assertIs(first, second)
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(split(first)[2], b"page 1, call 1")
+
+    def test_query_is_part_of_key(self):
+        self.app.handle_request(request("GET", "/index"))
+        response = self.app.handle_request(request("GET", "/index?page=2"))
+
+        self.assertEqual(self.calls, 2)
+        self.assertEqual(split(response)[2], b"page 2, call 2")
+
+    def test_conditional_get(self):
+        _, headers, _ = split(self.app.handle_request(request("GET", "/index")))
+        etag = headers["ETag"]
+
+        status, headers, body = split(
+            self.app.handle_request(request("GET", "/index", f"If-None-Match: {etag}"))
+        )
+        self.assertEqual(status, "HTTP/1.1 304 Not Modified")
+        self.assertEqual(headers["ETag"], etag)
+        self.assertEqual(body, b"")
+        self.assertEqual(self.calls, 1)
+
+    def test_invalidate(self):
+        self.app.handle_request(request("GET", "/index"))
+        self.app.handle_request(request("GET", "/index?page=2"))
+        self.app.response_cache.invalidate("/index/")
+
+        response = self.app.handle_request(request("GET", "/index"))
+        self.assertEqual(split(response)[2], b"page 1, call 3")
+
+    def test_only_ok_responses_of_cached_routes(self):
+        for path in ["/missing", "/missing", "/uncached", "/uncached"]:
+            self.app.handle_request(request("GET", path))
+
+        self.assertEqual(self.calls, 4)
+        self.assertEqual(len(self.app.response_cache._entries), 0)
+
+    def test_encodings_are_cached_separately(self):
+        self.app.compressor = Compressor(min_size=1)
+
+        plain = self.app.handle_request(request("GET", "/index"))
+        gzipped = self.app.handle_request(
+            request("GET", "/index", "Accept-Encoding: gzip")
+        )
+
+        self.assertEqual(self.calls, 2)
+        self.assertNotIn("Content-Encoding", split(plain)[1])
+        self.assertEqual(split(gzipped)[1]["Content-Encoding"], "gzip")
+        self.assertNotEqual(split(plain)[1]["ETag"], split(gzipped)[1]["ETag"])
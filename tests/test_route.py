@@ -62,3 +62,38 @@ class RouterTests(unittest.TestCase):
         actual_request_methods = [action.accepted_method for action in node.actions]
 
         self.assertEqual(expected_request_methods, actual_request_methods)
+
+    def test_percent_encoded_route(self):
+        node, route_parameters = self.router.get_route_info("/users/J%C3%BCrgen%20K")
+
+        self.assertEqual(route_parameters, {"id": "Jürgen K"})
+
+    def test_node_pattern(self):
+        node, _ = self.router.get_route_info("/users/24")
+        self.assertEqual(node.pattern, "/users/{id}")
+
+        self.assertEqual(self.router.root.pattern, "/")
+
+
+class PathParameterTests(unittest.TestCase):
+    @classmethod
+    def get_data(cls):
+        return
+
+    def setUp(self):
+        self.router = Router()
+        self.router.add_route("/files/{path:path}", self.get_data, accepted_method="GET")
+
+    def test_path_parameter_matches_rest_of_route(self):
+        node, route_parameters = self.router.get_route_info("/files/css/site.css")
+
+        self.assertEqual(route_parameters, {"path": "css/site.css"})
+
+        self.assertEqual(node.actions[0].accepted_method, "GET")
+
+        self.assertEqual(node.pattern, "/files/{path:path}")
+
+    def test_percent_encoded_path(self):
+        _, route_parameters = self.router.get_route_info("/files/my%20notes.txt")
+
+        self.assertEqual(route_parameters, {"path": "my notes.txt"})
@@ -0,0 +1,147 @@
+import os
+import socket
+import sys
+import tempfile
+import unittest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "../"))
+from episode.episode import Episode
+from episode.route import Router
+
+
+class App(Episode):
+    router = Router()
+
+
+def request(method, path, *headers):
+    lines = [f"{method} {path} HTTP/1.1", "Host: localhost", *headers, "", ""]
+    return "\r\n".join(lines).encode()
+
+
+class StaticFilesTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp_dir = tempfile.TemporaryDirectory()
+        os.mkdir(os.path.join(cls.tmp_dir.name, "css"))
+        with open(os.path.join(cls.tmp_dir.name, "css", "site.css"), "wb") as f:
+            f.write(b"body { color: red; }")
+        with open(os.path.join(cls.tmp_dir.name, "app.js"), "wb") as f:
+            f.write(b"console.log(1);")
+        with open(os.path.join(cls.tmp_dir.name, "app.js.gz"), "wb") as f:
+            f.write(b"GZIPPED")
+
+        cls.app = App()
+        cls.static_files = cls.app.static("/assets", cls.tmp_dir.name)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.static_files.close()
+        cls.tmp_dir.cleanup()
+
+    def fetch(self, method, path, *headers):
+        response = self.app.handle_request(request(method, path, *headers))
+        if isinstance(response, bytes):
+            return response
+
+        server, client = socket.socketpair()
+        with server, client:
+            response.send(server)
+            server.shutdown(socket.SHUT_WR)
+            chunks = []
+            while True:
+                chunk = client.recv(65536)
+                if not chunk:
+                    break
+                chunks.append(chunk)
+        return b"".join(chunks)
+
+    def split(self, response):
+        head, _, body = response.partition(b"\r\n\r\n")
+        lines = head.decode().split("\r\n")
+        headers = dict(line.split(": ", 1) for line in lines[1:])
+        return lines[0], headers, body
+
+    def test_serves_file(self):
+        status, headers, body = self.split(self.fetch("GET", "/assets/css/site.css"))
+
+        self.assertEqual(status, "HTTP/1.1 200 OK")
+        self.assertEqual(headers["Content-Type"], "text/css")
+        self.assertEqual(headers["Content-Length"], "20")
+        self.assertIn("ETag", headers)
+        self.assertEqual(body, b"body { color: red; }")
+
+    def test_head(self):
+        status, headers, body = self.split(self.fetch("HEAD", "/assets/css/site.css"))
+
+        self.assertEqual(status, "HTTP/1.1 200 OK")
+        self.assertEqual(headers["Content-Length"], "20")
+        self.assertEqual(body, b"")
+
+    def test_conditional_get(self):
+        _, headers, _ = self.split(self.fetch("GET", "/assets/css/site.css"))
+        etag = headers["ETag"]
+
+        status, _, body = self.split(
+            self.fetch("GET", "/assets/css/site.css", f"If-None-Match: {etag}")
+        )
+        self.assertEqual(status, "HTTP/1.1 304 Not Modified")
+        self.assertEqual(body, b"")
+
+        status, _, _ = self.split(
+            self.fetch(
+                "GET",
+                "/assets/css/site.css",
+                f"If-Modified-Since: {headers['Last-Modified']}",
+            )
+        )
+        self.assertEqual(status, "HTTP/1.1 304 Not Modified")
+
+    def test_ranges(self):
+        status, headers, body = self.split(
+            self.fetch("GET", "/assets/css/site.css", "Range: bytes=0-3")
+        )
+        self.assertEqual(status, "HTTP/1.1 206 Partial Content")
+        self.assertEqual(headers["Content-Range"], "bytes 0-3/20")
+        self.assertEqual(body, b"body")
+
+        _, _, body = self.split(
+            self.fetch("GET", "/assets/css/site.css", "Range: bytes=-4")
+        )
+        self.assertEqual(body, b"d; }")
+
+        status, headers, _ = self.split(
+            self.fetch("GET", "/assets/css/site.css", "Range: bytes=50-")
+        )
+        self.assertEqual(status, "HTTP/1.1 416 Requested Range Not Satisfiable")
+        self.assertEqual(headers["Content-Range"], "bytes */20")
+
+    def test_precompressed_variant(self):
+        status, headers, body = self.split(
+            self.fetch("GET", "/assets/app.js", "Accept-Encoding: gzip, deflate")
+        )
+
+        self.assertEqual(headers["Content-Encoding"], "gzip")
+        self.assertTrue(headers["Content-Type"].endswith("javascript"))
+        self.assertEqual(body, b"GZIPPED")
+
+        _, _, body = self.split(self.fetch("GET", "/assets/app.js"))
+        self.assertEqual(body, b"console.log(1);")
+
+        _, headers, body = self.split(
+            self.fetch("GET", "/assets/app.js", "Accept-Encoding: gzip;q=0, deflate")
+        )
+        self.assertNotIn("Content-Encoding", headers)
+        self.assertEqual(body, b"console.log(1);")
+
+    def test_missing_and_escaping_paths(self):
+        for path in ["/assets/nope.css", "/assets/../test_static.py", "/assets/css"]:
+            status, _, _ = self.split(self.fetch("GET", path))
+            self.assertEqual(status, "HTTP/1.1 404 Not Found")
+
+    def test_descriptors_are_cached(self):
+        self.fetch("GET", "/assets/css/site.css")
+        path = os.path.join(os.path.realpath(self.tmp_dir.name), "css", "site.css")
+        open_file = self.static_files._files[path]
+
+        self.fetch("GET", "/assets/css/site.css")
+        self.assertIs(self.static_files._files[path], open_file)
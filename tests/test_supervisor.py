@@ -0,0 +1,168 @@
+import os
+import re
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import unittest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "../"))
+from episode.episode import Episode
+from episode.http.httpresponse import HttpResponse
+from episode.route import Router
+from episode.template_engine import TEMPLATE_CACHE
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+APP_MODULE = """
+import time
+
+from episode.episode import Episode
+from episode.http.httpresponse import HttpResponse
+from episode.route import Router
+
+VERSION = "{version}"
+
+
+def create_app():
+    app = Episode()
+    app.router = Router()
+
+    @app.get("/version")
+    def version(request):
+        return HttpResponse().write(VERSION)
+
+    @app.get("/slow")
+    def slow(request):
+        time.sleep(1)
+        return HttpResponse().write(VERSION)
+
+    return app
+"""
+
+
+def fetch(address, path):
+    with socket.create_connection(address, timeout=10) as client:
+        client.sendall(f"GET {path} HTTP/1.1\r\n\r\n".encode())
+        chunks = []
+        while True:
+            chunk = client.recv(65536)
+            if not chunk:
+                return b"".join(chunks)
+            chunks.append(chunk)
+
+
+class WarmupTests(unittest.TestCase):
+    def test_warmup_runs_before_accepting(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        template = os.path.join(tmp_dir.name, "page.html")
+        with open(template, "w") as f:
+            f.write("<p>{{name}}</p>")
+
+        app = Episode(port=0)
+        app.router = Router()
+        app.precompile_templates(tmp_dir.name)
+        warmed_up = []
+
+        @app.on_warmup
+        def warmup(app):
+            warmed_up.append(app.started.is_set())
+
+        @app.get("/hello")
+        def hello(request):
+            return HttpResponse().write(b"hello")
+
+        thread = threading.Thread(target=app.start)
+        thread.start()
+        self.assertTrue(app.started.wait(5))
+        app.stop()
+        thread.join(5)
+
+        self.assertEqual(warmed_up, [False])
+        self.assertEqual(len(app.signatures), 1)
+        misses = TEMPLATE_CACHE.misses
+        TEMPLATE_CACHE.get(os.path.normpath(template))
+        self.assertEqual(TEMPLATE_CACHE.misses, misses)
+
+
+class SupervisorTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.write_app("v1")
+        env = dict(os.environ, PYTHONPATH=ROOT)
+        self.process = subprocess.Popen(
+            [
+                sys.executable,
+                "-m",
+                "episode.supervisor",
+                "reload_app:create_app",
+                "--port",
+                "0",
+                "--processes",
+                "2",
+                "--drain-timeout",
+                "5",
+            ],
+            cwd=self.tmp_dir.name,
+            env=env,
+            stdout=subprocess.PIPE,
+            text=True,
+        )
+        for line in self.process.stdout:
+            match = re.search(r"listening on http://([\d.]+):(\d+)", line)
+            if match:
+                self.address = (match.group(1), int(match.group(2)))
+                break
+        threading.Thread(target=self.process.stdout.read, daemon=True).start()
+
+    def tearDown(self):
+        if self.process.poll() is None:
+            self.process.kill()
+        self.process.wait()
+        self.process.stdout.close()
+        self.tmp_dir.cleanup()
+
+    def write_app(self, version):
+        path = os.path.join(self.tmp_dir.name, "reload_app.py")
+        with open(path, "w") as f:
+            f.write(APP_MODULE.format(version=version))
+
+    def version(self):
+        return fetch(self.address, "/version").rpartition(b"\r\n\r\n")[2]
+
+    def test_reload_and_shutdown_drain_requests(self):
+        self.assertEqual(self.version(), b"v1")
+
+        slow = []
+        thread = threading.Thread(
+            target=lambda: slow.append(fetch(self.address, "/slow"))
+        )
+        thread.start()
+        time.sleep(0.2)
+
+        # A different size, a .pyc of the same second would be reused
+        self.write_app("v2-reloaded")
+        self.process.send_signal(signal.SIGHUP)
+        deadline = time.monotonic() + 20
+        while self.version() != b"v2-reloaded":
+            self.assertLess(time.monotonic(), deadline)
+            time.sleep(0.05)
+
+        # Started on the old generation, which finished it
+        thread.join(10)
+        self.assertTrue(slow[0].startswith(b"HTTP/1.1 200 "))
+        self.assertTrue(slow[0].endswith(b"v1"))
+
+        thread = threading.Thread(
+            target=lambda: slow.append(fetch(self.address, "/slow"))
+        )
+        thread.start()
+        time.sleep(0.2)
+        self.process.send_signal(signal.SIGTERM)
+        thread.join(10)
+        self.assertTrue(slow[1].endswith(b"v2-reloaded"))
+        self.assertEqual(self.process.wait(10), 0)
@@ -0,0 +1,264 @@
+import os
+import socket
+import sys
+import tempfile
+import threading
+import time
+import unittest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "../"))
+from episode.episode import Episode
+from episode.http.httpresponse import HttpResponse
+from episode.route import Router
+from episode.tcpserver import MAX_HEAD_SIZE, request_length
+
+
+class ServerTestCase(unittest.TestCase):
+    server_options = {}
+
+    def setUp(self):
+        self.app = Episode(port=0, **self.server_options)
+        self.app.router = Router()
+        self.release = threading.Event()
+
+        @self.app.get("/fast")
+        def fast(request):
+            return HttpResponse().write(b"fast")
+
+        @self.app.get("/slow")
+        def slow(request):
+            self.release.wait(5)
+            return HttpResponse().write(b"slow")
+
+        @self.app.post("/echo")
+        def echo(request):
+            return HttpResponse().write(str(len(request.body)))
+
+        @self.app.get("/error")
+        def error(request):
+            raise RuntimeError("boom")
+
+        self.thread = threading.Thread(target=self.app.start)
+        self.thread.start()
+        self.assertTrue(self.app.started.wait(5))
+
+    def tearDown(self):
+        self.release.set()
+        self.app.stop()
+        self.thread.join(5)
+        self.assertFalse(self.thread.is_alive())
+
+    def connect(self, data):
+        client = socket.create_connection(self.app.server_address, timeout=5)
+        client.sendall(data)
+        return client
+
+    def receive(self, client):
+        chunks = []
+        with client:
+            while True:
+                chunk = client.recv(65536)
+                if not chunk:
+                    break
+                chunks.append(chunk)
+        return b"".join(chunks)
+
+    def fetch(self, path, method="GET", body=b""):
+        head = f"{method} {path} HTTP/1.1\r\nContent-Length: {len(body)}\r\n\r\n"
+        return self.receive(self.connect(head.encode() + body))
+
+
+class SelectLoopTests(ServerTestCase):
+    def test_request(self):
+        self.assertTrue(self.fetch("/fast").endswith(b"\r\n\r\nfast"))
+
+    def test_handler_error_is_500(self):
+        response = self.fetch("/error")
+        self.assertTrue(response.startswith(b"HTTP/1.1 500 Internal Server Error"))
+        self.assertTrue(self.fetch("/fast").endswith(b"fast"))
+
+
+class WorkerModeTests(ServerTestCase):
+    server_options = {"workers": 2, "max_pending": 0}
+
+    def test_slow_handler_does_not_block_others(self):
+        slow = self.connect(b"GET /slow HTTP/1.1\r\n\r\n")
+
+        self.assertTrue(self.fetch("/fast").endswith(b"\r\n\r\nfast"))
+
+        self.release.set()
+        self.assertTrue(self.receive(slow).endswith(b"\r\n\r\nslow"))
+
+    def test_request_is_buffered_until_complete(self):
+        body = b"x" * 200_000
+        client = self.connect(
+            f"POST /echo HTTP/1.1\r\nContent-Length: {len(body)}\r\n\r\n".encode()
+        )
+        client.sendall(body[:1000])
+        client.sendall(body[1000:])
+
+        self.assertTrue(self.receive(client).endswith(b"\r\n\r\n200000"))
+
+    def test_load_shedding(self):
+        slow = [self.connect(b"GET /slow HTTP/1.1\r\n\r\n") for _ in range(2)]
+
+        # Served until both slow requests are dispatched, shed after
+        for _ in range(100):
+            response = self.fetch("/fast")
+            if not response.endswith(b"fast"):
+                break
+        self.assertTrue(response.startswith(b"HTTP/1.1 503 Service Unavailable"))
+        self.assertIn(b"Retry-After: 1", response)
+        self.assertGreater(self.app.admission.rejected, 0)
+
+        self.release.set()
+        for client in slow:
+            self.assertTrue(self.receive(client).endswith(b"slow"))
+
+    def test_handler_error_is_500(self):
+        response = self.fetch("/error")
+        self.assertTrue(response.startswith(b"HTTP/1.1 500 Internal Server Error"))
+
+    def test_static_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            with open(os.path.join(directory, "big.txt"), "wb") as f:
+                f.write(b"y" * 500_000)
+            static_files = self.app.static("/assets", directory)
+
+            response = self.fetch("/assets/big.txt")
+            static_files.close()
+
+        self.assertTrue(response.startswith(b"HTTP/1.1 200 OK"))
+        self.assertTrue(response.endswith(b"\r\n\r\n" + b"y" * 500_000))
+
+
+class LimitsTests(ServerTestCase):
+    server_options = {
+        "workers": 1,
+        "max_connections": 1,
+        "header_timeout": 0.2,
+        "body_timeout": 0.2,
+        "idle_timeout": 0.4,
+    }
+
+    def test_header_timeout(self):
+        client = self.connect(b"GET /fast HTTP/1.1\r\nHost: a")
+        self.assertTrue(self.receive(client).startswith(b"HTTP/1.1 408 Request Timeout"))
+
+    def test_body_timeout(self):
+        client = self.connect(b"POST /echo HTTP/1.1\r\nContent-Length: 10\r\n\r\nabc")
+        self.assertTrue(self.receive(client).startswith(b"HTTP/1.1 408 Request Timeout"))
+
+    def test_connection_limit(self):
+        client = self.connect(b"GET /fast HTTP/1.1\r\n")
+        waiting = self.connect(b"GET /fast HTTP/1.1\r\n\r\n")
+
+        # Only accepted once the first connection is done
+        waiting.settimeout(0.1)
+        with self.assertRaises(socket.timeout):
+            waiting.recv(1)
+        waiting.settimeout(5)
+
+        client.sendall(b"\r\n")
+        self.assertTrue(self.receive(client).endswith(b"fast"))
+        self.assertTrue(self.receive(waiting).endswith(b"fast"))
+
+
+class SelectLoopLimitsTests(LimitsTests):
+    server_options = dict(LimitsTests.server_options, workers=0)
+
+
+class SlowClientTests(ServerTestCase):
+    server_options = {"header_timeout": 0.5}
+
+    def test_slow_client_does_not_block_others(self):
+        slow = self.connect(b"POST /echo HTTP/1.1\r\nContent-Length: 10\r\n\r\nabc")
+
+        started = time.perf_counter()
+        self.assertTrue(self.fetch("/fast").endswith(b"\r\n\r\nfast"))
+        self.assertLess(time.perf_counter() - started, 0.4)
+
+        slow.sendall(b"defghij")
+        self.assertTrue(self.receive(slow).endswith(b"\r\n\r\n10"))
+
+
+class RequestSizeTests(ServerTestCase):
+    server_options = {"max_body_size": 1000}
+
+    def test_body_over_max_body_size(self):
+        response = self.receive(
+            self.connect(b"POST /echo HTTP/1.1\r\nContent-Length: 1001\r\n\r\n")
+        )
+        self.assertTrue(response.startswith(b"HTTP/1.1 413 "))
+        self.assertTrue(self.fetch("/echo", "POST", b"x" * 1000).endswith(b"1000"))
+
+    def test_head_over_max_head_size(self):
+        client = self.connect(b"GET /fast HTTP/1.1\r\n")
+        try:
+            client.sendall(b"X-Filler: " + b"x" * MAX_HEAD_SIZE)
+        except OSError:
+            pass
+        self.assertTrue(self.receive(client).startswith(b"HTTP/1.1 431 "))
+
+
+class WorkerModeRequestSizeTests(RequestSizeTests):
+    server_options = {"max_body_size": 1000, "workers": 2}
+
+
+class SelectLoopDrainTests(ServerTestCase):
+    def wait_for_connections(self, count):
+        for _ in range(500):
+            if self.app.open_connections >= count:
+                return
+            time.sleep(0.01)
+        self.fail(f"{count} connections were not accepted")
+
+    def test_shutdown_finishes_open_connections(self):
+        idle = socket.create_connection(self.app.server_address, timeout=5)
+        self.wait_for_connections(1)
+
+        self.app.shutdown(timeout=5)
+        # Accepted before the shutdown, so still served
+        idle.sendall(b"GET /fast HTTP/1.1\r\n\r\n")
+        self.assertTrue(self.receive(idle).endswith(b"fast"))
+
+        self.thread.join(5)
+        self.assertFalse(self.thread.is_alive())
+        with self.assertRaises(OSError):
+            self.fetch("/fast")
+
+
+class WorkerModeDrainTests(SelectLoopDrainTests):
+    server_options = {"workers": 2}
+
+    def test_shutdown_waits_for_handlers(self):
+        slow = self.connect(b"GET /slow HTTP/1.1\r\n\r\n")
+        self.wait_for_connections(1)
+
+        self.app.shutdown(timeout=5)
+        time.sleep(0.1)
+        self.assertTrue(self.thread.is_alive())
+
+        self.release.set()
+        self.assertTrue(self.receive(slow).endswith(b"slow"))
+        self.thread.join(5)
+        self.assertFalse(self.thread.is_alive())
+
+    def test_drain_deadline(self):
+        slow = self.connect(b"GET /slow HTTP/1.1\r\n\r\n")
+        self.wait_for_connections(1)
+
+        self.app.shutdown(timeout=0.2)
+        # Closed without a response at the deadline
+        self.assertEqual(self.receive(slow), b"")
+
+
+class RequestLengthTests(unittest.TestCase):
+    def test_request_length(self):
+        self.assertIsNone(request_length(b"GET / HTTP/1.1\r\nHost: a\r\n"))
+        self.assertEqual(request_length(b"GET / HTTP/1.1\r\n\r\n"), 18)
+        self.assertIsNone(
+            request_length(b"POST / HTTP/1.1\r\ncontent-length: 5\r\n\r\nabc")
+        )
+        request = b"POST / HTTP/1.1\r\ncontent-length: 3\r\n\r\nabc"
+        self.assertEqual(request_length(request + b"GET"), len(request))
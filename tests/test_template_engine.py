@@ -3,9 +3,11 @@
 import os
 import re
 import sys
+import tempfile
 import unittest
 
 sys.path.append(os.path.join(os.path.dirname(__file__), "../"))
+from episode.template_engine import TemplateCache
 from episode.template_engine.template import Oeye, OeyeSyntaxError
 
 
@@ -272,3 +274,32 @@ class OeyeTest(unittest.TestCase):
             self.try_render("{% if x %}X{% end if %}")
         with self.assertSynErr("Don't understand end: '{% endif now %}'"):
             self.try_render("{% if x %}X{% endif now %}")
+
+
+class TemplateCacheTest(unittest.TestCase):
+    """Tests for TemplateCache."""
+
+    def setUp(self):
+        self.cache = TemplateCache()
+        tmp = tempfile.NamedTemporaryFile("w", suffix=".html", delete=False)
+        tmp.write("Hello, {{name|upper}}!")
+        tmp.close()
+        self.template = tmp.name
+
+    def tearDown(self):
+        os.unlink(self.template)
+
+    def test_compiled_template_is_reused(self):
+        oeye = self.cache.get(self.template)
+        self.assertIs(self.cache.get(self.template), oeye)
+        self.assertEqual(oeye.render({"name": "ned"}), "Hello, NED!")
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 1))
+
+    def test_edited_template_is_recompiled(self):
+        oeye = self.cache.get(self.template)
+        with open(self.template, "w") as f:
+            f.write("Bye, {{name}}!")
+        os.utime(self.template, ns=(0, 0))
+
+        self.assertIsNot(self.cache.get(self.template), oeye)
+        self.assertEqual(self.cache.get(self.template).render({"name": "Ned"}), "Bye, Ned!")